@@ -1,33 +1,101 @@
 import sys
+import random
 import argparse
-from PyQt5.QtWidgets import QApplication
-from PyQt5 import QtCore
+import functools
 
+# Modules of the package are imported on first use, e.g. Qt frontend only by GUI runs
 import newlifelib
 
 
-life_window: newlifelib.graphics.LifeWindow = None
-
-
-def timer_event():
-    life_window.life_grid.next_generation()
-    life_window.update()
-
-
 def main():
     args = parse_command_line_args()
-    logger = newlifelib.util.Logger(debug=args.debug)
-    App = QApplication(sys.argv)
-    global life_window
-    life_window = newlifelib.graphics.LifeWindow(args, logger)
-    timer = QtCore.QTimer()
-    timer.timeout.connect(timer_event)
-    timer.start(args.period_milliseconds)
-    return App.exec()
+    logger = newlifelib.util.Logger(debug=args.debug, background=True)
+    try:
+        if args.command == 'ensemble':
+            return newlifelib.ensemble.run_command(args, logger)
+        if args.headless:
+            return newlifelib.headless.run(args, logger)
+        if args.serve:
+            return newlifelib.streaming.run(args, logger)
+        from PyQt5.QtWidgets import QApplication
+        from PyQt5 import QtCore
+        App = QApplication(sys.argv)
+        life_window = newlifelib.graphics.LifeWindow(args, logger)
+        life_window.simulation.start()
+        # Generations are stepped by simulation thread, GUI only repaints latest of them at display rate
+        timer = QtCore.QTimer()
+        timer.timeout.connect(life_window.update)
+        timer.start(int(1000 / args.frames_per_second))
+        return App.exec()
+    finally:
+        logger.close()
 
 
 def parse_command_line_args():
     parser = argparse.ArgumentParser(description='Conway\'s Game of Life with Qt frontend')
+    parser.add_argument('-H',
+                        '--headless',
+                        action='store_true',
+                        help='Run without GUI as fast as possible and report throughput')
+    parser.add_argument('-n',
+                        '--generations',
+                        default=100,
+                        type=int,
+                        help='Generations count to run in headless mode')
+    parser.add_argument('--dump-grid',
+                        help='File to write final grid to in headless mode')
+    parser.add_argument('--dump-statistics',
+                        help='File to write per-generation statistics to, as CSV or JSON lines')
+    parser.add_argument('--statistics-format',
+                        choices=[mf.value for mf in newlifelib.metrics.MetricsFormat],
+                        default=None,
+                        help='Format of "--dump-statistics" file, by its extension by default')
+    parser.add_argument('--metrics-every',
+                        default=newlifelib.metrics.MetricsCollector.DEFAULT_EMIT_EVERY,
+                        type=int,
+                        help='Write statistics and log their summary every this many generations, every generation is logged only with "--debug"')
+    parser.add_argument('--load',
+                        help='Checkpoint file to resume from instead of random fill, it defines grid size and evolution strategy')
+    parser.add_argument('--save',
+                        help='Checkpoint file to write final state to, also on exit from GUI')
+    parser.add_argument('--checkpoint-every',
+                        default=0,
+                        type=int,
+                        help='Write checkpoint to "--save" file every this many generations')
+    parser.add_argument('--on-cycle',
+                        choices=[ca.value for ca in newlifelib.cycles.CycleAction],
+                        default=None,
+                        help='Detect still lifes and cycles in headless mode and report them, stop or skip whole cycles, "classic" strategy only')
+    parser.add_argument('--cycle-history',
+                        default=newlifelib.cycles.CycleDetector.DEFAULT_HISTORY_SIZE,
+                        type=int,
+                        help='Generations remembered for cycle detection, longer periods are not detected')
+    parser.add_argument('--record',
+                        help='File to record run to, as born and died cells of every generation, "classic" strategy only')
+    parser.add_argument('--keyframe-every',
+                        default=newlifelib.recording.Recorder.DEFAULT_KEYFRAME_EVERY,
+                        type=int,
+                        help='Record whole grid every this many generations, replay seeks to them')
+    parser.add_argument('--replay',
+                        help='Recording file to replay in GUI instead of running simulation, speed is set by "--period-milliseconds"')
+    parser.add_argument('--replay-from',
+                        default=None,
+                        type=int,
+                        help='Generation to start replay from')
+    parser.add_argument('--serve',
+                        help='Run without GUI, step grid every "--period-milliseconds" and stream generations to viewers connecting to this [host:]port, local host by default')
+    parser.add_argument('--connect',
+                        help='View generations streamed by "--serve" run at this [host:]port in GUI instead of running simulation')
+    parser.add_argument('--profile',
+                        action='store_true',
+                        help='Time generations, clicks, snapshots and painting, show their rates and latencies on screen and log them on exit')
+    parser.add_argument('--profile-dump',
+                        help='Also run cProfile and tracemalloc and write their results to files with this prefix on exit, implies "--profile"')
+    parser.add_argument('-s',
+                        '--seed',
+                        default=None,
+                        type=int,
+                        help='Random seed of initial fill, clicks and "mutation" strategy, runs with the same seed and options are the same')
     parser.add_argument('-d',
                         '--debug',
                         action='store_true',
@@ -73,6 +141,11 @@ def parse_command_line_args():
                         default=1000,
                         type=int,
                         help='Time period between generations in milliseconds')
+    parser.add_argument('-F',
+                        '--frames-per-second',
+                        default=30,
+                        type=float,
+                        help='Repaint rate of the window, independent of generations period')
     parser.add_argument('-u',
                         '--use-primary-screen',
                         action='store_true',
@@ -82,23 +155,267 @@ def parse_command_line_args():
                         choices=[es.value for es in newlifelib.logic.EvolutionStrategy],
                         default=newlifelib.logic.EvolutionStrategy.CLASSIC.value,
                         help='Evolution strategy')
+    parser.add_argument('-R',
+                        '--rule',
+                        default=None,
+                        help='Life-like rule of "classic" strategy in "B3/S23" notation or its name, one of: ' + ', '.join(newlifelib.logic.NAMED_RULES) + ', Conway\'s one by default')
+    parser.add_argument('-T',
+                        '--toroidal',
+                        action='store_true',
+                        help='Wrap grid edges around, so opposite edges are neighbours, not supported by "tiled" and "sparse" engines')
+    parser.add_argument('--engine',
+                        choices=[newlifelib.logic.AUTO_ENGINE] + list(newlifelib.logic.ENGINES),
+                        default=newlifelib.logic.AUTO_ENGINE,
+                        help='Grid engine, all but "python" are much faster on big grids but support only "classic" strategy. "auto" chooses the fastest available one for grid size and strategy by short benchmark at start')
+    parser.add_argument('--tile-size',
+                        default=16,
+                        type=int,
+                        help='Tile size for "tiled" grid engine')
+    parser.add_argument('--chunk-size',
+                        default=64,
+                        type=int,
+                        help='Chunk size for "sparse" grid engine, its grid is unbounded and width and height define only area filled at start')
+    parser.add_argument('-w',
+                        '--workers',
+                        default=None,
+                        type=int,
+                        help='Worker processes count for "parallel" grid engine, CPU count by default')
+    parser.add_argument('-J',
+                        '--jump-generations',
+                        default=0,
+                        type=int,
+                        help='Jump this many generations ahead with HashLife at start and on "J" key press, "classic" strategy only. '
+                             'Only "sparse" engine always jumps, grids of other engines step instead while pattern '
+                             'may reach their edges, if they are toroidal or rule gives births on 0 neighbours')
+    parser.add_argument('--hashlife-memory-mb',
+                        default=newlifelib.hashlife.HashLife.DEFAULT_MEMORY_MB,
+                        type=float,
+                        help='Memory cap for HashLife nodes cache in megabytes')
     parser.add_argument('-C',
                         '--color-mode',
-                        choices=[cm.value for cm in newlifelib.graphics.ColorMode],
-                        default=newlifelib.graphics.ColorMode.COLOR.value,
+                        choices=[cm.value for cm in newlifelib.logic.ColorMode],
+                        default=newlifelib.logic.ColorMode.COLOR.value,
                         help='Color mode')
+    commands = parser.add_subparsers(dest='command')
+    ensemble_parser = commands.add_parser('ensemble',
+                                          help='Run many independent universes without GUI and write per-generation statistics of all of them as one table')
+    ensemble_parser.add_argument('-n',
+                                 '--generations',
+                                 default=100,
+                                 type=int,
+                                 help='Generations count to run every universe for')
+    ensemble_parser.add_argument('--width',
+                                 default=50,
+                                 type=int,
+                                 help='Life grid width of every universe')
+    ensemble_parser.add_argument('--height',
+                                 default=50,
+                                 type=int,
+                                 help='Life grid height of every universe')
+    ensemble_parser.add_argument('-s',
+                                 '--seed',
+                                 default=1,
+                                 type=int,
+                                 help='Random seed of the first universe of every parameters combination')
+    ensemble_parser.add_argument('-S',
+                                 '--seeds',
+                                 default=10,
+                                 type=int,
+                                 help='Universes count of every parameters combination, their seeds are consecutive')
+    ensemble_parser.add_argument('-b',
+                                 '--birth-probabilities',
+                                 nargs='+',
+                                 default=[0.5],
+                                 type=float,
+                                 help='Probabilities of initial births of cells to sweep')
+    ensemble_parser.add_argument('-e',
+                                 '--evolution-strategies',
+                                 nargs='+',
+                                 choices=[es.value for es in newlifelib.logic.EvolutionStrategy],
+                                 default=[newlifelib.logic.EvolutionStrategy.CLASSIC.value],
+                                 help='Evolution strategies to sweep')
+    ensemble_parser.add_argument('-R',
+                                 '--rule',
+                                 default=None,
+                                 help='Rule of "classic" universes, as in "--rule" of a single run')
+    ensemble_parser.add_argument('-T',
+                                 '--toroidal',
+                                 action='store_true',
+                                 help='Wrap grid edges of every universe around')
+    ensemble_parser.add_argument('--mode',
+                                 choices=[em.value for em in newlifelib.ensemble.EnsembleMode],
+                                 default=None,
+                                 help='Step "classic" universes stacked in batches by one vectorized pass per generation with NumPy, or every universe by its own grid in process pool, batch if all universes are "classic" and NumPy is installed by default')
+    ensemble_parser.add_argument('--batch-size',
+                                 default=newlifelib.ensemble.DEFAULT_BATCH_SIZE,
+                                 type=int,
+                                 help='Universes stacked in one batch, memory of batch mode grows with it')
+    ensemble_parser.add_argument('--engine',
+                                 choices=[name for name in newlifelib.logic.ENGINES if name != newlifelib.logic.GridEngine.PARALLEL.value],
+                                 default=newlifelib.logic.GridEngine.PYTHON.value,
+                                 help='Grid engine of pool mode')
+    ensemble_parser.add_argument('-w',
+                                 '--workers',
+                                 default=None,
+                                 type=int,
+                                 help='Worker processes count of pool mode, CPU count by default')
+    ensemble_parser.add_argument('-o',
+                                 '--output',
+                                 default='-',
+                                 help='File to write statistics to, as CSV or JSON lines, standard output by default')
+    ensemble_parser.add_argument('--statistics-format',
+                                 choices=[mf.value for mf in newlifelib.metrics.MetricsFormat],
+                                 default=None,
+                                 help='Format of "--output" file, by its extension by default')
     args = parser.parse_args()
-    args.color_mode = newlifelib.graphics.ColorMode(args.color_mode)
+    if args.command == 'ensemble':
+        return parse_ensemble_args(parser, args)
+    if args.checkpoint_every > 0 and not args.save:
+        parser.error('--checkpoint-every requires --save')
+    if args.replay and args.headless:
+        parser.error('--replay works only with GUI')
+    if args.replay and args.load:
+        parser.error('--replay and --load can\'t be used together')
+    if args.serve and (args.headless or args.replay or args.connect):
+        parser.error('--serve can\'t be used with --headless, --replay or --connect')
+    if args.connect and (args.headless or args.replay or args.load):
+        parser.error('--connect can\'t be used with --headless, --replay or --load')
+    if args.keyframe_every <= 0:
+        parser.error('--keyframe-every must be positive')
+    if args.metrics_every <= 0:
+        parser.error('--metrics-every must be positive')
+    if args.engine == newlifelib.logic.GridEngine.SPARSE.value and (args.load or args.save or args.record or args.serve):
+        parser.error('--load, --save, --record and --serve need bounded grid, "sparse" engine has none')
+    if args.profile_dump:
+        args.profile = True
+    if args.rule is not None:
+        if args.evolution_strategy != newlifelib.logic.EvolutionStrategy.CLASSIC.value:
+            parser.error('--rule works only with "classic" evolution strategy')
+        try:
+            args.rule = newlifelib.logic.Rule.parse(args.rule)
+        except ValueError as e:
+            parser.error(str(e))
+    if args.load:
+        header = newlifelib.checkpoint.read_header(args.load)
+        args.width = header.width
+        args.height = header.height
+        args.evolution_strategy = header.evolution_strategy.value
+        args.rule = header.rule
+        args.toroidal = header.toroidal
+    if args.record and args.evolution_strategy != newlifelib.logic.EvolutionStrategy.CLASSIC.value:
+        parser.error('--record works only with "classic" evolution strategy, recordings keep no cell classes')
+    if args.replay:
+        args.replay = newlifelib.recording.RecordingReader(args.replay)
+        args.width = args.replay.width
+        args.height = args.replay.height
+        args.evolution_strategy = newlifelib.logic.EvolutionStrategy.CLASSIC.value
+    if args.serve:
+        try:
+            args.serve = newlifelib.streaming.parse_address(args.serve)
+        except ValueError as e:
+            parser.error(str(e))
+    if args.connect:
+        try:
+            args.connect = newlifelib.streaming.StreamReader(newlifelib.streaming.parse_address(args.connect))
+        except (OSError, ValueError) as e:
+            parser.error(f'Can\'t view stream of "{args.connect}": {e}')
+        args.width = args.connect.width
+        args.height = args.connect.height
+        args.evolution_strategy = args.connect.evolution_strategy.value
+        args.rule = None
+    args.rng = random.Random(args.seed) if args.seed is not None else None
+    args.color_mode = newlifelib.logic.ColorMode(args.color_mode)
+    if args.statistics_format is not None:
+        args.statistics_format = newlifelib.metrics.MetricsFormat(args.statistics_format)
+    if args.on_cycle is not None:
+        args.on_cycle = newlifelib.cycles.CycleAction(args.on_cycle)
     if args.evolution_strategy == 'classic':
         args.evolution_strategy = newlifelib.logic.ClassicEvolutionStrategy
+        if args.rule is not None:
+            args.evolution_strategy = args.evolution_strategy.with_rule(args.rule)
     elif args.evolution_strategy == 'mutation':
-        # TODO: Implement `will_born_with_neighbours` method for mutation cells classes, see `logic.py`
-        raise Exception('"mutation" strategy is broken for now, sorry, please choose "classic"')
         args.evolution_strategy = newlifelib.logic.MutationEvolutionStrategy
     else:
         raise NotImplementedError
+    args.engine = grid_engine(parser, args)
+    return args
+
+
+def parse_ensemble_args(parser, args):
+    if args.seeds <= 0:
+        parser.error('--seeds must be positive')
+    if args.batch_size <= 0:
+        parser.error('--batch-size must be positive')
+    args.evolution_strategies = [newlifelib.logic.EvolutionStrategy(es) for es in args.evolution_strategies]
+    if args.mode is not None:
+        args.mode = newlifelib.ensemble.EnsembleMode(args.mode)
+    if args.mode == newlifelib.ensemble.EnsembleMode.BATCH \
+            and newlifelib.logic.EvolutionStrategy.MUTATION in args.evolution_strategies:
+        parser.error('batch mode steps only "classic" universes')
+    if args.mode == newlifelib.ensemble.EnsembleMode.BATCH and not newlifelib.ensemble.batch_supported():
+        parser.error('batch mode needs NumPy, use pool mode')
+    if args.rule is not None:
+        try:
+            args.rule = newlifelib.logic.Rule.parse(args.rule)
+        except ValueError as e:
+            parser.error(str(e))
+    if args.statistics_format is not None:
+        args.statistics_format = newlifelib.metrics.MetricsFormat(args.statistics_format)
+    args.engine = grid_engine(parser, args)
     return args
 
 
+def grid_engine(parser, args):
+    if args.engine == newlifelib.logic.AUTO_ENGINE:
+        # Replayed and streamed grid is never stepped, its engine doesn't matter
+        if args.replay or args.connect:
+            return newlifelib.logic.LifeGrid
+        return functools.partial(auto_engine, args)
+    try:
+        return configured_engine(args, args.engine)
+    except ImportError as e:
+        parser.error(f'"{args.engine}" engine is not available: {e}')
+
+
+def auto_engine(args,
+                evolution_strategy,
+                width,
+                height,
+                birth_probability,
+                click_birth_probability,
+                click_birth_radius,
+                logger,
+                toroidal=False,
+                **kwargs):
+    # Engine is chosen when grid is made, so the sample has size of the grid, which is defined by screen in
+    # fullscreen and maximized windows
+    name, timings = newlifelib.logic.select_engine(evolution_strategy, width, height, birth_probability, toroidal)
+    logger.info(f'Grid engine "{name}" chosen by generation time on sample of {width}x{height} grid: '
+                + ', '.join(f'"{engine}" {seconds * 1000:.3f} ms' for engine, seconds in timings.items()))
+    return configured_engine(args, name)(evolution_strategy,
+                                         width,
+                                         height,
+                                         birth_probability,
+                                         click_birth_probability,
+                                         click_birth_radius,
+                                         logger,
+                                         toroidal=toroidal,
+                                         **kwargs)
+
+
+def configured_engine(args, name: str):
+    engine = newlifelib.logic.engine_class(name)
+    # Ensemble has no options of engines, they have their defaults there
+    if args.command == 'ensemble':
+        return engine
+    if name == newlifelib.logic.GridEngine.TILED.value:
+        return functools.partial(engine, tile_size=args.tile_size)
+    elif name == newlifelib.logic.GridEngine.PARALLEL.value:
+        return functools.partial(engine, workers=args.workers)
+    elif name == newlifelib.logic.GridEngine.SPARSE.value:
+        return functools.partial(engine, chunk_size=args.chunk_size)
+    return engine
+
+
 if __name__ == '__main__':
     sys.exit(main())
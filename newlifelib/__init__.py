@@ -1,3 +1,12 @@
-import newlifelib.logic
-import newlifelib.util
-import newlifelib.graphics
+import importlib
+
+
+def __getattr__(name):
+    # Submodules are imported on first use, so the core doesn't load Qt frontend, NumPy engines
+    # or anything else it doesn't need
+    try:
+        return importlib.import_module(f'{__name__}.{name}')
+    except ModuleNotFoundError as e:
+        if e.name != f'{__name__}.{name}':
+            raise
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
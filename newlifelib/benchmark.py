@@ -0,0 +1,262 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import functools
+import subprocess
+import tracemalloc
+
+from .logic import (
+    ENGINES,
+    GridEngine,
+    EvolutionStrategy,
+    ColorMode,
+    close_grid,
+    engine_class,
+    strategy_class,
+)
+from .util import (
+    Logger,
+    quiet_logger,
+)
+from .conformance import (
+    CORE_MODULES,
+    measure_import,
+)
+
+
+def _rates(seconds: float, generations: int, cells_count: int):
+    return {
+        'seconds': seconds,
+        'generations_per_second': generations / seconds if seconds > 0 else None,
+        'cells_per_second': generations * cells_count / seconds if seconds > 0 else None,
+    }
+
+
+def bench_grid(engine: str, strategy: str, size: int, density: float, generations: int, clicks: int, seed: int):
+    cells_count = size * size
+    make_grid = functools.partial(engine_class(engine), strategy_class(EvolutionStrategy(strategy)), size, size, density, 0.5, 5, quiet_logger())
+
+    life_grid = make_grid(rng=random.Random(seed))
+    time_start = time.perf_counter()
+    life_grid.fill_random()
+    fill_random_seconds = time.perf_counter() - time_start
+
+    time_start = time.perf_counter()
+    for _ in range(generations):
+        life_grid.next_generation()
+    next_generation_seconds = time.perf_counter() - time_start
+
+    click_random = random.Random(seed)
+    time_start = time.perf_counter()
+    for _ in range(clicks):
+        life_grid.make_random_birth(click_random.randrange(size), click_random.randrange(size))
+    make_random_birth_seconds = time.perf_counter() - time_start
+    close_grid(life_grid)
+
+    # Memory is measured in separate run, tracing slows down everything else
+    tracemalloc.start()
+    life_grid = make_grid(rng=random.Random(seed))
+    life_grid.fill_random()
+    life_grid.next_generation()
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    close_grid(life_grid)
+
+    return {
+        'fill_random': {'seconds': fill_random_seconds,
+                        'cells_per_second': cells_count / fill_random_seconds if fill_random_seconds > 0 else None},
+        'next_generation': _rates(next_generation_seconds, generations, cells_count),
+        'make_random_birth': {'clicks': clicks,
+                              'seconds_per_click': make_random_birth_seconds / clicks if clicks > 0 else None},
+        'peak_memory_bytes': peak_memory,
+    }
+
+
+def bench_paint(engine: str, strategy: str, size: int, density: float, frames: int, seed: int, cell_size: int):
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    from .graphics import LifeWindow
+    application = QApplication.instance() or QApplication(sys.argv[:1])
+    args = argparse.Namespace(cell_size=cell_size,
+                              color_mode=ColorMode.COLOR,
+                              fullscreen=False,
+                              maximized=False,
+                              use_primary_screen=False,
+                              width=size,
+                              height=size,
+                              engine=engine_class(engine),
+                              evolution_strategy=strategy_class(EvolutionStrategy(strategy)),
+                              birth_probability=density,
+                              click_birth_probability=0.5,
+                              click_birth_radius=5,
+                              hashlife_memory_mb=16,
+                              jump_generations=0,
+                              load=None,
+                              save=None,
+                              checkpoint_every=0,
+                              record=None,
+                              replay=None,
+                              replay_from=None,
+                              connect=None,
+                              toroidal=False,
+                              rng=random.Random(seed),
+                              dump_statistics=None,
+                              statistics_format=None,
+                              metrics_every=1,
+                              profile=False,
+                              profile_dump=None,
+                              period_milliseconds=0)
+    life_window = LifeWindow(args, quiet_logger())
+    simulation = life_window.simulation
+    # Simulation thread is not started, generations are stepped here one by one
+    simulation.publish_snapshot()
+    life_window.grab()
+    snapshot_seconds = 0
+    paint_seconds = 0
+    for _ in range(frames):
+        simulation.life_grid.next_generation()
+        time_start = time.perf_counter()
+        simulation.publish_snapshot()
+        snapshot_seconds += time.perf_counter() - time_start
+        time_start = time.perf_counter()
+        life_window.grab()
+        paint_seconds += time.perf_counter() - time_start
+    time_start = time.perf_counter()
+    life_window.grab()
+    repaint_seconds = time.perf_counter() - time_start
+    life_window.close()
+    close_grid(simulation.life_grid)
+    application.processEvents()
+    return {
+        'frames': frames,
+        'cell_size': cell_size,
+        'snapshot_seconds_per_frame': snapshot_seconds / frames if frames > 0 else None,
+        'paint_seconds_per_frame': paint_seconds / frames if frames > 0 else None,
+        'frames_per_second': frames / (snapshot_seconds + paint_seconds) if frames > 0 else None,
+        'unchanged_repaint_seconds': repaint_seconds,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'],
+                              cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True,
+                              text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args, logger: Logger):
+    results = []
+    for engine in args.engines:
+        for strategy in args.strategies:
+            for size in args.sizes:
+                for density in args.densities:
+                    case = {'engine': engine,
+                            'strategy': strategy,
+                            'width': size,
+                            'height': size,
+                            'density': density,
+                            'seed': args.seed,
+                            'generations': args.generations}
+                    try:
+                        case.update(bench_grid(engine, strategy, size, density, args.generations, args.clicks, args.seed))
+                        if not args.no_paint:
+                            case['paint'] = bench_paint(engine, strategy, size, density, args.frames, args.seed, args.cell_size)
+                    except (ImportError, NotImplementedError) as e:
+                        case['skipped'] = str(e) or 'not implemented'
+                        logger.warning(f'{engine}/{strategy} {size}x{size} at {density}: skipped, {case["skipped"]}')
+                    else:
+                        logger.info(f'{engine}/{strategy} {size}x{size} at {density}: {case["next_generation"]["generations_per_second"]:.2f} generations/s')
+                    results.append(case)
+    return {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'imports': {module: measure_import(module) for module in CORE_MODULES},
+        'results': results,
+    }
+
+
+def parse_command_line_args():
+    parser = argparse.ArgumentParser(description='Benchmark of grid engines and rendering')
+    parser.add_argument('-o',
+                        '--output',
+                        default='-',
+                        help='JSON file to write results to, standard output by default')
+    parser.add_argument('--engines',
+                        nargs='+',
+                        choices=list(ENGINES),
+                        default=[GridEngine.PYTHON.value, GridEngine.NUMPY.value, GridEngine.TILED.value, GridEngine.BIT.value],
+                        help='Grid engines to benchmark')
+    parser.add_argument('--strategies',
+                        nargs='+',
+                        choices=[es.value for es in EvolutionStrategy],
+                        default=[es.value for es in EvolutionStrategy],
+                        help='Evolution strategies to benchmark')
+    parser.add_argument('--sizes',
+                        nargs='+',
+                        type=int,
+                        default=[64, 256],
+                        help='Square grid sizes')
+    parser.add_argument('--densities',
+                        nargs='+',
+                        type=float,
+                        default=[0.1, 0.5],
+                        help='Initial birth probabilities')
+    parser.add_argument('-n',
+                        '--generations',
+                        default=10,
+                        type=int,
+                        help='Generations to step in each case')
+    parser.add_argument('--clicks',
+                        default=10,
+                        type=int,
+                        help='Random births by click to make in each case')
+    parser.add_argument('--frames',
+                        default=5,
+                        type=int,
+                        help='Frames to paint in each case')
+    parser.add_argument('-c',
+                        '--cell-size',
+                        default=4,
+                        type=int,
+                        help='Cell size for painting')
+    parser.add_argument('--no-paint',
+                        action='store_true',
+                        help='Skip painting benchmark, e.g. when PyQt5 is not available')
+    parser.add_argument('-s',
+                        '--seed',
+                        default=1,
+                        type=int,
+                        help='Random seed')
+    parser.add_argument('-d',
+                        '--debug',
+                        action='store_true',
+                        help='Enable debugging output')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_command_line_args()
+    logger = Logger(debug=args.debug)
+    report = run(args, logger)
+    if args.output == '-':
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f'Results written to "{args.output}"')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,325 @@
+from typing import (
+    Iterator,
+    List,
+)
+
+from .logic import (
+    LifeGrid,
+    ClassicEvolutionStrategy,
+    TypicalCell,
+    zobrist_key,
+    statistics_total_ages,
+)
+
+
+# Translation tables from cell codes and from bytes of ages into "0"/"1" binary digits
+ALIVE_DIGITS = b'0' + b'1' * 255
+BIT_DIGITS = [bytes(ord('1') if byte >> k & 1 else ord('0') for byte in range(256)) for k in range(8)]
+
+
+def bit_indices(bits: int) -> Iterator[int]:
+    # Indices of set bits, scanning is done by `str.find` instead of big integer shifts
+    reversed_digits = bin(bits)[:1:-1]
+    index = reversed_digits.find('1')
+    while index >= 0:
+        yield index
+        index = reversed_digits.find('1', index + 1)
+
+
+def from_bit_indices(indices, size: int) -> int:
+    digits = bytearray(b'0' * size)
+    for index in indices:
+        digits[index] = ord('1')
+    digits.reverse()
+    return int(digits, 2) if size > 0 else 0
+
+
+def count_slices(all_neighbours) -> List[int]:
+    # Bit-sliced neighbours counters of boards shifted to all 8 directions, bit k of count of a cell is in k-th integer
+    s0 = s1 = s2 = s3 = 0
+    for neighbours in all_neighbours:
+        carry0 = s0 & neighbours
+        s0 ^= neighbours
+        carry1 = s1 & carry0
+        s1 ^= carry0
+        carry2 = s2 & carry1
+        s2 ^= carry1
+        s3 |= carry2
+    return [s0, s1, s2, s3]
+
+
+def shifted_neighbours(board: int, stride: int):
+    # Board shifted to all 8 directions, rows must be separated by dead bits, so shifts don't wrap
+    return (board << 1, board >> 1,
+            board << stride, board >> stride,
+            board << (stride + 1), board >> (stride + 1),
+            board << (stride - 1), board >> (stride - 1))
+
+
+def count_equals(slices: List[int], alive_neighbours: int) -> int:
+    result = -1
+    for k, s in enumerate(slices):
+        result &= s if alive_neighbours >> k & 1 else ~s
+    return result
+
+
+def rule_board(board: int, slices: List[int], survive_counts: List[int], birth_counts: List[int] = ()) -> int:
+    # Cells alive in the next generation by bit-sliced neighbours counts, born ones are not masked by edges,
+    # without birth counts only survivors
+    future_board = 0
+    for alive_neighbours in survive_counts:
+        future_board |= board & count_equals(slices, alive_neighbours)
+    for alive_neighbours in birth_counts:
+        future_board |= ~board & count_equals(slices, alive_neighbours)
+    return future_board
+
+
+def older_slices(age_slices: List[int], survived: int) -> List[int]:
+    # Ages of survivors are incremented by ripple carry through slices, others become zero
+    age_slices = [s & survived for s in age_slices]
+    carry = survived
+    for k in range(len(age_slices)):
+        if carry == 0:
+            break
+        age_slices[k], carry = age_slices[k] ^ carry, age_slices[k] & carry
+    if carry != 0:
+        age_slices.append(carry)
+    return age_slices
+
+
+def sliced_ages_sum(age_slices: List[int]) -> int:
+    return sum(s.bit_count() << k for k, s in enumerate(age_slices))
+
+
+def state_boards(board: int, age_slices: List[int], survived: int) -> List[int]:
+    # Cells of every state of `CELL_STATES[1:]`, as in `BasicCell.state`, by bit-sliced ages and survival
+    s0, s1, s2, s3 = (age_slices + [0] * 4)[:4]
+    higher = 0
+    for s in age_slices[4:]:
+        higher |= s
+    grown = s0 | s1 | s2 | s3 | higher
+    mature = higher | s3 | s2 & (s0 | s1)
+    long_living = higher | s0 & s1 & s2 & s3
+    return [board & ~grown,
+            board & grown & ~mature & survived,
+            board & mature & ~long_living & survived,
+            board & long_living & survived,
+            board & grown & ~survived]
+
+
+class BitLifeGrid(LifeGrid):
+    # Whole grid is one Python integer, row-major with stride of width + 1 bits. Extra bit of every row
+    # is always zero, it separates rows, so horizontal shifts don't wrap and edges behave as in
+    # `alive_neighbours`, toroidal grid wraps shifts explicitly. Ages are bit-sliced the same way,
+    # bit k of age of a cell is in k-th integer, they are turned into per cell numbers only when cells are read.
+
+    def __init__(self,
+                 evolution_strategy_class,
+                 *args,
+                 **kwargs):
+        if not issubclass(evolution_strategy_class, ClassicEvolutionStrategy):
+            raise NotImplementedError('Bit engine supports only "classic" evolution strategy for now')
+        super().__init__(evolution_strategy_class, *args, **kwargs)
+        self._survive_counts = [n for n in range(9) if self.evolution_strategy.rule.will_survive(n)]
+        self._birth_counts = [n for n in range(9) if self.evolution_strategy.rule.will_born(n)]
+
+    def _allocate_cells(self):
+        self.stride = self.width + 1
+        self.bits_count = self.height * self.stride
+        self.row_mask = (1 << self.width) - 1
+        self.cells_mask = 0
+        # Cells of the first and the last columns, they are neighbours on toroidal grid
+        self.first_column_mask = 0
+        self.last_column_mask = 0
+        for iv in range(self.height):
+            self.cells_mask |= self.row_mask << (iv * self.stride)
+            self.first_column_mask |= 1 << (iv * self.stride)
+            self.last_column_mask |= 1 << (iv * self.stride + self.width - 1)
+        self.board = 0
+        self.age_slices: List[int] = []
+        self._version = 0
+        self._cached_version = None
+        self._board_digits = ''
+        self._count_digits: List[str] = []
+        self._age_digits: List[str] = []
+        # Hash is brought up to date on demand by XOR of keys of cells changed since it was computed
+        self._state_hash = 0
+        self._hashed_board = 0
+
+    def _touch(self):
+        self._version += 1
+
+    def _refresh_cache(self):
+        if self._cached_version == self._version:
+            return
+        self._board_digits = bin(self.board)[:1:-1].ljust(self.bits_count, '0')
+        self._count_digits = [self._digits(s) for s in self._count_slices(self.board)]
+        self._age_digits = [self._digits(s) for s in self.age_slices]
+        self._cached_version = self._version
+
+    def _digits(self, bits: int) -> str:
+        # Binary digits from the lowest one, so digit of a cell can be taken by its bit index
+        return bin(bits & self.cells_mask)[:1:-1].ljust(self.bits_count, '0')
+
+    def _wrapped_neighbours(self, board: int) -> List[int]:
+        # Board shifted to all 8 directions, cells shifted out of the grid come in from the opposite edge
+        last_row_shift = (self.height - 1) * self.stride
+        from_left = board << 1 & self.cells_mask | board >> (self.width - 1) & self.first_column_mask
+        from_right = board >> 1 & self.cells_mask | board << (self.width - 1) & self.last_column_mask
+        neighbours = [from_left, from_right]
+        for row in (from_left, board, from_right):
+            neighbours.append(row << self.stride & self.cells_mask | row >> last_row_shift)
+            neighbours.append(row >> self.stride | (row & self.row_mask) << last_row_shift)
+        return neighbours
+
+    def _count_slices(self, board: int) -> List[int]:
+        if self.toroidal:
+            return count_slices(self._wrapped_neighbours(board))
+        return count_slices(shifted_neighbours(board, self.stride))
+
+    @property
+    def state_hash(self) -> int:
+        changed = self.board ^ self._hashed_board
+        if changed:
+            # Only cells changed since the last hash are visited, extra bit of every row is skipped in cell indices
+            for index in bit_indices(changed):
+                self._state_hash ^= zobrist_key(index - index // self.stride)
+            self._hashed_board = self.board
+        return self._state_hash
+
+    def _is_alive(self, coord_vertical: int, coord_horizontal: int) -> bool:
+        self._refresh_cache()
+        return self._board_digits[coord_vertical * self.stride + coord_horizontal] == '1'
+
+    def _cell(self, coord_vertical: int, coord_horizontal: int):
+        if not self._is_alive(coord_vertical, coord_horizontal):
+            return None
+        bit = coord_vertical * self.stride + coord_horizontal
+        cell = self.evolution_strategy.born_new_cell(coord_vertical, coord_horizontal)
+        cell.age = sum(1 << k for k, digits in enumerate(self._age_digits) if digits[bit] == '1')
+        return cell
+
+    def _set_cell(self, coord_vertical: int, coord_horizontal: int, cell):
+        bit = 1 << (coord_vertical * self.stride + coord_horizontal)
+        self.board &= ~bit
+        self.age_slices = [s & ~bit for s in self.age_slices]
+        if cell is not None:
+            self.board |= bit
+            while len(self.age_slices) < cell.age.bit_length():
+                self.age_slices.append(0)
+            for k in range(cell.age.bit_length()):
+                if cell.age >> k & 1:
+                    self.age_slices[k] |= bit
+        self._touch()
+
+    def _give_birth(self, bits: List[int]):
+        # `bits` may contain alive cells, they are reborn with zero age as in `LifeGrid.fill_random`
+        born = from_bit_indices(bits, self.bits_count)
+        self.board |= born
+        self.age_slices = [s & ~born for s in self.age_slices]
+        self._touch()
+
+    def alive_coordinates(self):
+        for bit in bit_indices(self.board):
+            yield divmod(bit, self.stride)
+
+    def _replace_cells(self, coordinates):
+        self.board = 0
+        self.age_slices = []
+        self._give_birth([iv * self.stride + ih for iv, ih in coordinates])
+
+    def _cells_digits(self, digits: str) -> bytes:
+        # Row-major digits of cells only, without extra bit of every row
+        return ''.join(digits[iv * self.stride:iv * self.stride + self.width] for iv in range(self.height)).encode()
+
+    def _from_cells_digits(self, digits: bytes) -> int:
+        rows = b'0'.join(digits[iv * self.width:(iv + 1) * self.width] for iv in range(self.height))
+        return int(rows[::-1], 2) if rows else 0
+
+    def _export_cell_types(self):
+        self._refresh_cache()
+        return self._cells_digits(self._board_digits).translate(bytes.maketrans(b'01', bytes([0, TypicalCell.code])))
+
+    def _export_cells(self):
+        self._refresh_cache()
+        cells_count = self.width * self.height
+        cell_types = self._export_cell_types()
+        # Every byte of 32-bit little endian ages gathers eight slices, bits of different slices don't overlap
+        ages = bytearray(cells_count * 4)
+        for byte_index in range(4):
+            byte_value = 0
+            for k in range(byte_index * 8, min(byte_index * 8 + 8, len(self._age_digits))):
+                plane = self._cells_digits(self._age_digits[k]).translate(bytes.maketrans(b'01', b'\x00\x01'))
+                byte_value |= int.from_bytes(plane, 'little') << (k % 8)
+            ages[byte_index::4] = byte_value.to_bytes(cells_count, 'little')
+        return cell_types, ages
+
+    def _import_cells(self, cell_types, ages):
+        ages = bytes(ages)
+        self.board = self._from_cells_digits(bytes(cell_types).translate(ALIVE_DIGITS))
+        age_slices = []
+        for byte_index in range(4):
+            ages_bytes = ages[byte_index::4]
+            if not ages_bytes.strip(b'\x00'):
+                age_slices.extend([0] * 8)
+                continue
+            for k in range(8):
+                age_slices.append(self._from_cells_digits(ages_bytes.translate(BIT_DIGITS[k])))
+        while age_slices and age_slices[-1] == 0:
+            age_slices.pop()
+        self.age_slices = age_slices
+        self._touch()
+
+    def _compute_cell_states(self):
+        board = self.board
+        survived = rule_board(board, self._count_slices(board), self._survive_counts)
+        codes = 0
+        for code, state_board in enumerate(state_boards(board, self.age_slices, survived), 1):
+            flags = self._cells_digits(self._digits(state_board)).translate(bytes.maketrans(b'01', b'\x00\x01'))
+            codes |= int.from_bytes(flags, 'little') * code
+        return codes.to_bytes(self.width * self.height, 'little')
+
+    def alive_neighbours(self, coord_vertical, coord_horizontal):
+        self._refresh_cache()
+        bit = coord_vertical * self.stride + coord_horizontal
+        alive_neighbours = 0
+        for k, digits in enumerate(self._count_digits):
+            if digits[bit] == '1':
+                alive_neighbours += 1 << k
+        return alive_neighbours
+
+    def _region_occupancy(self, region):
+        self._refresh_cache()
+        iv_from, iv_to, ih_from, ih_to = region
+        return ''.join(self._board_digits[iv * self.stride + ih_from:iv * self.stride + ih_to + 1]
+                       for iv in range(iv_from, iv_to + 1)).encode().translate(bytes.maketrans(b'01', b'\x00\x01'))
+
+    def _birth_region(self, region, flags):
+        # Flags of every row become its binary digits padded to stride, all rows are parsed at once
+        iv_from, iv_to, ih_from, ih_to = region
+        region_width = ih_to - ih_from + 1
+        digits = flags.translate(ALIVE_DIGITS)
+        head = b'0' * ih_from
+        tail = b'0' * (self.stride - ih_to - 1)
+        rows = b''.join(head + digits[r * region_width:(r + 1) * region_width] + tail for r in range(iv_to - iv_from + 1))
+        born = int(rows[::-1], 2) << (iv_from * self.stride) if rows else 0
+        self.board |= born
+        self.age_slices = [s & ~born for s in self.age_slices]
+        self._touch()
+        return born.bit_count()
+
+    def next_generation(self):
+        board = self.board
+        future_board = rule_board(board, self._count_slices(board), self._survive_counts, self._birth_counts) \
+            & self.cells_mask
+        survived = future_board & board
+        born_count = (future_board & ~board).bit_count()
+        survived_count = survived.bit_count()
+        died_count = board.bit_count() - survived_count
+        age_slices = older_slices(self.age_slices, survived)
+        total_ages = statistics_total_ages(sliced_ages_sum(age_slices), born_count)
+        self.board = future_board
+        self.age_slices = age_slices
+        self._touch()
+        self._record_generation(born_count, survived_count, died_count, survived_count + born_count, total_ages)
+        self.generations_count += 1
@@ -0,0 +1,129 @@
+import os
+import mmap
+import struct
+from typing import (
+    NamedTuple,
+    Optional,
+)
+
+from .logic import (
+    LifeGrid,
+    EvolutionStrategy,
+    ClassicEvolutionStrategy,
+    MutationEvolutionStrategy,
+    Rule,
+)
+
+
+MAGIC = b'NLCP'
+FORMAT_VERSION = 2
+# Magic, format version, evolution strategy code, random generator state version, whether cached Gaussian value
+# is present, whether grid is toroidal, birth and survival masks of "classic" strategy rule, width, height,
+# generations count and cached Gaussian value
+HEADER = struct.Struct('<4sHBBBBHHxxIIQd')
+# Mersenne Twister words of random generator state and position in them
+RANDOM_WORDS = struct.Struct('<625I')
+# Header is followed by random words, ages as little endian 32-bit integers, then cell codes as bytes,
+# ages go first so they stay aligned
+CELLS_OFFSET = HEADER.size + RANDOM_WORDS.size
+
+STRATEGY_CODES = {
+    EvolutionStrategy.CLASSIC: 0,
+    EvolutionStrategy.MUTATION: 1,
+}
+
+
+class CheckpointHeader(NamedTuple):
+    width: int
+    height: int
+    evolution_strategy: EvolutionStrategy
+    # Only "classic" strategy has rule
+    rule: Optional[Rule]
+    toroidal: bool
+    generations_count: int
+    random_state: tuple
+
+
+def evolution_strategy_of(life_grid: LifeGrid) -> EvolutionStrategy:
+    if isinstance(life_grid.evolution_strategy, MutationEvolutionStrategy):
+        return EvolutionStrategy.MUTATION
+    return EvolutionStrategy.CLASSIC
+
+
+def rule_of(life_grid: LifeGrid) -> Optional[Rule]:
+    if isinstance(life_grid.evolution_strategy, ClassicEvolutionStrategy):
+        return life_grid.evolution_strategy.rule
+    return None
+
+
+def save(life_grid: LifeGrid, path: str):
+    random_version, random_words, gauss_next = life_grid.rng.getstate()
+    cell_types, ages = life_grid._export_cells()
+    rule = rule_of(life_grid) or Rule(0, 0)
+    # File is replaced only when completely written, so interrupted run keeps previous checkpoint
+    temporary_path = f'{path}.tmp'
+    with open(temporary_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC,
+                            FORMAT_VERSION,
+                            STRATEGY_CODES[evolution_strategy_of(life_grid)],
+                            random_version,
+                            gauss_next is not None,
+                            life_grid.toroidal,
+                            rule.birth_mask,
+                            rule.survive_mask,
+                            life_grid.width,
+                            life_grid.height,
+                            life_grid.generations_count,
+                            gauss_next if gauss_next is not None else 0.0))
+        f.write(RANDOM_WORDS.pack(*random_words))
+        f.write(ages)
+        f.write(cell_types)
+    os.replace(temporary_path, path)
+
+
+def _unpack_header(data, path: str) -> CheckpointHeader:
+    if len(data) < CELLS_OFFSET:
+        raise ValueError(f'"{path}" is not a checkpoint file')
+    magic, format_version, strategy_code, random_version, has_gauss_next, toroidal, birth_mask, survive_mask, \
+        width, height, generations_count, gauss_next = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f'"{path}" is not a checkpoint file')
+    if format_version != FORMAT_VERSION:
+        raise ValueError(f'Checkpoint "{path}" has unsupported format version {format_version}')
+    strategies = {code: strategy for strategy, code in STRATEGY_CODES.items()}
+    random_state = (random_version,
+                    RANDOM_WORDS.unpack_from(data, HEADER.size),
+                    gauss_next if has_gauss_next else None)
+    evolution_strategy = strategies[strategy_code]
+    rule = Rule(birth_mask, survive_mask) if evolution_strategy == EvolutionStrategy.CLASSIC else None
+    return CheckpointHeader(width, height, evolution_strategy, rule, bool(toroidal), generations_count, random_state)
+
+
+def read_header(path: str) -> CheckpointHeader:
+    with open(path, 'rb') as f:
+        return _unpack_header(f.read(CELLS_OFFSET), path)
+
+
+def load(life_grid: LifeGrid, path: str) -> CheckpointHeader:
+    # Cells are handed to the grid as slices of memory-mapped file, it copies them in bulk
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        header = _unpack_header(data, path)
+        if (header.width, header.height) != (life_grid.width, life_grid.height):
+            raise ValueError(f'Checkpoint "{path}" is for {header.width}x{header.height} grid, not for {life_grid.width}x{life_grid.height} one')
+        if header.evolution_strategy != evolution_strategy_of(life_grid):
+            raise ValueError(f'Checkpoint "{path}" is for "{header.evolution_strategy.value}" evolution strategy')
+        if header.rule != rule_of(life_grid):
+            raise ValueError(f'Checkpoint "{path}" is for {header.rule} rule')
+        if header.toroidal != life_grid.toroidal:
+            raise ValueError(f'Checkpoint "{path}" is for {"toroidal" if header.toroidal else "not toroidal"} grid')
+        cells_count = header.width * header.height
+        cell_types_offset = CELLS_OFFSET + cells_count * 4
+        if len(data) != cell_types_offset + cells_count:
+            raise ValueError(f'Checkpoint "{path}" is truncated')
+        with memoryview(data) as view:
+            life_grid._import_cells(view[cell_types_offset:], view[CELLS_OFFSET:cell_types_offset])
+    life_grid._cell_states = None
+    life_grid.generations_count = header.generations_count
+    life_grid.rng.setstate(header.random_state)
+    life_grid.logger.info(f'Generation #{header.generations_count - 1} loaded from "{path}"')
+    return header
@@ -0,0 +1,251 @@
+import os
+import sys
+import random
+import argparse
+import itertools
+import subprocess
+from typing import (
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from .logic import (
+    LifeGrid,
+    ENGINES,
+    GridEngine,
+    ClassicEvolutionStrategy,
+    MutationEvolutionStrategy,
+    Rule,
+    close_grid,
+    engine_class,
+)
+from .util import (
+    Logger,
+    quiet_logger,
+)
+
+
+class Case(NamedTuple):
+    evolution_strategy_class: type
+    width: int
+    height: int
+    toroidal: bool
+
+
+# Rules with births, survival and empty space behaving differently, including births on 0 neighbours
+RULES = ('life', 'highlife', 'seeds', 'B0/S8')
+SIZES = ((1, 1), (7, 3), (37, 23), (64, 64))
+# Generations when random births are made by click, at center and at corners of grid
+CLICKS_EVERY = 7
+
+
+def cases_of(sizes=SIZES, rules=RULES) -> List[Case]:
+    evolution_strategy_classes = [ClassicEvolutionStrategy.with_rule(Rule.parse(rule)) for rule in rules] \
+        + [MutationEvolutionStrategy]
+    return [Case(evolution_strategy_class, width, height, toroidal)
+            for evolution_strategy_class, (width, height), toroidal
+            in itertools.product(evolution_strategy_classes, sizes, (False, True))]
+
+
+def case_name(case: Case) -> str:
+    rule = getattr(case.evolution_strategy_class, 'rule', None)
+    strategy = f'classic {rule}' if issubclass(case.evolution_strategy_class, ClassicEvolutionStrategy) else 'mutation'
+    return f'{strategy} {case.width}x{case.height}{" toroidal" if case.toroidal else ""}'
+
+
+def generations(engine, case: Case, generations_count: int, seed: int):
+    # State of grid after fill and after every generation: cells with ages, statistics, hash and cell states.
+    # Randomness comes from generator of the grid only, so all engines draw the same numbers
+    life_grid = engine(case.evolution_strategy_class,
+                       case.width,
+                       case.height,
+                       0.4,
+                       0.5,
+                       3,
+                       quiet_logger(),
+                       toroidal=case.toroidal,
+                       rng=random.Random(seed))
+    try:
+        life_grid.fill_random()
+        for generation in range(generations_count + 1):
+            cell_types, ages = life_grid._export_cells()
+            yield bytes(cell_types), bytes(ages), life_grid.last_statistics, life_grid.state_hash, life_grid.cell_states()
+            if generation % CLICKS_EVERY == CLICKS_EVERY - 1:
+                for x, y in ((case.width // 2, case.height // 2), (0, 0), (case.width - 1, case.height - 1)):
+                    life_grid.make_random_birth(x, y)
+            life_grid.next_generation()
+    finally:
+        close_grid(life_grid)
+
+
+FIELDS = ('cells', 'ages', 'statistics', 'state hash', 'cell states')
+
+
+def compare(engine, case: Case, generations_count: int, seed: int) -> Optional[str]:
+    # Description of the first difference from reference engine, None when there is none
+    expected_generations = generations(LifeGrid, case, generations_count, seed)
+    actual_generations = generations(engine, case, generations_count, seed)
+    for generation, (expected, actual) in enumerate(zip(expected_generations, actual_generations)):
+        for field, expected_value, actual_value in zip(FIELDS, expected, actual):
+            if expected_value != actual_value:
+                return f'{field} differ at generation #{generation}'
+    return None
+
+
+def reference_step(alive: Set[Tuple[int, int]], rule: Rule, width: int, height: int, toroidal: bool) -> Set[Tuple[int, int]]:
+    # Brute-force stepper independent of engines, neighbours of every cell are counted one by one and
+    # rule is applied to them directly
+    future_alive = set()
+    for iv in range(height):
+        for ih in range(width):
+            alive_neighbours = 0
+            for dv, dh in itertools.product((-1, 0, 1), repeat=2):
+                if dv == 0 and dh == 0:
+                    continue
+                nv = iv + dv
+                nh = ih + dh
+                if toroidal:
+                    nv %= height
+                    nh %= width
+                elif not (0 <= nv < height and 0 <= nh < width):
+                    continue
+                alive_neighbours += (nv, nh) in alive
+            if rule.will_survive(alive_neighbours) if (iv, ih) in alive else rule.will_born(alive_neighbours):
+                future_alive.add((iv, ih))
+    return future_alive
+
+
+def compare_reference(case: Case, generations_count: int, seed: int) -> Optional[str]:
+    # Every generation of reference engine is checked against brute-force step of its previous generation,
+    # including ones changed by clicks. Only "classic" strategy is deterministic, so only it is checked
+    life_grid = LifeGrid(case.evolution_strategy_class,
+                         case.width,
+                         case.height,
+                         0.4,
+                         0.5,
+                         3,
+                         quiet_logger(),
+                         toroidal=case.toroidal,
+                         rng=random.Random(seed))
+    rule = case.evolution_strategy_class.rule
+    life_grid.fill_random()
+    for generation in range(generations_count):
+        if generation % CLICKS_EVERY == CLICKS_EVERY - 1:
+            for x, y in ((case.width // 2, case.height // 2), (0, 0), (case.width - 1, case.height - 1)):
+                life_grid.make_random_birth(x, y)
+        alive = set(life_grid.alive_coordinates())
+        expected_alive = reference_step(alive, rule, case.width, case.height, case.toroidal)
+        life_grid.next_generation()
+        if set(life_grid.alive_coordinates()) != expected_alive:
+            return f'cells differ at generation #{generation + 1}'
+        statistics = life_grid.last_statistics
+        survived_count = len(expected_alive & alive)
+        if (statistics.born, statistics.survived, statistics.died, statistics.alive) \
+                != (len(expected_alive) - survived_count, survived_count, len(alive) - survived_count, len(expected_alive)):
+            return f'statistics differ at generation #{generation + 1}'
+    return None
+
+
+# Modules importable without frontends and optional packages, and packages they must not load
+CORE_MODULES = ('newlifelib.logic', 'newlifelib.headless', 'newlifelib.streaming')
+FRONTEND_MODULES = ('PyQt5', 'colorama', 'numpy')
+IMPORT_RUNS = 5
+
+
+def measure_import(module: str, runs: int = IMPORT_RUNS) -> Dict:
+    # Every import is measured in fresh interpreter, the fastest run is the least disturbed one
+    code = f'import sys, time; time_start = time.perf_counter(); import {module}; ' \
+        'print(time.perf_counter() - time_start); print(" ".join(sys.modules))'
+    seconds = []
+    loaded_modules = set()
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', code],
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                capture_output=True,
+                                text=True,
+                                check=True).stdout.split('\n')
+        seconds.append(float(output[0]))
+        loaded_modules.update(output[1].split())
+    return {'seconds': min(seconds),
+            'frontend_modules': [name for name in FRONTEND_MODULES if name in loaded_modules]}
+
+
+def run(args, logger: Logger) -> int:
+    failures_count = 0
+    for module in CORE_MODULES:
+        result = measure_import(module)
+        if result['frontend_modules']:
+            failures_count += 1
+            logger.error(f'"{module}" imports {", ".join(result["frontend_modules"])}')
+        logger.info(f'"{module}" imported in {result["seconds"] * 1000:.1f} ms')
+    passed_count = 0
+    for case in cases_of():
+        if not issubclass(case.evolution_strategy_class, ClassicEvolutionStrategy):
+            continue
+        difference = compare_reference(case, args.generations, args.seed)
+        if difference is None:
+            passed_count += 1
+        else:
+            failures_count += 1
+            logger.error(f'"{GridEngine.PYTHON.value}" {case_name(case)}: {difference} from brute-force stepper')
+    logger.info(f'"{GridEngine.PYTHON.value}": {passed_count} case(s) same as brute-force stepper')
+    for name in args.engines:
+        try:
+            engine = engine_class(name)
+        except ImportError as e:
+            logger.warning(f'"{name}": not available, {e}')
+            continue
+        passed_count = 0
+        skipped_count = 0
+        for case in cases_of():
+            try:
+                difference = compare(engine, case, args.generations, args.seed)
+            except NotImplementedError as e:
+                skipped_count += 1
+                logger.debug(f'"{name}" {case_name(case)}: skipped, {str(e) or "not implemented"}')
+                continue
+            if difference is None:
+                passed_count += 1
+            else:
+                failures_count += 1
+                logger.error(f'"{name}" {case_name(case)}: {difference}')
+        logger.info(f'"{name}": {passed_count} case(s) same as "{GridEngine.PYTHON.value}" engine, {skipped_count} not supported')
+    return 1 if failures_count > 0 else 0
+
+
+def parse_command_line_args():
+    parser = argparse.ArgumentParser(description='Checks that grid engines give the same generations as reference one')
+    parser.add_argument('--engines',
+                        nargs='+',
+                        choices=list(ENGINES),
+                        default=[name for name in ENGINES if name not in (GridEngine.PYTHON.value, GridEngine.SPARSE.value)],
+                        help='Grid engines to check, "sparse" one has no edges, so cells leaving the grid differ there')
+    parser.add_argument('-n',
+                        '--generations',
+                        default=30,
+                        type=int,
+                        help='Generations to step in each case')
+    parser.add_argument('-s',
+                        '--seed',
+                        default=1,
+                        type=int,
+                        help='Random seed')
+    parser.add_argument('-d',
+                        '--debug',
+                        action='store_true',
+                        help='Enable debugging output')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_command_line_args()
+    logger = Logger(debug=args.debug)
+    return run(args, logger)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
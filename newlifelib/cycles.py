@@ -0,0 +1,69 @@
+from enum import Enum
+from collections import OrderedDict
+from typing import (
+    NamedTuple,
+    Optional,
+)
+
+from .logic import (
+    LifeGrid,
+    ClassicEvolutionStrategy,
+)
+from .util import Logger
+
+
+class CycleAction(Enum):
+    REPORT = 'report'
+    STOP = 'stop'
+    SKIP = 'skip'
+
+
+class Cycle(NamedTuple):
+    # Generation `generation` is the same as generation `generation - period`
+    generation: int
+    period: int
+
+
+class CycleDetector:
+    # Remembers hashes of last generations, repeated hash means the grid runs in cycle from then on,
+    # because classic generations depend only on alive cells. Periods up to history size are detected
+
+    DEFAULT_HISTORY_SIZE = 1024
+
+    def __init__(self,
+                 logger: Logger,
+                 history_size: int = DEFAULT_HISTORY_SIZE):
+        self.logger = logger
+        self.history_size = history_size
+        self.cycle: Optional[Cycle] = None
+        self._generations = OrderedDict()
+        self._last_generation = None
+
+    def attach(self, life_grid: LifeGrid):
+        if not isinstance(life_grid.evolution_strategy, ClassicEvolutionStrategy):
+            raise NotImplementedError('Cycles are detected only for "classic" evolution strategy, others are random')
+        self.observe(life_grid, life_grid.generations_count - 1)
+        life_grid.generation_listeners.append(self.observe)
+
+    def detach(self, life_grid: LifeGrid):
+        life_grid.generation_listeners.remove(self.observe)
+
+    def observe(self, life_grid: LifeGrid, generation: int):
+        if self.cycle is not None:
+            return
+        # Generations before jump are not followed by the ones after it, their history is forgotten
+        if self._last_generation is not None and generation != self._last_generation + 1:
+            self._generations.clear()
+        self._last_generation = generation
+        state_hash = life_grid.state_hash
+        previous_generation = self._generations.pop(state_hash, None)
+        self._generations[state_hash] = generation
+        if len(self._generations) > self.history_size:
+            self._generations.popitem(last=False)
+        if previous_generation is None:
+            return
+        self.cycle = Cycle(generation, generation - previous_generation)
+        if self.cycle.period == 1:
+            self.logger.info(f'Still life reached at generation #{previous_generation}')
+        else:
+            self.logger.info(f'Cycle of period {self.cycle.period} found, generation #{generation} repeats generation #{previous_generation}')
@@ -0,0 +1,253 @@
+import csv
+import sys
+import json
+import time
+import random
+import multiprocessing
+from enum import Enum
+from typing import (
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    TextIO,
+    Tuple,
+)
+
+from .logic import (
+    LifeGrid,
+    GenerationStatistics,
+    EvolutionStrategy,
+    Rule,
+    close_grid,
+    strategy_class,
+    statistics_total_ages,
+)
+from .metrics import (
+    MetricsFormat,
+    metrics_format_of,
+)
+from .util import (
+    Logger,
+    quiet_logger,
+)
+
+
+class EnsembleMode(Enum):
+    BATCH = 'batch'
+    POOL = 'pool'
+
+
+class Universe(NamedTuple):
+    seed: int
+    evolution_strategy: EvolutionStrategy
+    birth_probability: float
+
+
+class UniverseStatistics(NamedTuple):
+    # Row of ensemble result, statistics of one generation of one universe
+    universe: int
+    seed: int
+    evolution_strategy: str
+    birth_probability: float
+    generation: int
+    born: int
+    survived: int
+    died: int
+    alive: int
+    total_ages: int
+
+    @property
+    def average_age(self) -> float:
+        return self.total_ages / self.alive if self.alive > 0 else 0
+
+
+DEFAULT_BATCH_SIZE = 64
+
+
+def universes_of(seeds: Iterable[int],
+                 evolution_strategies: Iterable[EvolutionStrategy],
+                 birth_probabilities: Iterable[float]) -> List[Universe]:
+    # Every combination of parameters, seeds vary fastest
+    seeds = list(seeds)
+    birth_probabilities = list(birth_probabilities)
+    return [Universe(seed, evolution_strategy, birth_probability)
+            for evolution_strategy in evolution_strategies
+            for birth_probability in birth_probabilities
+            for seed in seeds]
+
+
+def run_universe(task) -> List[GenerationStatistics]:
+    # Runs one universe by its own grid, in pool worker process
+    engine, universe, width, height, generations, rule, toroidal = task
+    life_grid: LifeGrid = engine(strategy_class(universe.evolution_strategy, rule),
+                                 width,
+                                 height,
+                                 universe.birth_probability,
+                                 0,
+                                 1,
+                                 quiet_logger(),
+                                 toroidal=toroidal,
+                                 rng=random.Random(universe.seed))
+    life_grid.fill_random()
+    statistics = []
+    for _ in range(generations):
+        life_grid.next_generation()
+        statistics.append(life_grid.last_statistics)
+    close_grid(life_grid)
+    return statistics
+
+
+def batch_supported() -> bool:
+    # Batch mode stacks universes in NumPy arrays, without NumPy only pool mode works
+    try:
+        import numpy
+    except ImportError:
+        return False
+    return True
+
+
+def run_batch(universes: List[Universe],
+              width: int,
+              height: int,
+              generations: int,
+              rule: Optional[Rule] = None,
+              toroidal: bool = False) -> List[List[GenerationStatistics]]:
+    # "Classic" universes stacked into 3-D arrays, every generation of all of them is one vectorized pass.
+    # Universes are filled by `NumpyLifeGrid` with their seeds, so they are the same as separate runs
+    import numpy as np
+    from .numpy_grid import (
+        NumpyLifeGrid,
+        neighbour_counts,
+        rule_table,
+    )
+    if any(universe.evolution_strategy != EvolutionStrategy.CLASSIC for universe in universes):
+        raise NotImplementedError('Batch mode steps only "classic" universes, others need "pool" mode')
+    evolution_strategy_class = strategy_class(EvolutionStrategy.CLASSIC, rule)
+    # Next state by neighbours count of dead cells followed by ones of alive cells
+    transition_table = np.concatenate((rule_table(evolution_strategy_class.rule.will_born),
+                                       rule_table(evolution_strategy_class.rule.will_survive)))
+    logger = quiet_logger()
+    alive = np.zeros((len(universes), height, width), dtype=bool)
+    for index, universe in enumerate(universes):
+        life_grid = NumpyLifeGrid(evolution_strategy_class,
+                                  width,
+                                  height,
+                                  universe.birth_probability,
+                                  0,
+                                  1,
+                                  logger,
+                                  toroidal=toroidal,
+                                  rng=random.Random(universe.seed))
+        life_grid.fill_random()
+        alive[index] = life_grid.alive
+    ages = np.zeros(alive.shape, dtype=np.int32)
+    # Born, survived, died, alive and total ages of every universe in every generation
+    statistics = np.zeros((len(universes), generations, 5), dtype=np.int64)
+    for generation in range(generations):
+        future_alive = np.take(transition_table, neighbour_counts(alive, toroidal) + alive.view(np.uint8) * np.uint8(9))
+        survived = alive & future_alive
+        born_counts = np.count_nonzero(future_alive, axis=(1, 2)) - np.count_nonzero(survived, axis=(1, 2))
+        survived_counts = np.count_nonzero(survived, axis=(1, 2))
+        ages += 1
+        ages *= survived
+        statistics[:, generation, 0] = born_counts
+        statistics[:, generation, 1] = survived_counts
+        statistics[:, generation, 2] = np.count_nonzero(alive, axis=(1, 2)) - survived_counts
+        statistics[:, generation, 3] = born_counts + survived_counts
+        statistics[:, generation, 4] = statistics_total_ages(ages.sum(axis=(1, 2), dtype=np.int64), born_counts)
+        alive = future_alive
+    # Generation #0 is random fill, as in grids stepped one by one
+    return [[GenerationStatistics(generation + 1, *row) for generation, row in enumerate(universe_statistics)]
+            for universe_statistics in statistics.tolist()]
+
+
+def run(universes: List[Universe],
+        width: int,
+        height: int,
+        generations: int,
+        logger: Logger,
+        mode: EnsembleMode = None,
+        rule: Optional[Rule] = None,
+        toroidal: bool = False,
+        engine=LifeGrid,
+        workers: int = None,
+        batch_size: int = DEFAULT_BATCH_SIZE) -> List[UniverseStatistics]:
+    # Steps all universes for `generations` generations, in batches of at most `batch_size` universes
+    # or by `engine` grids in pool of `workers` processes. Mode is batch when all universes are
+    # "classic" and NumPy is available by default. Statistics of all of them are returned as one table
+    if mode is None:
+        mode = EnsembleMode.BATCH \
+            if all(universe.evolution_strategy == EvolutionStrategy.CLASSIC for universe in universes) and batch_supported() \
+            else EnsembleMode.POOL
+    time_start = time.perf_counter()
+    if mode == EnsembleMode.BATCH:
+        universes_statistics = []
+        for batch_from in range(0, len(universes), batch_size):
+            universes_statistics.extend(run_batch(universes[batch_from:batch_from + batch_size],
+                                                  width,
+                                                  height,
+                                                  generations,
+                                                  rule,
+                                                  toroidal))
+    elif mode == EnsembleMode.POOL:
+        tasks = [(engine, universe, width, height, generations, rule, toroidal) for universe in universes]
+        with multiprocessing.Pool(workers) as pool:
+            universes_statistics = pool.map(run_universe, tasks)
+    else:
+        raise NotImplementedError
+    elapsed = time.perf_counter() - time_start
+    if elapsed > 0:
+        logger.info(f'{len(universes)} universe(s) of {width}x{height} cells stepped {generations} generation(s) in {mode.value} mode in {elapsed:.3f} s: {len(universes) * generations / elapsed:.2f} universe generations/s')
+    return [UniverseStatistics(index, universe.seed, universe.evolution_strategy.value, universe.birth_probability, *statistics)
+            for index, (universe, universe_statistics) in enumerate(zip(universes, universes_statistics))
+            for statistics in universe_statistics]
+
+
+def write_statistics(rows: List[UniverseStatistics], f: TextIO, metrics_format: MetricsFormat = MetricsFormat.CSV):
+    if metrics_format == MetricsFormat.CSV:
+        csv_writer = csv.writer(f)
+        csv_writer.writerow(UniverseStatistics._fields + ('average_age',))
+        csv_writer.writerows(row + (f'{row.average_age:.3f}',) for row in rows)
+    elif metrics_format == MetricsFormat.JSON_LINES:
+        f.writelines(json.dumps(dict(row._asdict(), average_age=round(row.average_age, 3))) + '\n' for row in rows)
+    else:
+        raise NotImplementedError
+
+
+def log_summary(rows: List[UniverseStatistics], width: int, height: int, logger: Logger):
+    # Final density and average age of every parameters combination, averaged over its seeds
+    last_rows: Dict[int, UniverseStatistics] = {}
+    for row in rows:
+        last_rows[row.universe] = row
+    groups: Dict[Tuple[str, float], List[UniverseStatistics]] = {}
+    for row in last_rows.values():
+        groups.setdefault((row.evolution_strategy, row.birth_probability), []).append(row)
+    for (evolution_strategy, birth_probability), group in groups.items():
+        density = sum(row.alive for row in group) / len(group) / (width * height) * 100 if width * height > 0 else 0
+        average_age = sum(row.average_age for row in group) / len(group)
+        logger.info(f'"{evolution_strategy}" at {birth_probability} birth probability: {density:.2f}% average final density, {average_age:.3f} average age over {len(group)} universe(s)')
+
+
+def run_command(args, logger: Logger) -> int:
+    universes = universes_of(range(args.seed, args.seed + args.seeds), args.evolution_strategies, args.birth_probabilities)
+    rows = run(universes,
+               args.width,
+               args.height,
+               args.generations,
+               logger,
+               mode=args.mode,
+               rule=args.rule,
+               toroidal=args.toroidal,
+               engine=args.engine,
+               workers=args.workers,
+               batch_size=args.batch_size)
+    log_summary(rows, args.width, args.height, logger)
+    if args.output == '-':
+        write_statistics(rows, sys.stdout, args.statistics_format or MetricsFormat.CSV)
+    else:
+        with open(args.output, 'w', newline='') as f:
+            write_statistics(rows, f, args.statistics_format or metrics_format_of(args.output))
+        logger.info(f'Statistics of {len(rows)} generation(s) of {len(universes)} universe(s) written to "{args.output}"')
+    return 0
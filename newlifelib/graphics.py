@@ -1,9 +1,12 @@
-from enum import Enum
+import math
+import time
 
 from PyQt5.QtWidgets import QMainWindow, QApplication
 from PyQt5.QtGui import (
     QPainter,
     QBrush,
+    QColor,
+    QImage,
 )
 from PyQt5 import QtGui
 from PyQt5.QtCore import (
@@ -11,23 +14,56 @@ from PyQt5.QtCore import (
     QPoint,
 )
 
-from newlifelib.logic import *
-
-
-class ColorMode(Enum):
-    MONOCHROME = 'monochrome'
-    COLOR = 'color'
+from .logic import (
+    CellState,
+    ColorMode,
+    ClassicEvolutionStrategy,
+    MutationEvolutionStrategy,
+    TypicalCell,
+    StandaloneCell,
+    SuperStandaloneCell,
+    SociableCell,
+    SuperSociableCell,
+    StandaloneAndSociableCell,
+    SuperStandaloneAndSociableCell,
+)
+from . import checkpoint
+from .recording import (
+    Recorder,
+    Replay,
+)
+from .simulation import (
+    Simulation,
+    GenerationSnapshot,
+)
+from .streaming import StreamViewer
+from .metrics import MetricsCollector
+from .profiling import (
+    Phase,
+    Profiler,
+)
 
 
 class LifeWindow(QMainWindow):
 
+    # Seconds between updates of profiling overlay text
+    OVERLAY_PERIOD = 0.5
+    # Cell size is doubled or halved by every wheel step within these limits
+    MIN_CELL_SIZE = 1
+    MAX_CELL_SIZE = 64
+    # Part of window panned by arrow keys
+    PAN_FRACTION = 0.25
+    # Difference of gray shades of consecutive cell classes in monochrome mode
+    MONOCHROME_SHADE_STEP = 25
+
     def __init__(self,
                  args,
                  logger):
         super().__init__()
         self.cell_size = args.cell_size
         self.color_mode = args.color_mode
-        if args.fullscreen or args.maximized:
+        # Size of loaded, replayed or streamed grid is defined by its source, not by screen
+        if (args.fullscreen or args.maximized) and not args.load and not args.replay and not args.connect:
             if args.use_primary_screen:
                 geometry = QApplication.instance().primaryScreen().availableGeometry()
             else:
@@ -37,14 +73,23 @@ class LifeWindow(QMainWindow):
         else:
             grid_width = args.width
             grid_height = args.height
-        self.life_grid = LifeGrid(args.evolution_strategy,
-                                  grid_width,
-                                  grid_height,
-                                  args.birth_probability,
-                                  args.click_birth_probability,
-                                  args.click_birth_radius,
-                                  logger)
-        self.life_grid.fill_random()
+        self.life_grid = args.engine(args.evolution_strategy,
+                                     grid_width,
+                                     grid_height,
+                                     args.birth_probability,
+                                     args.click_birth_probability,
+                                     args.click_birth_radius,
+                                     logger,
+                                     toroidal=args.toroidal,
+                                     rng=args.rng)
+        self.life_grid.hashlife_memory_mb = args.hashlife_memory_mb
+        self.jump_generations = args.jump_generations
+        # On replay and on viewing stream the grid only defines size and look of cells, it isn't filled and stepped
+        if args.load:
+            checkpoint.load(self.life_grid, args.load)
+        elif not args.replay and not args.connect:
+            self.life_grid.fill_random()
+            self.life_grid.advance(self.jump_generations)
         self.title = 'New Life'
         self.top = 0
         self.left = 0
@@ -52,6 +97,45 @@ class LifeWindow(QMainWindow):
         self.height = self.life_grid.height
         self.fullscreen = args.fullscreen
         self.maximized = args.maximized
+        # Frame is rendered off-screen and only cells changed since previous frame are redrawn on it
+        self._frame = QImage(self.life_grid.width * self.cell_size,
+                             self.life_grid.height * self.cell_size,
+                             QImage.Format_RGB32)
+        self._frame.fill(Qt.black)
+        self._frame_snapshot = GenerationSnapshot(None, {})
+        self._sprites = {}
+        # Grid coordinates of the top left cell of window, window shows grid from there on, it is
+        # panned by dragging with right or middle button and by arrow keys, and zoomed by wheel
+        self.viewport_top = 0
+        self.viewport_left = 0
+        self._drag_start = None
+        self.recorder = None
+        self.metrics_collector = None
+        self.profiler = Profiler(logger, args.profile_dump) if args.profile else None
+        self._overlay_lines = []
+        self._overlay_time = 0
+        if args.replay:
+            self.simulation = Replay(args.replay, args.period_milliseconds, logger, args.replay_from)
+        elif args.connect:
+            self.simulation = StreamViewer(args.connect, logger)
+        else:
+            if args.record:
+                self.recorder = Recorder(args.record, self.life_grid.width, self.life_grid.height, logger, args.keyframe_every)
+                self.recorder.attach(self.life_grid)
+            self.metrics_collector = MetricsCollector(logger, args.dump_statistics, args.statistics_format, args.metrics_every)
+            self.metrics_collector.attach(self.life_grid)
+            self.simulation = Simulation(self.life_grid,
+                                         args.period_milliseconds,
+                                         logger,
+                                         checkpoint_path=args.save,
+                                         checkpoint_every=args.checkpoint_every)
+        if self.profiler is not None:
+            self.profiler.start()
+            self.simulation.profiler = self.profiler
+            if self.simulation.life_grid is not None:
+                self.profiler.instrument(self.simulation.life_grid, 'next_generation', Phase.STEP)
+                self.profiler.instrument(self.simulation.life_grid, 'make_random_birth', Phase.BIRTH)
+            self.profiler.instrument(self.simulation, 'publish_snapshot', Phase.SNAPSHOT)
         self.InitWindow()
 
     def InitWindow(self):
@@ -68,107 +152,241 @@ class LifeWindow(QMainWindow):
             self.show()
 
     def mousePressEvent(self, a0: QtGui.QMouseEvent) -> None:
-        self.life_grid.make_random_birth(int(a0.x() / self.cell_size),
-                                         int(a0.y() / self.cell_size))
+        if a0.button() == Qt.LeftButton:
+            self.simulation.request_birth(self.viewport_left + int(a0.x() / self.cell_size),
+                                          self.viewport_top + int(a0.y() / self.cell_size))
+        else:
+            self._drag_start = (a0.x(), a0.y(), self.viewport_left, self.viewport_top)
+
+    def mouseMoveEvent(self, a0: QtGui.QMouseEvent) -> None:
+        if self._drag_start is None:
+            return
+        x, y, left, top = self._drag_start
+        self._move_viewport(left - int((a0.x() - x) / self.cell_size),
+                            top - int((a0.y() - y) / self.cell_size))
+
+    def mouseReleaseEvent(self, a0: QtGui.QMouseEvent) -> None:
+        if a0.button() != Qt.LeftButton:
+            self._drag_start = None
+
+    def wheelEvent(self, a0: QtGui.QWheelEvent) -> None:
+        if a0.angleDelta().y() > 0:
+            cell_size = min(self.cell_size * 2, self.MAX_CELL_SIZE)
+        elif a0.angleDelta().y() < 0:
+            cell_size = max(self.cell_size // 2, self.MIN_CELL_SIZE)
+        else:
+            return
+        if cell_size == self.cell_size:
+            return
+        # Cell under cursor stays under it
+        position = a0.position()
+        column = self.viewport_left + position.x() / self.cell_size
+        row = self.viewport_top + position.y() / self.cell_size
+        self.cell_size = cell_size
+        self._sprites = {}
+        self._move_viewport(int(column - position.x() / cell_size), int(row - position.y() / cell_size))
+
+    def keyPressEvent(self, a0: QtGui.QKeyEvent) -> None:
+        pan_columns = max(int(self._frame.width() / self.cell_size * self.PAN_FRACTION), 1)
+        pan_rows = max(int(self._frame.height() / self.cell_size * self.PAN_FRACTION), 1)
+        if a0.key() == Qt.Key_J:
+            self.simulation.request_jump(self.jump_generations)
+        elif a0.key() == Qt.Key_Left:
+            self._move_viewport(self.viewport_left - pan_columns, self.viewport_top)
+        elif a0.key() == Qt.Key_Right:
+            self._move_viewport(self.viewport_left + pan_columns, self.viewport_top)
+        elif a0.key() == Qt.Key_Up:
+            self._move_viewport(self.viewport_left, self.viewport_top - pan_rows)
+        elif a0.key() == Qt.Key_Down:
+            self._move_viewport(self.viewport_left, self.viewport_top + pan_rows)
+        elif a0.key() == Qt.Key_Home:
+            self._move_viewport(0, 0)
+
+    def resizeEvent(self, a0: QtGui.QResizeEvent) -> None:
+        self._frame = QImage(a0.size(), QImage.Format_RGB32)
+        self._invalidate_frame()
+        super().resizeEvent(a0)
+
+    def _move_viewport(self, left: int, top: int):
+        self.viewport_left = left
+        self.viewport_top = top
+        self._invalidate_frame()
+
+    def _invalidate_frame(self):
+        # Whole frame is redrawn from the next snapshot, not only cells changed since drawn one
+        self._frame.fill(Qt.black)
+        self._frame_snapshot = GenerationSnapshot(None, {})
+        self.update()
+
+    def closeEvent(self, a0: QtGui.QCloseEvent) -> None:
+        self.simulation.stop()
+        if self.metrics_collector is not None:
+            self.metrics_collector.close()
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.profiler is not None:
+            self.profiler.close()
+        super().closeEvent(a0)
 
     def paintEvent(self, event):
+        if self.profiler is None:
+            self._paint()
+            return
+        with self.profiler.timing(Phase.PAINT):
+            self._paint()
+        self._paint_overlay()
+
+    def _paint(self):
+        snapshot = self.simulation.take_snapshot()
+        if snapshot is not self._frame_snapshot:
+            self._update_frame(snapshot)
         painter = QPainter()
         painter.begin(self)
-        painter.setBrush(QBrush(Qt.black))
-        painter.drawRect(0,
-                         0,
-                         self.life_grid.width * self.cell_size,
-                         self.life_grid.height * self.cell_size)
-        for iv in range(self.life_grid.height):
-            for ih in range(self.life_grid.width):
-                current_cell = self.life_grid.cells[iv][ih]
-                if current_cell is None:
-                    continue
-                state = current_cell.state
-
-                if self.color_mode == ColorMode.MONOCHROME:
-                    if isinstance(self.life_grid.evolution_strategy, ClassicEvolutionStrategy):
-                        if state in (CellState.NEWBORN,
-                                     CellState.GROWN,
-                                     CellState.MATURE,
-                                     CellState.LONG_LIVING):
-                            primary_color = Qt.white
-                            secondary_color = Qt.gray
-                        elif state == CellState.DYING:
-                            primary_color = Qt.black
-                            secondary_color = Qt.black
-                        else:
-                            raise NotImplementedError
-                    elif isinstance(self.life_grid.evolution_strategy, MutationEvolutionStrategy):
-                        # TODO: Implement
-                        raise NotImplementedError
-                    else:
-                        raise NotImplementedError
-                elif self.color_mode == ColorMode.COLOR:
-                    if isinstance(self.life_grid.evolution_strategy, ClassicEvolutionStrategy):
-                        if state == CellState.NEWBORN:
-                            primary_color = Qt.green
-                            secondary_color = Qt.white
-                        elif state == CellState.GROWN:
-                            primary_color = Qt.blue
-                            secondary_color = Qt.white
-                        elif state == CellState.MATURE:
-                            primary_color = Qt.cyan
-                            secondary_color = Qt.white
-                        elif state == CellState.LONG_LIVING:
-                            primary_color = Qt.yellow
-                            secondary_color = Qt.white
-                        elif state == CellState.DYING:
-                            primary_color = Qt.red
-                            secondary_color = Qt.white
-                        else:
-                            raise NotImplementedError
-                    elif isinstance(self.life_grid.evolution_strategy, MutationEvolutionStrategy):
-                        if state == CellState.NEWBORN:
-                            secondary_color = Qt.green
-                        elif state == CellState.GROWN:
-                            secondary_color = Qt.blue
-                        elif state == CellState.MATURE:
-                            secondary_color = Qt.cyan
-                        elif state == CellState.LONG_LIVING:
-                            secondary_color = Qt.yellow
-                        elif state == CellState.DYING:
-                            secondary_color = Qt.red
-                        else:
-                            raise NotImplementedError
-                        if isinstance(current_cell, TypicalCell):
-                            primary_color = Qt.gray
-                        elif isinstance(current_cell, StandaloneCell):
-                            primary_color = Qt.darkMagenta
-                        elif isinstance(current_cell, SociableCell):
-                            primary_color = Qt.darkCyan
-                        elif isinstance(current_cell, StandaloneAndSociableCell):
-                            primary_color = Qt.darkYellow
-                        elif isinstance(current_cell, SuperStandaloneCell):
-                            primary_color = Qt.darkBlue
-                        elif isinstance(current_cell, SuperSociableCell):
-                            primary_color = Qt.darkGreen
-                        elif isinstance(current_cell, SuperStandaloneAndSociableCell):
-                            primary_color = Qt.white
-                        else:
-                            raise NotImplementedError
-                    else:
-                        raise NotImplementedError
+        painter.drawImage(0, 0, self._frame)
+        painter.end()
+
+    def _paint_overlay(self):
+        # Text is rebuilt twice a second, so percentiles aren't sorted on every frame
+        now = time.perf_counter()
+        if now - self._overlay_time >= self.OVERLAY_PERIOD:
+            timers = self.profiler.timers
+            self._overlay_lines = [f'{timers[Phase.PAINT].rate(now):.1f} FPS, {timers[Phase.STEP].rate(now):.1f} generations/s']
+            self._overlay_lines.extend(self.profiler.summary(phase) for phase in Phase if timers[phase].count > 0)
+            self._overlay_time = now
+        painter = QPainter()
+        painter.begin(self)
+        line_height = painter.fontMetrics().height()
+        painter.fillRect(0, 0, max(painter.fontMetrics().horizontalAdvance(line) for line in self._overlay_lines) + 8,
+                         line_height * len(self._overlay_lines) + 8, QColor(0, 0, 0, 160))
+        painter.setPen(Qt.white)
+        for index, line in enumerate(self._overlay_lines):
+            painter.drawText(4, 4 + line_height * index + painter.fontMetrics().ascent(), line)
+        painter.end()
+
+    def _update_frame(self, snapshot: GenerationSnapshot):
+        # Snapshot has all alive cells, only ones inside viewport are drawn
+        drawn_cells = self._frame_snapshot.cells
+        cell_size = self.cell_size
+        top = self.viewport_top
+        left = self.viewport_left
+        rows_count = math.ceil(self._frame.height() / cell_size)
+        columns_count = math.ceil(self._frame.width() / cell_size)
+        painter = QPainter()
+        painter.begin(self._frame)
+        for (iv, ih), sprite_key in snapshot.cells.items():
+            if drawn_cells.get((iv, ih)) != sprite_key and 0 <= iv - top < rows_count and 0 <= ih - left < columns_count:
+                painter.drawImage((ih - left) * cell_size, (iv - top) * cell_size, self._sprite(sprite_key))
+        for iv, ih in drawn_cells.keys() - snapshot.cells.keys():
+            if 0 <= iv - top < rows_count and 0 <= ih - left < columns_count:
+                painter.fillRect((ih - left) * cell_size, (iv - top) * cell_size, cell_size, cell_size, Qt.black)
+        painter.end()
+        self._frame_snapshot = snapshot
+
+    def _sprite(self, sprite_key) -> QImage:
+        sprite = self._sprites.get(sprite_key)
+        if sprite is not None:
+            return sprite
+        primary_color, secondary_color = self._cell_colors(*sprite_key)
+        sprite = QImage(self.cell_size, self.cell_size, QImage.Format_RGB32)
+        sprite.fill(Qt.black)
+        painter = QPainter()
+        painter.begin(sprite)
+        if self.cell_size < 4:
+            # Too small for circles, whole cell is painted with primary color
+            painter.fillRect(0, 0, self.cell_size, self.cell_size, primary_color)
+        else:
+            center = QPoint(self.cell_size // 2, self.cell_size // 2)
+            painter.setBrush(QBrush(secondary_color))
+            painter.drawEllipse(center,
+                                math.ceil(self.cell_size / 2) - 1,
+                                math.ceil(self.cell_size / 2) - 1)
+            painter.setBrush(QBrush(primary_color))
+            painter.drawEllipse(center,
+                                math.ceil(self.cell_size / 4),
+                                math.ceil(self.cell_size / 4))
+        painter.end()
+        self._sprites[sprite_key] = sprite
+        return sprite
+
+    def _cell_colors(self, cell_class, state: CellState):
+        if self.color_mode == ColorMode.MONOCHROME:
+            if isinstance(self.life_grid.evolution_strategy, ClassicEvolutionStrategy):
+                if state in (CellState.NEWBORN,
+                             CellState.GROWN,
+                             CellState.MATURE,
+                             CellState.LONG_LIVING):
+                    primary_color = Qt.white
+                    secondary_color = Qt.gray
+                elif state == CellState.DYING:
+                    primary_color = Qt.black
+                    secondary_color = Qt.black
                 else:
                     raise NotImplementedError
-
-                if isinstance(self.life_grid.evolution_strategy, ClassicEvolutionStrategy) \
-                        or isinstance(self.life_grid.evolution_strategy, MutationEvolutionStrategy):
-                    painter.setBrush(QBrush(secondary_color))
-                    painter.drawEllipse(QPoint(ih * self.cell_size - math.ceil(self.cell_size / 2),
-                                               iv * self.cell_size - math.ceil(self.cell_size / 2)),
-                                        math.ceil(self.cell_size / 2) - 1,
-                                        math.ceil(self.cell_size / 2) - 1)
-                    painter.setBrush(QBrush(primary_color))
-                    painter.drawEllipse(QPoint(ih * self.cell_size - math.ceil(self.cell_size / 2),
-                                               iv * self.cell_size - math.ceil(self.cell_size / 2)),
-                                        math.ceil(self.cell_size / 4),
-                                        math.ceil(self.cell_size / 4))
+            elif isinstance(self.life_grid.evolution_strategy, MutationEvolutionStrategy):
+                # Classes are told apart by shade of gray, the lower code the lighter, dying cells have black ring
+                shade = 255 - (cell_class.code - 1) * self.MONOCHROME_SHADE_STEP
+                primary_color = QColor(shade, shade, shade)
+                if state in (CellState.NEWBORN,
+                             CellState.GROWN,
+                             CellState.MATURE,
+                             CellState.LONG_LIVING):
+                    secondary_color = Qt.gray
+                elif state == CellState.DYING:
+                    secondary_color = Qt.black
                 else:
                     raise NotImplementedError
-        painter.end()
+            else:
+                raise NotImplementedError
+        elif self.color_mode == ColorMode.COLOR:
+            if isinstance(self.life_grid.evolution_strategy, ClassicEvolutionStrategy):
+                if state == CellState.NEWBORN:
+                    primary_color = Qt.green
+                    secondary_color = Qt.white
+                elif state == CellState.GROWN:
+                    primary_color = Qt.blue
+                    secondary_color = Qt.white
+                elif state == CellState.MATURE:
+                    primary_color = Qt.cyan
+                    secondary_color = Qt.white
+                elif state == CellState.LONG_LIVING:
+                    primary_color = Qt.yellow
+                    secondary_color = Qt.white
+                elif state == CellState.DYING:
+                    primary_color = Qt.red
+                    secondary_color = Qt.white
+                else:
+                    raise NotImplementedError
+            elif isinstance(self.life_grid.evolution_strategy, MutationEvolutionStrategy):
+                if state == CellState.NEWBORN:
+                    secondary_color = Qt.green
+                elif state == CellState.GROWN:
+                    secondary_color = Qt.blue
+                elif state == CellState.MATURE:
+                    secondary_color = Qt.cyan
+                elif state == CellState.LONG_LIVING:
+                    secondary_color = Qt.yellow
+                elif state == CellState.DYING:
+                    secondary_color = Qt.red
+                else:
+                    raise NotImplementedError
+                if issubclass(cell_class, TypicalCell):
+                    primary_color = Qt.gray
+                elif issubclass(cell_class, StandaloneCell):
+                    primary_color = Qt.darkMagenta
+                elif issubclass(cell_class, SociableCell):
+                    primary_color = Qt.darkCyan
+                elif issubclass(cell_class, StandaloneAndSociableCell):
+                    primary_color = Qt.darkYellow
+                elif issubclass(cell_class, SuperStandaloneCell):
+                    primary_color = Qt.darkBlue
+                elif issubclass(cell_class, SuperSociableCell):
+                    primary_color = Qt.darkGreen
+                elif issubclass(cell_class, SuperStandaloneAndSociableCell):
+                    primary_color = Qt.white
+                else:
+                    raise NotImplementedError
+            else:
+                raise NotImplementedError
+        else:
+            raise NotImplementedError
+        return primary_color, secondary_color
@@ -0,0 +1,209 @@
+from collections import OrderedDict
+from typing import (
+    Callable,
+    Iterable,
+    Iterator,
+    Optional,
+    Tuple,
+)
+
+
+class Node:
+    # Quadtree node of level `level` covering 2^level x 2^level square,
+    # level 0 nodes are single cells
+    __slots__ = ('nw', 'ne', 'sw', 'se', 'level', 'population', 'results')
+
+    def __init__(self,
+                 nw: Optional['Node'],
+                 ne: Optional['Node'],
+                 sw: Optional['Node'],
+                 se: Optional['Node'],
+                 level: int,
+                 population: int):
+        self.nw = nw
+        self.ne = ne
+        self.sw = sw
+        self.se = se
+        self.level = level
+        self.population = population
+        # Memoized successors by log2 of generations count
+        self.results = None
+
+
+class HashLife:
+
+    DEFAULT_MEMORY_MB = 256
+    # Rough size of canonical node together with its key and cache bookkeeping
+    NODE_SIZE_ESTIMATE = 400
+    MIN_NODES = 1024
+
+    def __init__(self,
+                 survive_rule: Callable[[int], bool],
+                 birth_rule: Callable[[int], bool],
+                 max_memory_mb: float = DEFAULT_MEMORY_MB):
+        self._survive_table = [bool(survive_rule(n)) for n in range(9)]
+        self._birth_table = [bool(birth_rule(n)) for n in range(9)]
+        self.max_nodes = max(int(max_memory_mb * 1024 * 1024 / self.NODE_SIZE_ESTIMATE), self.MIN_NODES)
+        self.evictions_count = 0
+        self._nodes = OrderedDict()
+        self._dead = Node(None, None, None, None, 0, 0)
+        self._alive = Node(None, None, None, None, 0, 1)
+        self._empty_nodes = [self._dead]
+
+    @property
+    def nodes_count(self) -> int:
+        return len(self._nodes)
+
+    def join(self, nw: Node, ne: Node, sw: Node, se: Node) -> Node:
+        key = (nw, ne, sw, se)
+        node = self._nodes.get(key)
+        if node is not None:
+            self._nodes.move_to_end(key)
+            return node
+        node = Node(nw, ne, sw, se, nw.level + 1, nw.population + ne.population + sw.population + se.population)
+        self._nodes[key] = node
+        if len(self._nodes) > self.max_nodes:
+            # Evicted node stays valid for trees still referencing it, it only stops being shared
+            _, evicted = self._nodes.popitem(last=False)
+            evicted.results = None
+            self.evictions_count += 1
+        return node
+
+    def empty(self, level: int) -> Node:
+        while len(self._empty_nodes) <= level:
+            smaller = self._empty_nodes[-1]
+            self._empty_nodes.append(self.join(smaller, smaller, smaller, smaller))
+        return self._empty_nodes[level]
+
+    def from_coordinates(self,
+                         coordinates: Iterable[Tuple[int, int]],
+                         height: int,
+                         width: int) -> Node:
+        level = 3
+        while 2 ** level < max(height, width):
+            level += 1
+        return self._build(level, 0, 0, list(coordinates))
+
+    def _build(self, level: int, top: int, left: int, coordinates) -> Node:
+        if not coordinates:
+            return self.empty(level)
+        if level == 0:
+            return self._alive
+        half = 2 ** (level - 1)
+        quadrants = ([], [], [], [])
+        for iv, ih in coordinates:
+            quadrants[(2 if iv >= top + half else 0) + (1 if ih >= left + half else 0)].append((iv, ih))
+        return self.join(self._build(level - 1, top, left, quadrants[0]),
+                         self._build(level - 1, top, left + half, quadrants[1]),
+                         self._build(level - 1, top + half, left, quadrants[2]),
+                         self._build(level - 1, top + half, left + half, quadrants[3]))
+
+    def coordinates(self,
+                    node: Node,
+                    top: int,
+                    left: int,
+                    height: int,
+                    width: int) -> Iterator[Tuple[int, int]]:
+        # Alive cells of the tree placed at (top, left) which fall into [0, height) x [0, width) window
+        if node.population == 0:
+            return
+        size = 2 ** node.level
+        if top >= height or left >= width or top + size <= 0 or left + size <= 0:
+            return
+        if node.level == 0:
+            yield top, left
+            return
+        half = size // 2
+        yield from self.coordinates(node.nw, top, left, height, width)
+        yield from self.coordinates(node.ne, top, left + half, height, width)
+        yield from self.coordinates(node.sw, top + half, left, height, width)
+        yield from self.coordinates(node.se, top + half, left + half, height, width)
+
+    def advance(self,
+                node: Node,
+                top: int,
+                left: int,
+                n_generations: int) -> Tuple[Node, int, int]:
+        # Evolves the tree on unbounded plane, returns new tree with its new top left corner
+        j = n_generations.bit_length() - 1
+        while j >= 0:
+            if n_generations & (1 << j):
+                while node.level < j + 3 or not self._is_padded(node):
+                    node, top, left = self._pad(node, top, left)
+                offset = 2 ** (node.level - 2)
+                node = self._successor(node, j)
+                top += offset
+                left += offset
+            j -= 1
+        return node, top, left
+
+    def _is_padded(self, node: Node) -> bool:
+        # Whole population is inside central quarter, so it can't leave the result of successor
+        inner_population = node.nw.se.se.population + node.ne.sw.sw.population \
+            + node.sw.ne.ne.population + node.se.nw.nw.population
+        return inner_population == node.population
+
+    def _pad(self, node: Node, top: int, left: int) -> Tuple[Node, int, int]:
+        empty = self.empty(node.level - 1)
+        padded = self.join(self.join(empty, empty, empty, node.nw),
+                           self.join(empty, empty, node.ne, empty),
+                           self.join(empty, node.sw, empty, empty),
+                           self.join(node.se, empty, empty, empty))
+        offset = 2 ** (node.level - 1)
+        return padded, top - offset, left - offset
+
+    def _successor(self, node: Node, j: int) -> Node:
+        # Central half of the node advanced by 2^j generations, j <= level - 2
+        if node.population == 0:
+            return self.empty(node.level - 1)
+        j = min(j, node.level - 2)
+        if node.results is not None and j in node.results:
+            return node.results[j]
+        if node.level == 2:
+            result = self._life_4x4(node)
+        else:
+            nw, ne, sw, se = node.nw, node.ne, node.sw, node.se
+            sub_nodes = (nw,
+                         self.join(nw.ne, ne.nw, nw.se, ne.sw),
+                         ne,
+                         self.join(nw.sw, nw.se, sw.nw, sw.ne),
+                         self.join(nw.se, ne.sw, sw.ne, se.nw),
+                         self.join(ne.sw, ne.se, se.nw, se.ne),
+                         sw,
+                         self.join(sw.ne, se.nw, sw.se, se.sw),
+                         se)
+            r1, r2, r3, r4, r5, r6, r7, r8, r9 = [self._successor(sub_node, j) for sub_node in sub_nodes]
+            if j < node.level - 2:
+                result = self.join(self.join(r1.se, r2.sw, r4.ne, r5.nw),
+                                   self.join(r2.se, r3.sw, r5.ne, r6.nw),
+                                   self.join(r4.se, r5.sw, r7.ne, r8.nw),
+                                   self.join(r5.se, r6.sw, r8.ne, r9.nw))
+            else:
+                result = self.join(self._successor(self.join(r1, r2, r4, r5), j),
+                                   self._successor(self.join(r2, r3, r5, r6), j),
+                                   self._successor(self.join(r4, r5, r7, r8), j),
+                                   self._successor(self.join(r5, r6, r8, r9), j))
+        if node.results is None:
+            node.results = {}
+        node.results[j] = result
+        return result
+
+    def _life_4x4(self, node: Node) -> Node:
+        cells = [[0] * 4 for _ in range(4)]
+        for quadrant, dv, dh in ((node.nw, 0, 0), (node.ne, 0, 2), (node.sw, 2, 0), (node.se, 2, 2)):
+            cells[dv][dh] = quadrant.nw.population
+            cells[dv][dh + 1] = quadrant.ne.population
+            cells[dv + 1][dh] = quadrant.sw.population
+            cells[dv + 1][dh + 1] = quadrant.se.population
+        future = []
+        for iv in (1, 2):
+            for ih in (1, 2):
+                alive_neighbours = sum(cells[v][h]
+                                       for v in range(iv - 1, iv + 2)
+                                       for h in range(ih - 1, ih + 2)) - cells[iv][ih]
+                if cells[iv][ih]:
+                    alive = self._survive_table[alive_neighbours]
+                else:
+                    alive = self._birth_table[alive_neighbours]
+                future.append(self._alive if alive else self._dead)
+        return self.join(*future)
@@ -0,0 +1,105 @@
+import time
+
+from .logic import LifeGrid
+from .util import Logger
+from . import checkpoint
+from .recording import Recorder
+from .metrics import MetricsCollector
+from .profiling import (
+    Phase,
+    Profiler,
+)
+from .cycles import (
+    CycleAction,
+    CycleDetector,
+)
+
+
+def run(args, logger: Logger) -> int:
+    life_grid: LifeGrid = args.engine(args.evolution_strategy,
+                                      args.width,
+                                      args.height,
+                                      args.birth_probability,
+                                      args.click_birth_probability,
+                                      args.click_birth_radius,
+                                      logger,
+                                      toroidal=args.toroidal,
+                                      rng=args.rng)
+    life_grid.hashlife_memory_mb = args.hashlife_memory_mb
+    if args.load:
+        checkpoint.load(life_grid, args.load)
+    else:
+        life_grid.fill_random()
+        life_grid.advance(args.jump_generations)
+    recorder = None
+    if args.record:
+        recorder = Recorder(args.record, life_grid.width, life_grid.height, logger, args.keyframe_every)
+        recorder.attach(life_grid)
+    cycle_detector = None
+    if args.on_cycle is not None:
+        cycle_detector = CycleDetector(logger, args.cycle_history)
+        cycle_detector.attach(life_grid)
+    profiler = None
+    if args.profile:
+        profiler = Profiler(logger, args.profile_dump)
+        profiler.instrument(life_grid, 'next_generation', Phase.STEP)
+        profiler.start()
+    metrics_collector = MetricsCollector(logger, args.dump_statistics, args.statistics_format, args.metrics_every)
+    metrics_collector.attach(life_grid)
+    # Generations skipped over cycles are counted as done, but not as stepped
+    done_count = 0
+    stepped_count = 0
+    time_start = time.perf_counter()
+    try:
+        while done_count < args.generations:
+            life_grid.next_generation()
+            done_count += 1
+            stepped_count += 1
+            if args.checkpoint_every > 0 and (life_grid.generations_count - 1) % args.checkpoint_every == 0:
+                checkpoint.save(life_grid, args.save)
+            if cycle_detector is not None and cycle_detector.cycle is not None:
+                cycle = cycle_detector.cycle
+                cycle_detector.detach(life_grid)
+                cycle_detector = None
+                if args.on_cycle == CycleAction.STOP:
+                    logger.info(f'Run stopped at generation #{cycle.generation}, the rest would repeat')
+                    break
+                elif args.on_cycle == CycleAction.SKIP:
+                    cycles_count = (args.generations - done_count) // cycle.period
+                    life_grid.skip_cycles(cycle.period, cycles_count)
+                    done_count += cycles_count * cycle.period
+    finally:
+        metrics_collector.close()
+        if recorder is not None:
+            recorder.close()
+        if profiler is not None:
+            profiler.close()
+    elapsed = time.perf_counter() - time_start
+    cells_count = life_grid.width * life_grid.height
+    if elapsed > 0:
+        logger.info(f'{stepped_count} generation(s) of {cells_count} cells in {elapsed:.3f} s: {stepped_count / elapsed:.2f} generations/s, {stepped_count * cells_count / elapsed:.0f} cells/s')
+    if args.save:
+        checkpoint.save(life_grid, args.save)
+        logger.info(f'Checkpoint written to "{args.save}"')
+    if args.dump_grid:
+        write_grid(life_grid, args.dump_grid)
+        logger.info(f'Final grid written to "{args.dump_grid}"')
+    return 0
+
+
+def write_grid(life_grid: LifeGrid, path: str):
+    # Plaintext Life pattern format, "O" is alive cell and "." is dead one. Cells which left
+    # unbounded grid are written too, the pattern is extended to them
+    coordinates = list(life_grid.alive_coordinates())
+    top = min([0] + [iv for iv, _ in coordinates])
+    left = min([0] + [ih for _, ih in coordinates])
+    bottom = max([life_grid.height - 1] + [iv for iv, _ in coordinates])
+    right = max([life_grid.width - 1] + [ih for _, ih in coordinates])
+    rows = [['.'] * (right - left + 1) for _ in range(bottom - top + 1)]
+    for iv, ih in coordinates:
+        rows[iv - top][ih - left] = 'O'
+    with open(path, 'w') as f:
+        f.write(f'!Name: generation #{life_grid.generations_count - 1}\n')
+        for row in rows:
+            f.write(''.join(row) + '\n')
+
@@ -1,13 +1,30 @@
 import random
+import sys
+import time
+import operator
+import logging
+import functools
+import importlib
+from array import array
 from enum import Enum
 import math
 from abc import abstractmethod
-import random
 from typing import (
-    List
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
 )
 
-from .util import Logger
+from .util import (
+    Logger,
+    quiet_logger,
+)
+from .hashlife import HashLife
 
 
 class EvolutionStrategy(Enum):
@@ -15,6 +32,84 @@ class EvolutionStrategy(Enum):
     MUTATION = 'mutation'
 
 
+class GridEngine(Enum):
+    PYTHON = 'python'
+    NUMPY = 'numpy'
+    TILED = 'tiled'
+    PARALLEL = 'parallel'
+    BIT = 'bit'
+    SPARSE = 'sparse'
+
+
+class ColorMode(Enum):
+    MONOCHROME = 'monochrome'
+    COLOR = 'color'
+
+
+class GenerationStatistics(NamedTuple):
+    generation: int
+    born: int
+    survived: int
+    died: int
+    alive: int
+    total_ages: int
+
+    @property
+    def average_age(self) -> float:
+        return self.total_ages / self.alive if self.alive > 0 else 0
+
+
+def zobrist_key(index: int) -> int:
+    # Pseudo-random 64-bit key of cell by its row-major index (SplitMix64 finalizer), keys are
+    # computed instead of stored, so they take no memory and are the same in all engines
+    key = (index + 1) * 0x9E3779B97F4A7C15 & 0xFFFFFFFFFFFFFFFF
+    key = (key ^ (key >> 30)) * 0xBF58476D1CE4E5B9 & 0xFFFFFFFFFFFFFFFF
+    key = (key ^ (key >> 27)) * 0x94D049BB133111EB & 0xFFFFFFFFFFFFFFFF
+    return key ^ (key >> 31)
+
+
+class Rule(NamedTuple):
+    # Life-like rule, bit n of mask is set if cell is born or survives with n alive neighbours
+    birth_mask: int
+    survive_mask: int
+
+    @classmethod
+    def parse(cls, rulestring: str) -> 'Rule':
+        # "B36/S23" notation, also in "S23/B36" order, or name of known rule
+        masks = {}
+        for part in NAMED_RULES.get(rulestring.lower(), rulestring).upper().split('/'):
+            letter, digits = part[:1], part[1:]
+            if letter not in ('B', 'S') or letter in masks or not all(digit in '012345678' for digit in digits):
+                raise ValueError(f'Rule "{rulestring}" is not in "B3/S23" notation')
+            masks[letter] = sum(1 << int(digit) for digit in set(digits))
+        if len(masks) != 2:
+            raise ValueError(f'Rule "{rulestring}" is not in "B3/S23" notation')
+        return cls(masks['B'], masks['S'])
+
+    def will_born(self, alive_neighbours: int) -> bool:
+        return bool(self.birth_mask >> alive_neighbours & 1)
+
+    def will_survive(self, alive_neighbours: int) -> bool:
+        return bool(self.survive_mask >> alive_neighbours & 1)
+
+    def __str__(self):
+        return 'B' + ''.join(str(n) for n in range(9) if self.will_born(n)) \
+            + '/S' + ''.join(str(n) for n in range(9) if self.will_survive(n))
+
+
+NAMED_RULES = {
+    'life': 'B3/S23',
+    'highlife': 'B36/S23',
+    'daynight': 'B3678/S34678',
+    'seeds': 'B2/S',
+    'replicator': 'B1357/S1357',
+    'maze': 'B3/S12345',
+    'lifewithoutdeath': 'B3/S012345678',
+}
+
+CONWAY_RULE = Rule.parse('life')
+
+
 class CellState(Enum):
     NEWBORN = 'newborn'
     GROWN = 'grown'
@@ -41,23 +136,57 @@ class BasicEvolutionStrategy:
                      coord_horizontal: int):
         pass
 
+    @abstractmethod
+    def draw_cell_codes(self, count: int):
+        # Codes of classes of `count` cells which may be born, drawn at once for whole generation
+        pass
+
+    def will_survive(self, cell: 'BasicCell') -> bool:
+        return cell.will_survive_with_neighbours(cell.alive_neighbours)
+
+    @property
+    def rule_masks(self):
+        # Birth and survival masks of cell classes indexed by their codes
+        return BIRTH_MASKS, SURVIVE_MASKS
+
 
 class ClassicEvolutionStrategy(BasicEvolutionStrategy):
 
+    # Typical cells follow this rule, strategies with other rules are made by `with_rule`
+    rule = CONWAY_RULE
+
+    @classmethod
+    def with_rule(cls, rule: Rule):
+        return type(f'{cls.__name__}({rule})', (cls,), {'rule': rule})
+
     def born_new_cell(self,
                       coord_vertical: int,
                       coord_horizontal: int):
         return TypicalCell(self.grid, coord_vertical, coord_horizontal)
 
+    def draw_cell_codes(self, count: int):
+        return bytes([TypicalCell.code]) * count
+
     def if_will_born(self,
                      coord_vertical: int,
                      coord_horizontal: int):
         alive_neighbours = self.grid.alive_neighbours(coord_vertical, coord_horizontal)
-        if TypicalCell.will_born_with_neighbours(alive_neighbours):
+        if self.rule.will_born(alive_neighbours):
             return TypicalCell
         else:
             return None
 
+    def will_survive(self, cell: 'BasicCell') -> bool:
+        return self.rule.will_survive(cell.alive_neighbours)
+
+    @property
+    def rule_masks(self):
+        birth_masks = list(BIRTH_MASKS)
+        survive_masks = list(SURVIVE_MASKS)
+        birth_masks[TypicalCell.code] = self.rule.birth_mask
+        survive_masks[TypicalCell.code] = self.rule.survive_mask
+        return tuple(birth_masks), tuple(survive_masks)
+
 
 class MutationEvolutionStrategy(BasicEvolutionStrategy):
 
@@ -65,22 +194,10 @@ class MutationEvolutionStrategy(BasicEvolutionStrategy):
 
     @property
     def _random_cell_class(self):
-        random_int = random.randint(0, 16)
-        if random_int in (0, 1):
-            cell_class = StandaloneCell
-        elif random_int == 2:
-            cell_class = SuperStandaloneCell
-        elif random_int in (3, 4):
-            cell_class = SociableCell
-        elif random_int == 5:
-            cell_class = SuperSociableCell
-        elif random_int in (6, 7):
-            cell_class = StandaloneAndSociableCell
-        elif random_int == 8:
-            cell_class = SuperStandaloneAndSociableCell
-        else:
-            cell_class = TypicalCell
-        return cell_class
+        return CELL_CLASSES[self.grid.rng.choice(MUTATION_CELL_CODES)]
+
+    def draw_cell_codes(self, count: int):
+        return self.grid.rng.choices(MUTATION_CELL_CODES, k=count)
 
     def born_new_cell(self,
                       coord_vertical: int,
@@ -94,7 +211,7 @@ class MutationEvolutionStrategy(BasicEvolutionStrategy):
                      coord_horizontal: int):
         alive_neighbours = self.grid.alive_neighbours(coord_vertical, coord_horizontal)
         cell_class = self._random_cell_class
-        if cell_class.will_survive_with_neighbours(alive_neighbours):
+        if cell_class.will_born_with_neighbours(alive_neighbours):
             return cell_class
         else:
             return None
@@ -102,16 +219,24 @@ class MutationEvolutionStrategy(BasicEvolutionStrategy):
 
 class BasicCell:
 
+    __slots__ = ('grid', 'coord_vertical', 'coord_horizontal', 'age')
+
+    # Small integer identifying cell class in compact grid storage, 0 is reserved for empty cell
+    code = 0
+
     def __init__(self,
                  grid: 'LifeGrid',
                  coord_vertical: int,
                  coord_horizontal: int):
         self.grid = grid
-        self.logger = self.grid.logger
         self.coord_vertical = coord_vertical
         self.coord_horizontal = coord_horizontal
         self.age = 0
 
+    @property
+    def logger(self):
+        return self.grid.logger
+
     @property
     def state(self) -> CellState:
         if self.age == 0:
@@ -128,13 +253,18 @@ class BasicCell:
         else:
             raise NotImplementedError
 
+    @classmethod
+    def will_born_with_neighbours(cls, alive_neighbours):
+        # Cells of all classes are born as in Conway's rules, classes differ in survival only
+        return alive_neighbours == 3
+
     @classmethod
     def will_survive_with_neighbours(cls, alive_neighbours):
         pass
 
     @property
     def will_survive(self):
-        return self.will_survive_with_neighbours(self.alive_neighbours)
+        return self.grid.evolution_strategy.will_survive(self)
 
     @property
     def alive_neighbours(self):
@@ -143,6 +273,10 @@ class BasicCell:
 
 class TypicalCell(BasicCell):
 
+    __slots__ = ()
+
+    code = 1
+
     @classmethod
     def will_born_with_neighbours(cls, alive_neighbours):
         return alive_neighbours == 3
@@ -154,6 +288,10 @@ class TypicalCell(BasicCell):
 
 class StandaloneCell(BasicCell):
 
+    __slots__ = ()
+
+    code = 2
+
     @classmethod
     def will_survive_with_neighbours(cls, alive_neighbours):
         return alive_neighbours in (1, 2, 3)
@@ -161,6 +299,10 @@ class StandaloneCell(BasicCell):
 
 class SuperStandaloneCell(BasicCell):
 
+    __slots__ = ()
+
+    code = 3
+
     @classmethod
     def will_survive_with_neighbours(cls, alive_neighbours):
         return alive_neighbours in (0, 1, 2, 3)
@@ -168,6 +310,10 @@ class SuperStandaloneCell(BasicCell):
 
 class SociableCell(BasicCell):
 
+    __slots__ = ()
+
+    code = 4
+
     @classmethod
     def will_survive_with_neighbours(cls, alive_neighbours):
         return alive_neighbours in (2, 3, 4)
@@ -175,6 +321,10 @@ class SociableCell(BasicCell):
 
 class SuperSociableCell(BasicCell):
 
+    __slots__ = ()
+
+    code = 5
+
     @classmethod
     def will_survive_with_neighbours(cls, alive_neighbours):
         return alive_neighbours in (2, 3, 4, 5)
@@ -182,6 +332,10 @@ class SuperSociableCell(BasicCell):
 
 class StandaloneAndSociableCell(BasicCell):
 
+    __slots__ = ()
+
+    code = 6
+
     @classmethod
     def will_survive_with_neighbours(cls, alive_neighbours):
         return alive_neighbours in (1, 2, 3, 4)
@@ -189,11 +343,230 @@ class StandaloneAndSociableCell(BasicCell):
 
 class SuperStandaloneAndSociableCell(BasicCell):
 
+    __slots__ = ()
+
+    code = 7
+
     @classmethod
     def will_survive_with_neighbours(cls, alive_neighbours):
         return alive_neighbours in (0, 1, 2, 3, 4, 5)
 
 
+# Cell classes indexed by their codes
+CELL_CLASSES = (None,
+                TypicalCell,
+                StandaloneCell,
+                SuperStandaloneCell,
+                SociableCell,
+                SuperSociableCell,
+                StandaloneAndSociableCell,
+                SuperStandaloneAndSociableCell)
+
+# Codes of cell classes by random draw of mutation strategy, typical cells are born most often
+MUTATION_CELL_CODES = (StandaloneCell.code,) * 2 \
+    + (SuperStandaloneCell.code,) \
+    + (SociableCell.code,) * 2 \
+    + (SuperSociableCell.code,) \
+    + (StandaloneAndSociableCell.code,) * 2 \
+    + (SuperStandaloneAndSociableCell.code,) \
+    + (TypicalCell.code,) * 8
+
+
+def rule_mask(rule) -> int:
+    # Turns `will_*_with_neighbours` classmethod into bit mask, bit n is set if rule holds for n alive neighbours
+    return sum(1 << alive_neighbours for alive_neighbours in range(9) if rule(alive_neighbours))
+
+
+# Rules of cell classes indexed by their codes
+SURVIVE_MASKS = (0,) + tuple(rule_mask(cell_class.will_survive_with_neighbours) for cell_class in CELL_CLASSES[1:])
+BIRTH_MASKS = (0,) + tuple(rule_mask(cell_class.will_born_with_neighbours) for cell_class in CELL_CLASSES[1:])
+
+
+def rule_tables(birth_masks, survive_masks):
+    # Translation tables indexed by cell key, which is cell code * 16 + alive neighbours count. They give 1 for
+    # alive cell which survives and for empty cell which may be born as some class, 0 otherwise
+    survive_table = bytes(survive_masks[key >> 4] >> (key & 15) & 1 if key >> 4 < len(survive_masks) else 0
+                          for key in range(256))
+    birth_table = bytes(functools.reduce(operator.or_, birth_masks) >> key & 1 if key < 16 else 0
+                        for key in range(256))
+    return survive_table, birth_table
+
+
+# Ages are 32-bit signed integers in some engines
+MAX_CELL_AGE = 2 ** 31 - 1
+
+# Maps cell codes to 1 for alive cells and to 0 for empty ones
+OCCUPANCY_TABLE = bytes([0]) + bytes([1]) * 255
+
+# Cell states indexed by their codes in state arrays, 0 is empty cell
+CELL_STATES = (None,
+               CellState.NEWBORN,
+               CellState.GROWN,
+               CellState.MATURE,
+               CellState.LONG_LIVING,
+               CellState.DYING)
+
+# Maps the lowest byte of age to age class of `BasicCell.state`: newborn, grown, mature and long living,
+# ages with higher bytes set are long living
+AGE_CLASS_TABLE = bytes([0]) + bytes([1]) * 4 + bytes([2]) * 10 + bytes([3]) * 241
+
+
+def _state_code(key: int) -> int:
+    # Key is age class, survival flag and occupancy flag in bits 0-1, 2 and 3, same as `BasicCell.state`
+    if not key >> 3 & 1:
+        return 0
+    elif key & 3 == 0:
+        return CELL_STATES.index(CellState.NEWBORN)
+    elif key >> 2 & 1:
+        return CELL_STATES.index(CellState.GROWN) + (key & 3) - 1
+    else:
+        return CELL_STATES.index(CellState.DYING)
+
+
+STATE_TABLE = bytes(_state_code(key) for key in range(256))
+
+
+def flag_indices(flags) -> Iterator[int]:
+    # Indices of non-zero bytes, scanning is done by `bytes.find`
+    index = flags.find(1)
+    while index != -1:
+        yield index
+        index = flags.find(1, index + 1)
+
+
+def count_neighbours(occupancy: bytes, width: int, height: int, toroidal: bool = False) -> bytes:
+    # Alive neighbours count of every cell of row-major 0/1 occupancy. Counts are summed at once as base 256
+    # digits of big integers. Every row is padded by dead cells, so shifted rows don't wrap, and counts
+    # never exceed 8, so digits don't carry
+    stride = width + 2
+    padded = bytearray(stride * (height + 2))
+    for iv in range(height):
+        padded_index = (iv + 1) * stride + 1
+        padded[padded_index:padded_index + width] = occupancy[iv * width:(iv + 1) * width]
+    if toroidal:
+        # Padding is copy of opposite edges, columns first, so corners are copied with rows
+        padded[0::stride] = padded[stride - 2::stride]
+        padded[stride - 1::stride] = padded[1::stride]
+        padded[:stride] = padded[height * stride:(height + 1) * stride]
+        padded[(height + 1) * stride:] = padded[stride:2 * stride]
+    alive = int.from_bytes(padded, 'little')
+    counts = 0
+    for shift in (1, stride - 1, stride, stride + 1):
+        counts += (alive << (8 * shift)) + (alive >> (8 * shift))
+    # Padding of toroidal grid is shifted out of it
+    counts = counts.to_bytes(len(padded) + stride + 1, 'little')
+    return b''.join(counts[(iv + 1) * stride + 1:(iv + 1) * stride + 1 + width] for iv in range(height))
+
+
+def cell_state_codes(cell_types, survived: bytes, ages) -> bytes:
+    # Codes of `CELL_STATES` of cells by their codes, survival flags and little endian 32-bit ages, one byte
+    # per cell, translated by tables byte lane by byte lane
+    ages = bytes(ages)
+    age_classes = int.from_bytes(ages[0::4].translate(AGE_CLASS_TABLE), 'little')
+    for k in (1, 2, 3):
+        age_classes |= int.from_bytes(ages[k::4].translate(OCCUPANCY_TABLE), 'little') * 3
+    keys = age_classes \
+        | int.from_bytes(survived, 'little') << 2 \
+        | int.from_bytes(bytes(cell_types).translate(OCCUPANCY_TABLE), 'little') << 3
+    return keys.to_bytes(len(cell_types), 'little').translate(STATE_TABLE)
+
+
+def statistics_total_ages(ages_sum, born_count):
+    # Newborn cells have zero age in grids, but are accounted as one generation old in statistics, so
+    # every engine reports the same total ages. Works element-wise for per-universe arrays of ensembles
+    return ages_sum + born_count
+
+
+def random_flags(rng, count: int, probability: float) -> bytes:
+    # One byte flag per cell, set with `probability`. Random 32-bit numbers of all cells are drawn by one
+    # call and compared with probability scaled to 32 bits byte by byte from the highest one, every
+    # byte of all cells at once by translation tables, flags are big integers with one byte lane per cell
+    threshold = min(max(int(probability * 2 ** 32), 0), 2 ** 32)
+    numbers = rng.getrandbits(32 * count).to_bytes(4 * count, 'little')
+    if threshold == 2 ** 32:
+        return bytes([1]) * count
+    flags = 0
+    equal = int.from_bytes(bytes([1]) * count, 'little')
+    for k in (3, 2, 1, 0):
+        digit = threshold >> (8 * k) & 0xFF
+        column = numbers[k::4]
+        flags |= equal & int.from_bytes(column.translate(bytes([1]) * digit + bytes(256 - digit)), 'little')
+        equal &= int.from_bytes(column.translate(bytes(digit) + bytes([1]) + bytes(255 - digit)), 'little')
+    return flags.to_bytes(count, 'little')
+
+
+def ellipse_mask(x: float,
+                 y: float,
+                 radius_v: float,
+                 radius_h: float,
+                 region: Tuple[int, int, int, int]) -> bytes:
+    # One byte flag per cell of `region` (rows and columns from and to, inclusive), set inside of ellipse
+    # around (x, y). Cells inside of every row are one run, only its ends are tested
+    iv_from, iv_to, ih_from, ih_to = region
+
+    def inside(iv: int, ih: int) -> bool:
+        return math.fabs(ih - x)**2 / radius_h**2 + math.fabs(iv - y)**2 / radius_v**2 <= 1
+
+    rows = []
+    for iv in range(iv_from, iv_to + 1):
+        remaining = 1 - math.fabs(iv - y)**2 / radius_v**2
+        half_width = radius_h * math.sqrt(remaining) if remaining >= 0 else -1
+        ih_first = max(math.ceil(x - half_width), ih_from)
+        ih_last = min(math.floor(x + half_width), ih_to)
+        # Rounding of square root is fixed up by the same test as of single cells
+        while ih_first <= ih_last and not inside(iv, ih_first):
+            ih_first += 1
+        while ih_last >= ih_first and not inside(iv, ih_last):
+            ih_last -= 1
+        if ih_first > ih_last:
+            rows.append(bytes(ih_to - ih_from + 1))
+            continue
+        while ih_first > ih_from and inside(iv, ih_first - 1):
+            ih_first -= 1
+        while ih_last < ih_to and inside(iv, ih_last + 1):
+            ih_last += 1
+        rows.append(bytes(ih_first - ih_from) + bytes([1]) * (ih_last - ih_first + 1) + bytes(ih_to - ih_last))
+    return b''.join(rows)
+
+
+class CellsRowView:
+
+    def __init__(self,
+                 grid: 'LifeGrid',
+                 coord_vertical: int):
+        self.grid = grid
+        self.coord_vertical = coord_vertical
+
+    def __len__(self):
+        return self.grid.width
+
+    def __getitem__(self, coord_horizontal: int):
+        return self.grid._cell(self.coord_vertical, coord_horizontal)
+
+    def __iter__(self):
+        for ih in range(self.grid.width):
+            yield self.grid._cell(self.coord_vertical, ih)
+
+
+class CellsView:
+    # Cell objects are created on access from compact storage of `LifeGrid`,
+    # they are snapshots, changing them doesn't affect the grid
+
+    def __init__(self,
+                 grid: 'LifeGrid'):
+        self.grid = grid
+
+    def __len__(self):
+        return self.grid.height
+
+    def __getitem__(self, coord_vertical: int):
+        return CellsRowView(self.grid, coord_vertical)
+
+    def __iter__(self):
+        for iv in range(self.grid.height):
+            yield CellsRowView(self.grid, iv)
+
+
 class LifeGrid:
 
     def __init__(self,
@@ -203,103 +576,494 @@ class LifeGrid:
                  birth_probability: float,
                  click_birth_probability: float,
                  click_birth_radius: int,
-                 logger: Logger):
+                 logger: Logger,
+                 toroidal: bool = False,
+                 rng=None):
+        # Source of all randomness of the grid and its strategy, `random.Random` or `random` module itself
+        self.rng = rng if rng is not None else random
         self.evolution_strategy = evolution_strategy_class(self)
+        # Opposite edges of toroidal grid are neighbours, otherwise cells outside of the grid are dead
+        self.toroidal = toroidal
         self.logger = logger
         self.width = width
         self.height = height
         self.birth_probability = birth_probability
         self.click_birth_probability = click_birth_probability
         self.click_birth_radius = click_birth_radius
-        self.cells: List[List[BasicCell]] = []
         self.generations_count = 0
+        self.hashlife_memory_mb = HashLife.DEFAULT_MEMORY_MB
+        self.hashlife = None
+        self.last_statistics: GenerationStatistics = None
+        # Called with the grid and generation number after every generation, e.g. by recorder
+        self.generation_listeners: List[Callable[['LifeGrid', int], None]] = []
+        # Rules are compiled once, see `next_generation`
+        self._birth_masks, survive_masks = self.evolution_strategy.rule_masks
+        self._survive_table, self._birth_table = rule_tables(self._birth_masks, survive_masks)
+        # Generation number and state codes of its cells, see `cell_states`
+        self._cell_states: Tuple[int, bytes] = None
+        self._allocate_cells()
+
+    def _allocate_cells(self):
+        cells_count = self.width * self.height
+        # Flat row-major storage, cell type is `code` of its class
+        self.cell_types = bytearray(cells_count)
+        self.ages = array('I', bytes(cells_count * array('I').itemsize))
+        # Alive neighbours count of every cell, kept up to date on each birth and death
+        self.neighbours = bytearray(cells_count)
+        # Hash is tracked on each birth and death only after it was asked for, None means it isn't tracked
+        self._state_hash = None
+
+    @property
+    def cells(self):
+        return CellsView(self)
+
+    @property
+    def state_hash(self) -> int:
+        # Zobrist hash of alive cells, XOR of keys of all of them, equal grids have equal hashes in all engines
+        if self._state_hash is None:
+            self._state_hash = 0
+            for iv, ih in self.alive_coordinates():
+                self._state_hash ^= zobrist_key(iv * self.width + ih)
+        return self._state_hash
+
+    def cell_states(self) -> bytes:
+        # Row-major codes of `CELL_STATES`, one byte per cell. They are computed once per generation and
+        # shared by all consumers, so repaints and snapshots don't count neighbours of cells again
+        if self._cell_states is None or self._cell_states[0] != self.generations_count:
+            self._cell_states = (self.generations_count, self._compute_cell_states())
+        return self._cell_states[1]
+
+    def _compute_cell_states(self) -> bytes:
+        # Neighbours counts are left by the step, survival is looked up by the same table as there
+        cells_count = self.width * self.height
+        cell_types, ages = self._export_cells()
+        keys = ((int.from_bytes(cell_types, 'little') << 4) + int.from_bytes(self.neighbours, 'little')) \
+            .to_bytes(cells_count, 'little')
+        return cell_state_codes(cell_types, keys.translate(self._survive_table), ages)
+
+    def alive_states(self) -> Iterator[Tuple[int, int, type, CellState]]:
+        # Coordinates, class and state of every alive cell, states are taken from `cell_states`
+        cell_types = bytes(self._export_cell_types())
+        states = self.cell_states()
+        for index in flag_indices(cell_types.translate(OCCUPANCY_TABLE)):
+            iv, ih = divmod(index, self.width)
+            yield iv, ih, CELL_CLASSES[cell_types[index]], CELL_STATES[states[index]]
+
+    def _is_alive(self, coord_vertical: int, coord_horizontal: int) -> bool:
+        return self.cell_types[coord_vertical * self.width + coord_horizontal] != 0
+
+    def _cell(self, coord_vertical: int, coord_horizontal: int):
+        index = coord_vertical * self.width + coord_horizontal
+        code = self.cell_types[index]
+        if code == 0:
+            return None
+        cell = CELL_CLASSES[code](self, coord_vertical, coord_horizontal)
+        cell.age = self.ages[index]
+        return cell
+
+    def _set_cell(self, coord_vertical: int, coord_horizontal: int, cell):
+        index = coord_vertical * self.width + coord_horizontal
+        was_alive = self.cell_types[index] != 0
+        self.cell_types[index] = cell.code if cell is not None else 0
+        self.ages[index] = cell.age if cell is not None else 0
+        if was_alive != (cell is not None):
+            self._update_neighbours(coord_vertical, coord_horizontal, 1 if cell is not None else -1)
+            if self._state_hash is not None:
+                self._state_hash ^= zobrist_key(index)
+
+    def _update_neighbours(self, coord_vertical: int, coord_horizontal: int, delta: int):
+        if self.toroidal:
+            for dv in (-1, 0, 1):
+                row_index = (coord_vertical + dv) % self.height * self.width
+                for dh in (-1, 0, 1):
+                    if dv != 0 or dh != 0:
+                        self.neighbours[row_index + (coord_horizontal + dh) % self.width] += delta
+            return
+        iv_from = coord_vertical - 1 if coord_vertical > 0 else 0
+        iv_to = coord_vertical + 1 if coord_vertical < self.height - 1 else self.height - 1
+        ih_from = coord_horizontal - 1 if coord_horizontal > 0 else 0
+        ih_to = coord_horizontal + 1 if coord_horizontal < self.width - 1 else self.width - 1
+        neighbours = self.neighbours
+        center_index = coord_vertical * self.width + coord_horizontal
+        for iv in range(iv_from, iv_to + 1):
+            row_index = iv * self.width
+            for index in range(row_index + ih_from, row_index + ih_to + 1):
+                if index != center_index:
+                    neighbours[index] += delta
+
+    def alive_coordinates(self):
         for iv in range(self.height):
-            row = []
             for ih in range(self.width):
-                row.append(None)
-            self.cells.append(row)
+                if self._is_alive(iv, ih):
+                    yield iv, ih
+
+    def _replace_cells(self, coordinates):
+        self._allocate_cells()
+        for iv, ih in coordinates:
+            self._set_cell(iv, ih, self.evolution_strategy.born_new_cell(iv, ih))
+
+    def _export_cell_types(self):
+        # Row-major cell codes, one byte per cell, the buffer may be the grid's own one
+        return self.cell_types
+
+    def _export_cells(self):
+        # Cell codes as in `_export_cell_types` and ages as little endian 32-bit integers
+        if sys.byteorder == 'little':
+            return self._export_cell_types(), self.ages
+        ages = array('I', self.ages)
+        ages.byteswap()
+        return self._export_cell_types(), ages
+
+    def _import_cells(self, cell_types, ages):
+        # Buffers are laid out as returned by `_export_cells`
+        self.cell_types = bytearray(cell_types)
+        self.ages = array('I')
+        self.ages.frombytes(ages)
+        if sys.byteorder != 'little':
+            self.ages.byteswap()
+        self._rebuild_neighbours()
+        self._state_hash = None
+
+    def _rebuild_neighbours(self):
+        self.neighbours = bytearray(count_neighbours(self.cell_types.translate(OCCUPANCY_TABLE), self.width, self.height, self.toroidal))
+
+    def _born_cells(self, coordinates):
+        # Classes of all new cells are drawn at once
+        codes = self.evolution_strategy.draw_cell_codes(len(coordinates))
+        for (iv, ih), code in zip(coordinates, codes):
+            self._set_cell(iv, ih, CELL_CLASSES[code](self, iv, ih))
+
+    def _region_occupancy(self, region: Tuple[int, int, int, int]) -> bytes:
+        # One byte 0/1 flag per cell of region (rows and columns from and to, inclusive), row-major
+        iv_from, iv_to, ih_from, ih_to = region
+        return b''.join(self.cell_types[iv * self.width + ih_from:iv * self.width + ih_to + 1]
+                        for iv in range(iv_from, iv_to + 1)).translate(OCCUPANCY_TABLE)
+
+    def _birth_region(self, region: Tuple[int, int, int, int], flags: bytes) -> int:
+        # Cells flagged in row-major region are born, flagged alive ones are reborn with zero age as in
+        # `fill_random`. Classes of all new cells are drawn at once
+        iv_from, iv_to, ih_from, ih_to = region
+        region_width = ih_to - ih_from + 1
+        indices = list(flag_indices(flags))
+        codes = self.evolution_strategy.draw_cell_codes(len(indices))
+        if ih_from == 0 and ih_to == self.width - 1:
+            # Whole rows are one run of storage, it is written at once by big integers
+            index_from = iv_from * self.width
+            index_to = index_from + len(flags)
+            born_types = bytearray(len(flags))
+            for index, code in zip(indices, codes):
+                born_types[index] = code
+            previous_types = self.cell_types[index_from:index_to]
+            flags_mask = int.from_bytes(flags, 'little')
+            self.cell_types[index_from:index_to] = \
+                ((int.from_bytes(previous_types, 'little') & ~(flags_mask * 0xFF)) | int.from_bytes(born_types, 'little')) \
+                .to_bytes(len(flags), 'little')
+            ages = int.from_bytes(self.ages[index_from:index_to].tobytes(), sys.byteorder) \
+                & ~(self._age_lanes(flags) * 0xFFFFFFFF)
+            region_ages = array('I')
+            region_ages.frombytes(ages.to_bytes(len(flags) * self.ages.itemsize, sys.byteorder))
+            self.ages[index_from:index_to] = region_ages
+            new_flags = (flags_mask & ~int.from_bytes(previous_types.translate(OCCUPANCY_TABLE), 'little')).to_bytes(len(flags), 'little')
+            new_indices = [index_from + index for index in flag_indices(new_flags)]
+        else:
+            # Part of rows, as around click, is scattered over storage and has few cells, they are written one by one
+            new_indices = []
+            for index, code in zip(indices, codes):
+                r, c = divmod(index, region_width)
+                cell_index = (iv_from + r) * self.width + ih_from + c
+                if self.cell_types[cell_index] == 0:
+                    new_indices.append(cell_index)
+                self.cell_types[cell_index] = code
+                self.ages[cell_index] = 0
+        # Counts of neighbours of few births are updated around them, of many ones are counted anew
+        if len(new_indices) * 9 > self.width * self.height:
+            self._rebuild_neighbours()
+            self._state_hash = None
+        else:
+            for index in new_indices:
+                self._update_neighbours(*divmod(index, self.width), 1)
+                if self._state_hash is not None:
+                    self._state_hash ^= zobrist_key(index)
+        return len(indices)
+
+    def _click_region(self, x: int, y: int) -> Tuple[int, int, int, int]:
+        radius_v = self.click_birth_radius
+        radius_h = self.click_birth_radius
+        return (int(y - radius_v if y - radius_v > 0 else 0),
+                int(y + radius_v if y + radius_v < self.height - 1 else self.height - 1),
+                int(x - radius_h if x - radius_h > 0 else 0),
+                int(x + radius_h if x + radius_h < self.width - 1 else self.width - 1))
 
     def fill_random(self):
-        born_count = 0
-        for iv in range(self.height):
-            for ih in range(self.width):
-                rnd = random.random()
-                if rnd < self.birth_probability:
-                    born_count += 1
-                    self.cells[iv][ih] = self.evolution_strategy.born_new_cell(iv, ih)
+        born_count = self._birth_region((0, self.height - 1, 0, self.width - 1),
+                                        random_flags(self.rng, self.width * self.height, self.birth_probability))
         self.logger.info(f'{born_count} cell(s) randomly born')
+        self._cell_states = None
         self.generations_count += 1
 
     def make_random_birth(self, x: int, y: int):
+        # Random numbers are drawn for whole region around click, only cells inside of ellipse are born
+        region = self._click_region(x, y)
+        iv_from, iv_to, ih_from, ih_to = region
         born_count = 0
-        radius_v = self.click_birth_radius
-        radius_h = self.click_birth_radius
-        iv_from = int(y - radius_v if y - radius_v > 0 else 0)
-        iv_to = int(y + radius_v if y + radius_v < self.height - 1 else self.height - 1)
-        ih_from = int(x - radius_h if x - radius_h > 0 else 0)
-        ih_to = int(x + radius_h if x + radius_h < self.width - 1 else self.width- 1)
-        for iv in range(iv_from, iv_to + 1):
-            for ih in range(ih_from, ih_to + 1):
-                if math.fabs(ih - x)**2 / radius_h**2 + math.fabs(iv - y)**2 / radius_v**2 > 1:
-                    continue
-                rnd = random.random()
-                if rnd < self.click_birth_probability:
-                    if self.cells[iv][ih] is None:
-                        self.cells[iv][ih] = self.evolution_strategy.born_new_cell(iv, ih)
-                        born_count += 1
+        if iv_from <= iv_to and ih_from <= ih_to:
+            cells_count = (iv_to - iv_from + 1) * (ih_to - ih_from + 1)
+            inside = ellipse_mask(x, y, self.click_birth_radius, self.click_birth_radius, region)
+            drawn = random_flags(self.rng, cells_count, self.click_birth_probability)
+            alive = self._region_occupancy(region)
+            born = (int.from_bytes(inside, 'little') & int.from_bytes(drawn, 'little') & ~int.from_bytes(alive, 'little')) \
+                .to_bytes(cells_count, 'little')
+            born_count = self._birth_region(region, born)
+        # Cells changed without a step, states of this generation are computed again
+        self._cell_states = None
         self.logger.info(f'{born_count} cell(s) randomly born by command')
 
     def alive_neighbours(self, coord_vertical, coord_horizontal):
-        iv_from = coord_vertical - 1 if coord_vertical > 0 else 0
-        iv_to = coord_vertical + 1 if coord_vertical < self.height - 1 else self.height - 1
-        ih_from = coord_horizontal - 1 if coord_horizontal > 0 else 0
-        ih_to = coord_horizontal + 1 if coord_horizontal < self.width - 1 else self.width - 1
-        alive_neighbours = 0
-        for iv in range(iv_from, iv_to + 1):
-            for ih in range(ih_from, ih_to + 1):
-                if iv == coord_vertical and ih == coord_horizontal:
-                    continue
-                if self.cells[iv][ih] is not None:
-                    alive_neighbours += 1
-        return alive_neighbours
+        return self.neighbours[coord_vertical * self.width + coord_horizontal]
 
     def next_generation(self):
-        total_alive_count = 0
-        survived_count = 0
-        died_count = 0
+        # Whole generation is computed by rule tables at once: cells are keyed by code and neighbours count,
+        # keys are translated to survival and birth flags, flags are applied to cells as big integers
+        cells_count = self.width * self.height
+        cell_types = self.cell_types
+        keys = ((int.from_bytes(cell_types, 'little') << 4) + int.from_bytes(self.neighbours, 'little')) \
+            .to_bytes(cells_count, 'little')
+        survived = int.from_bytes(keys.translate(self._survive_table), 'little')
+        if isinstance(self.evolution_strategy, MutationEvolutionStrategy):
+            survived &= ~self._older_than(MutationEvolutionStrategy.MAX_AGE)
+        # Classes are drawn only for empty cells which may be born as some class
+        born_types = bytearray(cells_count)
+        candidates = keys.translate(self._birth_table)
+        candidate_indices = list(flag_indices(candidates))
         born_count = 0
-        total_ages = 0
-        future_cells = []
-        for iv in range(self.height):
-            future_cells_row = []
-            for ih in range(self.width):
-                current_cell = self.cells[iv][ih]
-                will_survive = current_cell.will_survive if current_cell is not None else False
-                will_born_cell_class = self.evolution_strategy.if_will_born(iv, ih)
-                if current_cell is not None:
-                    if isinstance(self.evolution_strategy, MutationEvolutionStrategy) and current_cell.age > MutationEvolutionStrategy.MAX_AGE:
-                        will_survive = False
-                    if will_survive:
-                        future_cell = current_cell
-                        current_cell.age += 1
-                        total_alive_count += 1
-                        survived_count += 1
-                        total_ages += current_cell.age
-                    else:
-                        future_cell = None
-                        died_count += 1
-                else:
-                    if will_born_cell_class is not None:
-                        future_cell = will_born_cell_class(self, iv, ih)
-                        total_alive_count += 1
-                        born_count += 1
-                        total_ages += 1
-                    else:
-                        future_cell = None
-                future_cells_row.append(future_cell)
-            future_cells.append(future_cells_row)
-        self.cells = future_cells
-        average_age = total_ages / total_alive_count if total_alive_count > 0 else 0
-        alive_percent = total_alive_count / (self.width * self.height) * 100
-        self.logger.info(f'Generation #{self.generations_count}: {born_count} born, {survived_count} survived, {died_count} died, {total_alive_count}/{self.width * self.height} ({alive_percent:.2f}%) total alive, {average_age:.3f} average age')
+        for index, code in zip(candidate_indices, self.evolution_strategy.draw_cell_codes(len(candidate_indices))):
+            if self._birth_masks[code] >> keys[index] & 1:
+                born_types[index] = code
+                born_count += 1
+        born = int.from_bytes(born_types.translate(OCCUPANCY_TABLE), 'little')
+        alive_count = cells_count - cell_types.count(0)
+        survived_flags = survived.to_bytes(cells_count, 'little')
+        survived_count = survived_flags.count(1)
+        # Survived cells get one year older, others including born ones have zero age, in 32-bit lanes of ages
+        survived_lanes = self._age_lanes(survived_flags)
+        ages = (int.from_bytes(self.ages.tobytes(), sys.byteorder) & survived_lanes * 0xFFFFFFFF) + survived_lanes
+        self.ages = array('I')
+        self.ages.frombytes(ages.to_bytes(cells_count * self.ages.itemsize, sys.byteorder))
+        alive = int.from_bytes(cell_types.translate(OCCUPANCY_TABLE), 'little')
+        changed_indices = list(flag_indices((alive ^ survived ^ born).to_bytes(cells_count, 'little')))
+        if self._state_hash is not None:
+            for index in changed_indices:
+                self._state_hash ^= zobrist_key(index)
+        self.cell_types = bytearray(((int.from_bytes(cell_types, 'little') & survived * 0xFF)
+                                     + int.from_bytes(born_types, 'little')).to_bytes(cells_count, 'little'))
+        # Counts of neighbours of few died and born cells are updated around them, of many ones are counted anew.
+        # Update around one cell costs about as much as counting 256 cells anew by big integers
+        if len(changed_indices) * 256 > cells_count:
+            self._rebuild_neighbours()
+        else:
+            for index in changed_indices:
+                self._update_neighbours(*divmod(index, self.width), 1 if self.cell_types[index] != 0 else -1)
+        total_alive_count = survived_count + born_count
+        self._record_generation(born_count, survived_count, alive_count - survived_count, total_alive_count, statistics_total_ages(sum(self.ages), born_count))
+        self.generations_count += 1
+
+    def _age_lanes(self, flags) -> int:
+        # One byte flags per cell spread to big integer with layout of ages
+        lanes = bytearray(len(flags) * self.ages.itemsize)
+        lanes[0 if sys.byteorder == 'little' else self.ages.itemsize - 1::self.ages.itemsize] = flags
+        return int.from_bytes(lanes, sys.byteorder)
+
+    def _older_than(self, age: int) -> int:
+        # One byte flag per cell, as big integer, set when cell is older than `age` (less than 255)
+        ages = self.ages.tobytes()
+        lanes = [ages[i::self.ages.itemsize] for i in range(self.ages.itemsize)]
+        if sys.byteorder != 'little':
+            lanes.reverse()
+        older = int.from_bytes(lanes[0].translate(bytes(age + 1) + bytes([1]) * (255 - age)), 'little')
+        for lane in lanes[1:]:
+            older |= int.from_bytes(lane.translate(OCCUPANCY_TABLE), 'little')
+        return older
+
+    def _record_generation(self,
+                           born_count: int,
+                           survived_count: int,
+                           died_count: int,
+                           total_alive_count: int,
+                           total_ages: int):
+        self.last_statistics = GenerationStatistics(self.generations_count,
+                                                    born_count,
+                                                    survived_count,
+                                                    died_count,
+                                                    total_alive_count,
+                                                    total_ages)
+        # Every generation is logged only for debugging, statistics are collected by `MetricsCollector`
+        if self.logger.isEnabledFor(logging.DEBUG):
+            average_age = self.last_statistics.average_age
+            alive_percent = total_alive_count / (self.width * self.height) * 100
+            self.logger.debug(f'Generation #{self.generations_count}: {born_count} born, {survived_count} survived, {died_count} died, {total_alive_count}/{self.width * self.height} ({alive_percent:.2f}%) total alive, {average_age:.3f} average age')
+        for listener in self.generation_listeners:
+            listener(self, self.generations_count)
+
+    def advance(self, n_generations: int):
+        if n_generations <= 0:
+            return
+        coordinates = list(self.alive_coordinates())
+        # Pattern is evolved on unbounded plane, where it grows by at most one cell per generation. It can jump
+        # only if it can't reach grid edges during the jump, otherwise it would not be clipped by them as
+        # in `next_generation`. There are no edges to wrap around there, and births in empty space would fill it
+        if not isinstance(self.evolution_strategy, ClassicEvolutionStrategy):
+            obstacle = 'not "classic" strategy'
+        elif self.toroidal:
+            obstacle = 'toroidal grid'
+        elif self.evolution_strategy.rule.will_born(0):
+            obstacle = 'births on 0 neighbours'
+        elif coordinates and (min(iv for iv, _ in coordinates) < n_generations
+                              or min(ih for _, ih in coordinates) < n_generations
+                              or max(iv for iv, _ in coordinates) + n_generations >= self.height
+                              or max(ih for _, ih in coordinates) + n_generations >= self.width):
+            obstacle = 'pattern may reach grid edges'
+        else:
+            obstacle = None
+        if obstacle is not None:
+            self.logger.warning(f'Stepping {n_generations} generation(s) one by one instead of jump, {obstacle}')
+            for _ in range(n_generations):
+                self.next_generation()
+            return
+        # Ages are not tracked through the jump, all cells are newborn
+        node = self._hashlife().from_coordinates(coordinates, self.height, self.width)
+        node, top, left = self.hashlife.advance(node, 0, 0, n_generations)
+        self._replace_cells(list(self.hashlife.coordinates(node, top, left, self.height, self.width)))
+        self._record_jump(n_generations, set(coordinates))
+        self.logger.info(f'Jumped {n_generations} generation(s) ahead to generation #{self.generations_count - 1}: {node.population}/{self.width * self.height} alive')
+
+    def _record_jump(self, n_generations: int, previous_coordinates: Set[Tuple[int, int]]):
+        # Jump is recorded as one generation, so statistics and listeners see its result. Cells alive before
+        # and after it are counted as survived, all of them are newborn
+        coordinates = set(self.alive_coordinates())
+        survived_count = len(coordinates & previous_coordinates)
+        self.generations_count += n_generations - 1
+        self._record_generation(len(coordinates) - survived_count,
+                                survived_count,
+                                len(previous_coordinates) - survived_count,
+                                len(coordinates),
+                                statistics_total_ages(0, len(coordinates)))
         self.generations_count += 1
+
+    def _hashlife(self) -> HashLife:
+        if self.hashlife is None:
+            self.hashlife = HashLife(self.evolution_strategy.rule.will_survive,
+                                     self.evolution_strategy.rule.will_born,
+                                     self.hashlife_memory_mb)
+        return self.hashlife
+
+    def skip_cycles(self, period: int, cycles_count: int):
+        # Grid repeats itself every `period` generations, so whole cycles change only ages and generations
+        # count. Cells not younger than period were alive during whole cycle and will live forever,
+        # ages of younger ones repeat with the cycle
+        skipped_count = period * cycles_count
+        if skipped_count <= 0:
+            return
+        self._skip_ages(period, skipped_count)
+        self.generations_count += skipped_count
+        self.logger.info(f'Skipped {cycles_count} cycle(s) of period {period} to generation #{self.generations_count - 1}')
+
+    def _skip_ages(self, period: int, skipped_count: int):
+        # Cells not younger than period get older by skipped generations, engines with own storage of ages override it
+        cell_types, ages = self._export_cells()
+        cells_ages = array('I')
+        cells_ages.frombytes(bytes(ages))
+        if sys.byteorder != 'little':
+            cells_ages.byteswap()
+        for index, age in enumerate(cells_ages):
+            if age >= period:
+                cells_ages[index] = min(age + skipped_count, MAX_CELL_AGE)
+        if sys.byteorder != 'little':
+            cells_ages.byteswap()
+        self._import_cells(bytes(cell_types), cells_ages.tobytes())
+
+
+def strategy_class(evolution_strategy: EvolutionStrategy, rule: Optional[Rule] = None):
+    if evolution_strategy == EvolutionStrategy.CLASSIC:
+        return ClassicEvolutionStrategy.with_rule(rule) if rule is not None else ClassicEvolutionStrategy
+    elif evolution_strategy == EvolutionStrategy.MUTATION:
+        return MutationEvolutionStrategy
+    else:
+        raise NotImplementedError
+
+
+def close_grid(life_grid: LifeGrid):
+    # Engines with worker processes have to be closed, others have nothing to close
+    close = getattr(life_grid, 'close', None)
+    if close is not None:
+        close()
+
+
+# Module and class of every grid engine by its name. Modules are imported on first use, so engines which need
+# packages missing on the host, e.g. NumPy, are only unavailable. More engines are added by `register_engine`
+ENGINES: Dict[str, Tuple[str, str]] = {
+    GridEngine.PYTHON.value: ('.logic', 'LifeGrid'),
+    GridEngine.NUMPY.value: ('.numpy_grid', 'NumpyLifeGrid'),
+    GridEngine.TILED.value: ('.tiled_grid', 'TiledLifeGrid'),
+    GridEngine.PARALLEL.value: ('.parallel_grid', 'ParallelLifeGrid'),
+    GridEngine.BIT.value: ('.bit_grid', 'BitLifeGrid'),
+    GridEngine.SPARSE.value: ('.sparse_grid', 'SparseLifeGrid'),
+}
+
+# Engine name which is replaced by the fastest engine, see `select_engine`
+AUTO_ENGINE = 'auto'
+# Engines chosen from automatically, all of them give the same generations. "parallel" one starts processes
+# and "sparse" one has no edges, so they are used only when asked for
+AUTO_ENGINES = (GridEngine.PYTHON.value, GridEngine.BIT.value, GridEngine.NUMPY.value, GridEngine.TILED.value)
+# Bigger grids are measured on sample of this size with the same proportions, stepping time grows with cells count
+AUTO_SAMPLE_CELLS = 256 * 256
+AUTO_SAMPLE_GENERATIONS = 3
+
+
+def register_engine(name: str, module_name: str, class_name: str):
+    # Module name may be relative to this package
+    ENGINES[name] = (module_name, class_name)
+
+
+def engine_class(name: str):
+    # Raises `ImportError` when engine is not available on this host
+    module_name, class_name = ENGINES[name]
+    return getattr(importlib.import_module(module_name, __package__), class_name)
+
+
+def select_engine(evolution_strategy_class,
+                  width: int,
+                  height: int,
+                  birth_probability: float,
+                  toroidal: bool = False,
+                  candidates=AUTO_ENGINES) -> Tuple[str, Dict[str, float]]:
+    # Micro-benchmark: every available engine which supports strategy and grid steps the same random sample
+    # grid, the fastest one per generation is chosen. Seconds per generation of all of them are returned too
+    scale = min(1.0, math.sqrt(AUTO_SAMPLE_CELLS / (width * height))) if width * height > 0 else 1.0
+    sample_width = max(int(width * scale), 1)
+    sample_height = max(int(height * scale), 1)
+    logger = quiet_logger()
+    timings = {}
+    for name in candidates:
+        try:
+            life_grid = engine_class(name)(evolution_strategy_class,
+                                           sample_width,
+                                           sample_height,
+                                           birth_probability,
+                                           0,
+                                           1,
+                                           logger,
+                                           toroidal=toroidal,
+                                           rng=random.Random(0))
+        except (ImportError, NotImplementedError):
+            continue
+        life_grid.fill_random()
+        # The first generation fills caches of some engines, it is not timed
+        life_grid.next_generation()
+        time_start = time.perf_counter()
+        for _ in range(AUTO_SAMPLE_GENERATIONS):
+            life_grid.next_generation()
+        timings[name] = (time.perf_counter() - time_start) / AUTO_SAMPLE_GENERATIONS
+        close_grid(life_grid)
+    if not timings:
+        raise NotImplementedError('No available grid engine supports this strategy and grid')
+    return min(timings, key=timings.get), timings
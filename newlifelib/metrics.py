@@ -0,0 +1,141 @@
+import csv
+import json
+import queue
+import threading
+from array import array
+from enum import Enum
+from typing import (
+    List,
+    Optional,
+)
+
+from .logic import (
+    LifeGrid,
+    GenerationStatistics,
+)
+from .util import Logger
+
+
+class MetricsFormat(Enum):
+    CSV = 'csv'
+    JSON_LINES = 'jsonl'
+
+
+def metrics_format_of(path: str) -> MetricsFormat:
+    # Format by file extension, CSV unless it is JSON lines one
+    if path.lower().endswith(('.jsonl', '.ndjson', '.json')):
+        return MetricsFormat.JSON_LINES
+    return MetricsFormat.CSV
+
+
+class MetricsRing:
+    # Statistics of the last `capacity` generations, every field is kept in its own preallocated array,
+    # so collecting them doesn't allocate anything
+
+    def __init__(self,
+                 capacity: int):
+        self.capacity = capacity
+        self.columns = [array('q', bytes(capacity * array('q').itemsize)) for _ in GenerationStatistics._fields]
+        # Statistics appended in total, the oldest of them are overwritten
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, statistics: GenerationStatistics):
+        position = self.count % self.capacity
+        for column, value in zip(self.columns, statistics):
+            column[position] = value
+        self.count += 1
+
+    def since(self, count: int) -> List[GenerationStatistics]:
+        # Statistics appended after the first `count` ones, which are not overwritten yet
+        return [GenerationStatistics(*(column[index % self.capacity] for column in self.columns))
+                for index in range(max(count, self.count - self.capacity), self.count)]
+
+    def latest(self) -> Optional[GenerationStatistics]:
+        latest = self.since(self.count - 1)
+        return latest[0] if latest else None
+
+
+class MetricsCollector:
+    # Keeps statistics of every generation in ring buffer and emits them in batches every `emit_every`
+    # generations or on demand. Batches are written to file and summarized in log by background writer
+    # thread, so stepping thread neither formats nor writes anything
+
+    DEFAULT_EMIT_EVERY = 100
+    DEFAULT_CAPACITY = 4096
+    # Batches waiting for writer, when it falls behind stepping waits for it
+    QUEUE_SIZE = 16
+
+    def __init__(self,
+                 logger: Logger,
+                 path: str = None,
+                 metrics_format: MetricsFormat = None,
+                 emit_every: int = DEFAULT_EMIT_EVERY,
+                 capacity: int = DEFAULT_CAPACITY):
+        self.logger = logger
+        self.path = path
+        self.metrics_format = metrics_format or (metrics_format_of(path) if path else MetricsFormat.CSV)
+        self.emit_every = emit_every
+        # Ring holds at least one batch, so nothing is overwritten before it is emitted
+        self.ring = MetricsRing(max(capacity, emit_every))
+        self._emitted_count = 0
+        self._cells_count = 0
+        self._queue = queue.Queue(self.QUEUE_SIZE)
+        self._file = open(path, 'w', newline='') if path else None
+        self._writer = threading.Thread(target=self._write, name='metrics', daemon=True)
+        self._writer.start()
+
+    def attach(self, life_grid: LifeGrid):
+        self._cells_count = life_grid.width * life_grid.height
+        life_grid.generation_listeners.append(self.observe)
+
+    def detach(self, life_grid: LifeGrid):
+        life_grid.generation_listeners.remove(self.observe)
+
+    def observe(self, life_grid: LifeGrid, generation: int):
+        self.ring.append(life_grid.last_statistics)
+        if self.ring.count - self._emitted_count >= self.emit_every:
+            self.emit()
+
+    def emit(self):
+        # Must be called by the thread which steps the grid, or after stepping is over
+        batch = self.ring.since(self._emitted_count)
+        self._emitted_count = self.ring.count
+        if batch:
+            self._queue.put(batch)
+
+    def close(self):
+        self.emit()
+        self._queue.put(None)
+        self._writer.join()
+        if self._file is not None:
+            self._file.close()
+            self.logger.info(f'Statistics of {self.ring.count} generation(s) written to "{self.path}"')
+
+    def _write(self):
+        csv_writer = None
+        if self._file is not None and self.metrics_format == MetricsFormat.CSV:
+            csv_writer = csv.writer(self._file)
+            csv_writer.writerow(GenerationStatistics._fields + ('average_age',))
+        while True:
+            batch = self._queue.get()
+            if batch is None:
+                break
+            if csv_writer is not None:
+                csv_writer.writerows(statistics + (f'{statistics.average_age:.3f}',) for statistics in batch)
+            elif self._file is not None:
+                self._file.writelines(json.dumps(dict(statistics._asdict(), average_age=round(statistics.average_age, 3))) + '\n'
+                                      for statistics in batch)
+            if self._file is not None:
+                self._file.flush()
+            self._log_summary(batch)
+
+    def _log_summary(self, batch: List[GenerationStatistics]):
+        last = batch[-1]
+        born_count = sum(statistics.born for statistics in batch)
+        died_count = sum(statistics.died for statistics in batch)
+        alive_percent = last.alive / self._cells_count * 100 if self._cells_count > 0 else 0
+        generations = f'#{batch[0].generation}-#{last.generation}' if len(batch) > 1 else f'#{last.generation}'
+        self.logger.info(f'Generation(s) {generations}: {born_count} born, {died_count} died, {last.alive}/{self._cells_count} ({alive_percent:.2f}%) total alive, {last.average_age:.3f} average age')
@@ -0,0 +1,172 @@
+import numpy as np
+
+from .logic import (
+    LifeGrid,
+    ClassicEvolutionStrategy,
+    TypicalCell,
+    MAX_CELL_AGE,
+    AGE_CLASS_TABLE,
+    STATE_TABLE,
+    statistics_total_ages,
+)
+
+AGE_CLASSES = np.frombuffer(AGE_CLASS_TABLE, dtype=np.uint8)
+
+
+def neighbour_counts(alive: np.ndarray, toroidal: bool = False) -> np.ndarray:
+    # Cells outside of the grid are treated as dead, same as in `LifeGrid.alive_neighbours`,
+    # or opposite edges are neighbours on toroidal grid. Grids are the last two axes, so a stack
+    # of grids is counted at once
+    padding = [(0, 0)] * (alive.ndim - 2) + [(1, 1), (1, 1)]
+    return padded_neighbour_counts(np.pad(alive.astype(np.uint8), padding, mode='wrap' if toroidal else 'constant'))
+
+
+def padded_neighbour_counts(padded: np.ndarray) -> np.ndarray:
+    # Counts of inner cells of array padded by one cell on every side of its last two axes
+    height, width = padded.shape[-2] - 2, padded.shape[-1] - 2
+    counts = np.zeros(padded.shape[:-2] + (height, width), dtype=np.uint8)
+    for dv in range(3):
+        for dh in range(3):
+            if dv == 1 and dh == 1:
+                continue
+            counts += padded[..., dv:dv + height, dh:dh + width]
+    return counts
+
+
+def rule_table(rule) -> np.ndarray:
+    # Turns `will_*` rule method into lookup table indexed by neighbours count
+    return np.array([bool(rule(alive_neighbours)) for alive_neighbours in range(9)], dtype=bool)
+
+
+def zobrist_keys(indices: np.ndarray) -> np.ndarray:
+    # Vectorized `zobrist_key`, unsigned 64-bit arithmetic wraps around the same way as masking does there
+    keys = (indices.astype(np.uint64) + np.uint64(1)) * np.uint64(0x9E3779B97F4A7C15)
+    keys = (keys ^ (keys >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    keys = (keys ^ (keys >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return keys ^ (keys >> np.uint64(31))
+
+
+def zobrist_hash(indices: np.ndarray) -> int:
+    return int(np.bitwise_xor.reduce(zobrist_keys(indices))) if indices.size > 0 else 0
+
+
+class NumpyLifeGrid(LifeGrid):
+
+    def __init__(self,
+                 evolution_strategy_class,
+                 *args,
+                 **kwargs):
+        if not issubclass(evolution_strategy_class, ClassicEvolutionStrategy):
+            raise NotImplementedError('NumPy engine supports only "classic" evolution strategy for now')
+        super().__init__(evolution_strategy_class, *args, **kwargs)
+        self._survive_table = rule_table(self.evolution_strategy.rule.will_survive)
+        self._birth_table = rule_table(self.evolution_strategy.rule.will_born)
+
+    def _allocate_cells(self):
+        self.alive = np.zeros((self.height, self.width), dtype=bool)
+        self.ages = np.zeros((self.height, self.width), dtype=np.int32)
+        self._version = 0
+        self._cached_counts = None
+        self._cached_counts_version = None
+        self._cached_cells = None
+        self._cached_cells_version = None
+        # Hash is brought up to date on demand by XOR of keys of cells changed since it was computed
+        self._state_hash = 0
+        self._hashed_alive = np.zeros((self.height, self.width), dtype=bool)
+
+    def _touch(self):
+        self._version += 1
+
+    def _neighbour_counts(self) -> np.ndarray:
+        if self._cached_counts_version != self._version:
+            self._cached_counts = neighbour_counts(self.alive, self.toroidal)
+            self._cached_counts_version = self._version
+        return self._cached_counts
+
+    @property
+    def cells(self):
+        # Cell objects are built only for consumers still working with them, e.g. renderer
+        if self._cached_cells_version != self._version:
+            cells = []
+            for iv in range(self.height):
+                row = [None] * self.width
+                for ih in np.flatnonzero(self.alive[iv]).tolist():
+                    cell = TypicalCell(self, iv, ih)
+                    cell.age = int(self.ages[iv, ih])
+                    row[ih] = cell
+                cells.append(row)
+            self._cached_cells = cells
+            self._cached_cells_version = self._version
+        return self._cached_cells
+
+    @property
+    def state_hash(self) -> int:
+        changed = np.flatnonzero(self.alive != self._hashed_alive)
+        if changed.size > 0:
+            self._state_hash ^= zobrist_hash(changed)
+            self._hashed_alive = self.alive.copy()
+        return self._state_hash
+
+    def alive_neighbours(self, coord_vertical, coord_horizontal):
+        return int(self._neighbour_counts()[coord_vertical, coord_horizontal])
+
+    def _compute_cell_states(self):
+        # Counts are cached until cells change, so the next step doesn't count them again
+        survived = self._survive_table[self._neighbour_counts()]
+        keys = AGE_CLASSES[np.minimum(self.ages, 255)] | survived.view(np.uint8) << 2 | self.alive.view(np.uint8) << 3
+        return keys.tobytes().translate(STATE_TABLE)
+
+    def alive_coordinates(self):
+        for iv, ih in np.argwhere(self.alive).tolist():
+            yield iv, ih
+
+    def _replace_cells(self, coordinates):
+        self.alive[:] = False
+        self.ages[:] = 0
+        for iv, ih in coordinates:
+            self.alive[iv, ih] = True
+        self._touch()
+
+    def _export_cell_types(self):
+        return (self.alive * np.uint8(TypicalCell.code)).tobytes()
+
+    def _export_cells(self):
+        return self._export_cell_types(), self.ages.astype('<u4').tobytes()
+
+    def _import_cells(self, cell_types, ages):
+        # Arrays are assigned in place, so buffers shared with other processes stay the same
+        self.alive[:] = np.frombuffer(cell_types, dtype=np.uint8).reshape(self.height, self.width) != 0
+        self.ages[:] = np.frombuffer(ages, dtype='<u4').reshape(self.height, self.width)
+        self._touch()
+
+    def _skip_ages(self, period: int, skipped_count: int):
+        forever_alive = self.alive & (self.ages >= period)
+        self.ages[forever_alive] = np.minimum(self.ages[forever_alive].astype(np.int64) + skipped_count, MAX_CELL_AGE)
+        self._touch()
+
+    def _region_occupancy(self, region):
+        iv_from, iv_to, ih_from, ih_to = region
+        return self.alive[iv_from:iv_to + 1, ih_from:ih_to + 1].tobytes()
+
+    def _birth_region(self, region, flags):
+        iv_from, iv_to, ih_from, ih_to = region
+        born = np.frombuffer(flags, dtype=bool).reshape(iv_to - iv_from + 1, ih_to - ih_from + 1)
+        # Arrays are written in place, so buffers shared with other processes stay the same
+        self.alive[iv_from:iv_to + 1, ih_from:ih_to + 1] |= born
+        self.ages[iv_from:iv_to + 1, ih_from:ih_to + 1][born] = 0
+        self._touch()
+        return int(np.count_nonzero(born))
+
+    def next_generation(self):
+        counts = self._neighbour_counts()
+        survived = self.alive & self._survive_table[counts]
+        born = ~self.alive & self._birth_table[counts]
+        survived_count = int(np.count_nonzero(survived))
+        born_count = int(np.count_nonzero(born))
+        died_count = int(np.count_nonzero(self.alive)) - survived_count
+        self.ages = np.where(survived, self.ages + 1, 0).astype(np.int32)
+        total_ages = statistics_total_ages(int(self.ages.sum(dtype=np.int64)), born_count)
+        self.alive = survived | born
+        self._touch()
+        self._record_generation(born_count, survived_count, died_count, survived_count + born_count, total_ages)
+        self.generations_count += 1
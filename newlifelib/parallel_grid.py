@@ -0,0 +1,141 @@
+import os
+import weakref
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .logic import statistics_total_ages
+from .numpy_grid import (
+    NumpyLifeGrid,
+    neighbour_counts,
+    padded_neighbour_counts,
+)
+
+
+# Per worker process state, set up by `_attach_buffers`
+_worker_buffers = None
+_worker_tables = None
+
+
+def _attach_buffers(names, shape, survive_table, birth_table, toroidal):
+    global _worker_buffers, _worker_tables
+    buffers = []
+    for alive_name, ages_name in names:
+        alive_memory = shared_memory.SharedMemory(name=alive_name)
+        ages_memory = shared_memory.SharedMemory(name=ages_name)
+        buffers.append((alive_memory,
+                        ages_memory,
+                        np.ndarray(shape, dtype=bool, buffer=alive_memory.buf),
+                        np.ndarray(shape, dtype=np.int32, buffer=ages_memory.buf)))
+    _worker_buffers = buffers
+    _worker_tables = (survive_table, birth_table, toroidal)
+
+
+def _step_stripe(task):
+    source, iv_from, iv_to = task
+    _, _, alive, ages = _worker_buffers[source]
+    _, _, future_alive, future_ages = _worker_buffers[1 - source]
+    survive_table, birth_table, toroidal = _worker_tables
+    return step_stripe(alive, ages, future_alive, future_ages, iv_from, iv_to, survive_table, birth_table, toroidal)
+
+
+def step_stripe(alive, ages, future_alive, future_ages, iv_from, iv_to, survive_table, birth_table, toroidal=False):
+    # Steps rows [iv_from, iv_to) using one row halo above and below the stripe
+    if toroidal:
+        # Halo rows of edge stripes are taken from the opposite edge
+        halo = alive.take(range(iv_from - 1, iv_to + 1), axis=0, mode='wrap')
+        counts = padded_neighbour_counts(np.pad(halo.astype(np.uint8), ((0, 0), (1, 1)), mode='wrap'))
+    else:
+        halo_from = iv_from - 1 if iv_from > 0 else 0
+        halo_to = iv_to + 1 if iv_to < alive.shape[0] else alive.shape[0]
+        counts = neighbour_counts(alive[halo_from:halo_to])[iv_from - halo_from:iv_to - halo_from]
+    stripe_alive = alive[iv_from:iv_to]
+    survived = stripe_alive & survive_table[counts]
+    born = ~stripe_alive & birth_table[counts]
+    stripe_ages = np.where(survived, ages[iv_from:iv_to] + 1, 0)
+    future_ages[iv_from:iv_to] = stripe_ages
+    future_alive[iv_from:iv_to] = survived | born
+    survived_count = int(np.count_nonzero(survived))
+    return (int(np.count_nonzero(born)),
+            survived_count,
+            int(np.count_nonzero(stripe_alive)) - survived_count,
+            int(stripe_ages.sum(dtype=np.int64)))
+
+
+def _release(resources):
+    pool = resources.get('pool')
+    if pool is not None:
+        pool.terminate()
+        pool.join()
+    for memory in resources['memories']:
+        memory.close()
+        memory.unlink()
+
+
+class ParallelLifeGrid(NumpyLifeGrid):
+
+    def __init__(self,
+                 evolution_strategy_class,
+                 *args,
+                 workers: int = None,
+                 **kwargs):
+        self.workers = workers if workers else os.cpu_count()
+        super().__init__(evolution_strategy_class, *args, **kwargs)
+
+    def _allocate_cells(self):
+        super()._allocate_cells()
+        shape = (self.height, self.width)
+        cells_count = self.height * self.width
+        self._resources = {'pool': None, 'memories': []}
+        self._finalizer = weakref.finalize(self, _release, self._resources)
+        # Double buffer, workers read generation from one pair and write next generation to another
+        self._buffers = []
+        for _ in range(2):
+            alive_memory = shared_memory.SharedMemory(create=True, size=max(cells_count, 1))
+            ages_memory = shared_memory.SharedMemory(create=True, size=max(cells_count * 4, 1))
+            self._resources['memories'].extend((alive_memory, ages_memory))
+            alive = np.ndarray(shape, dtype=bool, buffer=alive_memory.buf)
+            ages = np.ndarray(shape, dtype=np.int32, buffer=ages_memory.buf)
+            alive[:] = False
+            ages[:] = 0
+            self._buffers.append((alive_memory, ages_memory, alive, ages))
+        self._current = 0
+        self.alive = self._buffers[0][2]
+        self.ages = self._buffers[0][3]
+        bounds = np.linspace(0, self.height, min(self.workers, max(self.height, 1)) + 1).astype(int).tolist()
+        self._stripes = [(iv_from, iv_to) for iv_from, iv_to in zip(bounds, bounds[1:]) if iv_from < iv_to]
+
+    def _pool(self):
+        if self._resources['pool'] is None:
+            names = [(alive_memory.name, ages_memory.name) for alive_memory, ages_memory, _, _ in self._buffers]
+            self._resources['pool'] = multiprocessing.Pool(self.workers,
+                                                           initializer=_attach_buffers,
+                                                           initargs=(names,
+                                                                     (self.height, self.width),
+                                                                     self._survive_table,
+                                                                     self._birth_table,
+                                                                     self.toroidal))
+        return self._resources['pool']
+
+    def close(self):
+        self._finalizer()
+
+    def next_generation(self):
+        tasks = [(self._current, iv_from, iv_to) for iv_from, iv_to in self._stripes]
+        born_count = 0
+        survived_count = 0
+        died_count = 0
+        total_ages = 0
+        for stripe_born, stripe_survived, stripe_died, stripe_ages in self._pool().map(_step_stripe, tasks):
+            born_count += stripe_born
+            survived_count += stripe_survived
+            died_count += stripe_died
+            total_ages += stripe_ages
+        total_ages = statistics_total_ages(total_ages, born_count)
+        self._current = 1 - self._current
+        self.alive = self._buffers[self._current][2]
+        self.ages = self._buffers[self._current][3]
+        self._touch()
+        self._record_generation(born_count, survived_count, died_count, survived_count + born_count, total_ages)
+        self.generations_count += 1
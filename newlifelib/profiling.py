@@ -0,0 +1,156 @@
+import time
+import pstats
+import cProfile
+import threading
+import functools
+import contextlib
+import tracemalloc
+from array import array
+from enum import Enum
+from typing import (
+    Dict,
+    List,
+)
+
+from .util import Logger
+
+
+class Phase(Enum):
+    STEP = 'next_generation'
+    BIRTH = 'make_random_birth'
+    SNAPSHOT = 'publish_snapshot'
+    PAINT = 'paintEvent'
+
+
+class PhaseTimer:
+    # Latencies and end times of the last `window` calls of a phase in preallocated ring arrays
+
+    def __init__(self,
+                 window: int):
+        self.window = window
+        self.latencies = array('d', bytes(window * array('d').itemsize))
+        self.end_times = array('d', bytes(window * array('d').itemsize))
+        # Calls timed in total, the oldest of them are overwritten
+        self.count = 0
+
+    def add(self, latency: float, end_time: float):
+        position = self.count % self.window
+        self.latencies[position] = latency
+        self.end_times[position] = end_time
+        self.count += 1
+
+    def percentiles(self, *percents: float) -> List[float]:
+        latencies = sorted(self.latencies[:min(self.count, self.window)])
+        if not latencies:
+            return [0.0] * len(percents)
+        return [latencies[min(int(len(latencies) * percent / 100), len(latencies) - 1)] for percent in percents]
+
+    def rate(self, now: float, period: float = 1.0) -> float:
+        # Calls per second ended during the last `period` seconds
+        calls_count = 0
+        for index in range(self.count - 1, max(self.count - self.window, 0) - 1, -1):
+            if now - self.end_times[index % self.window] > period:
+                break
+            calls_count += 1
+        return calls_count / period
+
+
+class Profiler:
+    # Times hot phases with monotonic clock. Nothing is timed unless instrumented, so without profiler
+    # stepping and painting don't pay anything. With `dump_path` also runs cProfile in threads entered
+    # by `profile_thread` and tracemalloc, their results are written on `close`
+
+    WINDOW = 1024
+    PERCENTS = (50, 95, 99)
+    # Allocation sites written to tracemalloc dump
+    TRACEMALLOC_TOP = 30
+
+    def __init__(self,
+                 logger: Logger,
+                 dump_path: str = None,
+                 window: int = WINDOW):
+        self.logger = logger
+        self.dump_path = dump_path
+        self.timers: Dict[Phase, PhaseTimer] = {phase: PhaseTimer(window) for phase in Phase}
+        self._profiles: List[cProfile.Profile] = []
+        self._profiles_lock = threading.Lock()
+        self._main_profile = None
+
+    def start(self):
+        if self.dump_path:
+            tracemalloc.start()
+            self._main_profile = self._new_profile()
+            self._main_profile.enable()
+
+    def instrument(self, obj, method_name: str, phase: Phase):
+        # Method is replaced on this very object only, by wrapper which times it
+        method = getattr(obj, method_name)
+        timer = self.timers[phase]
+
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            time_start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                time_end = time.perf_counter()
+                timer.add(time_end - time_start, time_end)
+
+        setattr(obj, method_name, timed)
+
+    @contextlib.contextmanager
+    def timing(self, phase: Phase):
+        time_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            time_end = time.perf_counter()
+            self.timers[phase].add(time_end - time_start, time_end)
+
+    @contextlib.contextmanager
+    def profile_thread(self):
+        # cProfile sees only thread it is enabled in, so every thread of interest enters this
+        if not self.dump_path:
+            yield
+            return
+        profile = self._new_profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+
+    def _new_profile(self) -> cProfile.Profile:
+        profile = cProfile.Profile()
+        with self._profiles_lock:
+            self._profiles.append(profile)
+        return profile
+
+    def summary(self, phase: Phase) -> str:
+        timer = self.timers[phase]
+        percentiles = ', '.join(f'p{percent} {latency * 1000:.3f}'
+                                for percent, latency in zip(self.PERCENTS, timer.percentiles(*self.PERCENTS)))
+        return f'{phase.value}: {percentiles} ms'
+
+    def close(self):
+        for phase in Phase:
+            if self.timers[phase].count > 0:
+                self.logger.info(f'{self.summary(phase)} over last {min(self.timers[phase].count, self.timers[phase].window)} of {self.timers[phase].count} call(s)')
+        if not self.dump_path:
+            return
+        self._main_profile.disable()
+        with self._profiles_lock:
+            profiles = list(self._profiles)
+        stats = pstats.Stats()
+        for profile in profiles:
+            profile.create_stats()
+            # Threads which ended before calling anything have nothing to add
+            if profile.stats:
+                stats.add(profile)
+        stats.dump_stats(f'{self.dump_path}.prof')
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        with open(f'{self.dump_path}.tracemalloc.txt', 'w') as f:
+            for statistic in snapshot.statistics('lineno')[:self.TRACEMALLOC_TOP]:
+                f.write(f'{statistic}\n')
+        self.logger.info(f'Profile written to "{self.dump_path}.prof", allocations to "{self.dump_path}.tracemalloc.txt"')
@@ -0,0 +1,292 @@
+import os
+import sys
+import zlib
+import queue
+import struct
+import bisect
+import threading
+import functools
+from array import array
+from typing import (
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+)
+
+from .logic import (
+    LifeGrid,
+    ClassicEvolutionStrategy,
+    TypicalCell,
+)
+from .bit_grid import (
+    ALIVE_DIGITS,
+    bit_indices,
+)
+from .simulation import (
+    Simulation,
+    GenerationSnapshot,
+)
+from .util import Logger
+
+
+MAGIC = b'NLRC'
+FORMAT_VERSION = 1
+# Magic, format version, width, height and keyframe interval
+HEADER = struct.Struct('<4sHxxIII')
+# First generation in chunk, records count and size of compressed records
+CHUNK_HEADER = struct.Struct('<QII')
+# Generation, followed by bit mask of cells changed since previous record, bit index of cell is its
+# row-major index. First record of every chunk is keyframe, its mask has all alive cells and it is
+# followed by ages of all cells as little endian 32-bit integers
+RECORD_HEADER = struct.Struct('<Q')
+COMPRESSION_LEVEL = 1
+
+
+class Record(NamedTuple):
+    generation: int
+    cells: int
+    # Ages of all cells, only for keyframes
+    ages: Optional[array]
+
+
+class Recorder:
+    # Streams runs to file as cells changed in every generation. Stepping thread only copies cells,
+    # masks are computed, compressed and written by background writer thread
+
+    DEFAULT_KEYFRAME_EVERY = 100
+    # Generations waiting for writer, when it falls behind stepping waits for it
+    QUEUE_SIZE = 16
+
+    def __init__(self,
+                 path: str,
+                 width: int,
+                 height: int,
+                 logger: Logger,
+                 keyframe_every: int = DEFAULT_KEYFRAME_EVERY):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.logger = logger
+        self.keyframe_every = keyframe_every
+        self._observed_count = 0
+        self._queue = queue.Queue(self.QUEUE_SIZE)
+        self._file = open(path, 'wb')
+        self._file.write(HEADER.pack(MAGIC, FORMAT_VERSION, width, height, keyframe_every))
+        self._writer = threading.Thread(target=self._write, name='recorder', daemon=True)
+        self._writer.start()
+
+    def attach(self, life_grid: LifeGrid):
+        # Only alive cells are recorded and replayed as typical ones, classes of other strategies would be lost
+        if not isinstance(life_grid.evolution_strategy, ClassicEvolutionStrategy):
+            raise NotImplementedError('Only "classic" evolution strategy runs are recorded')
+        self.record(life_grid, life_grid.generations_count - 1)
+        life_grid.generation_listeners.append(self.record)
+
+    def detach(self, life_grid: LifeGrid):
+        life_grid.generation_listeners.remove(self.record)
+
+    def record(self, life_grid: LifeGrid, generation: int):
+        if self._observed_count % self.keyframe_every == 0:
+            cell_types, ages = life_grid._export_cells()
+            self._queue.put((generation, bytes(cell_types), bytes(ages)))
+        else:
+            self._queue.put((generation, bytes(life_grid._export_cell_types()), None))
+        self._observed_count += 1
+
+    def close(self):
+        self._queue.put(None)
+        self._writer.join()
+        self._file.close()
+        self.logger.info(f'{self._observed_count} generation(s) recorded to "{self.path}"')
+
+    def _write(self):
+        mask_size = (self.width * self.height + 7) // 8
+        previous_alive = 0
+        chunk = bytearray()
+        chunk_generation = 0
+        chunk_records_count = 0
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            generation, cell_types, ages = item
+            alive = int(cell_types.translate(ALIVE_DIGITS)[::-1], 2) if cell_types else 0
+            if ages is not None:
+                if chunk_records_count > 0:
+                    self._write_chunk(chunk_generation, chunk_records_count, chunk)
+                chunk = bytearray()
+                chunk_generation = generation
+                chunk_records_count = 0
+            chunk += RECORD_HEADER.pack(generation)
+            chunk += (alive if ages is not None else alive ^ previous_alive).to_bytes(mask_size, 'little')
+            if ages is not None:
+                chunk += ages
+            chunk_records_count += 1
+            previous_alive = alive
+        if chunk_records_count > 0:
+            self._write_chunk(chunk_generation, chunk_records_count, chunk)
+
+    def _write_chunk(self, generation: int, records_count: int, chunk: bytearray):
+        compressed = zlib.compress(chunk, COMPRESSION_LEVEL)
+        self._file.write(CHUNK_HEADER.pack(generation, records_count, len(compressed)))
+        self._file.write(compressed)
+        self._file.flush()
+
+
+class Chunk(NamedTuple):
+    generation: int
+    records_count: int
+    offset: int
+    size: int
+
+
+class RecordingReader:
+
+    def __init__(self,
+                 path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        magic, format_version, self.width, self.height, self.keyframe_every \
+            = HEADER.unpack(self._file.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f'"{path}" is not a recording file')
+        if format_version != FORMAT_VERSION:
+            raise ValueError(f'Recording "{path}" has unsupported format version {format_version}')
+        # Only chunk headers are read to index keyframes, chunk cut by interrupted recording is ignored
+        file_size = os.fstat(self._file.fileno()).st_size
+        self.chunks: List[Chunk] = []
+        while True:
+            chunk_header = self._file.read(CHUNK_HEADER.size)
+            if len(chunk_header) < CHUNK_HEADER.size:
+                break
+            generation, records_count, size = CHUNK_HEADER.unpack(chunk_header)
+            offset = self._file.tell()
+            if offset + size > file_size:
+                break
+            self._file.seek(offset + size)
+            self.chunks.append(Chunk(generation, records_count, offset, size))
+        self._chunk_generations = [chunk.generation for chunk in self.chunks]
+
+    def close(self):
+        self._file.close()
+
+    @property
+    def first_generation(self) -> Optional[int]:
+        return self.chunks[0].generation if self.chunks else None
+
+    def keyframe_chunk(self, generation: int) -> int:
+        # Index of chunk with the nearest keyframe at or before `generation`
+        return max(bisect.bisect_right(self._chunk_generations, generation) - 1, 0)
+
+    def records(self, chunk_index: int = 0) -> Iterator[Record]:
+        mask_size = (self.width * self.height + 7) // 8
+        for chunk in self.chunks[chunk_index:]:
+            self._file.seek(chunk.offset)
+            data = memoryview(zlib.decompress(self._file.read(chunk.size)))
+            offset = 0
+            for record_index in range(chunk.records_count):
+                generation, = RECORD_HEADER.unpack_from(data, offset)
+                offset += RECORD_HEADER.size
+                cells = int.from_bytes(data[offset:offset + mask_size], 'little')
+                offset += mask_size
+                ages = None
+                if record_index == 0:
+                    ages = array('I')
+                    ages.frombytes(data[offset:offset + self.width * self.height * 4])
+                    if sys.byteorder != 'little':
+                        ages.byteswap()
+                    offset += self.width * self.height * 4
+                yield Record(generation, cells, ages)
+
+
+class ReplayCell(TypicalCell):
+    # Neighbours are not known on replay, cell is dying when next record says so
+
+    __slots__ = ('dying',)
+
+    @property
+    def will_survive(self):
+        return not self.dying
+
+
+class Replay(Simulation):
+    # Plays recording instead of stepping grid, same interface as `Simulation` for `LifeWindow`
+
+    def __init__(self,
+                 reader: RecordingReader,
+                 period_milliseconds: int,
+                 logger: Logger,
+                 generation: int = None):
+        self.reader = reader
+        self.generation = None
+        self._alive = 0
+        # Generation every alive cell was born at by its index, so ages don't need updating every step
+        self._birth_generations: Dict[int, int] = {}
+        self._records: Iterator[Record] = iter(())
+        self._next_record: Optional[Record] = None
+        self._seek(generation if generation is not None else reader.first_generation or 0)
+        super().__init__(None, period_milliseconds, logger)
+
+    def request_birth(self, x: int, y: int):
+        pass
+
+    def request_jump(self, n_generations: int):
+        self._requests.append(functools.partial(self._jump, n_generations))
+
+    def _jump(self, n_generations: int):
+        self._seek(self.generation + n_generations)
+        self.logger.info(f'Replay jumped to generation #{self.generation}')
+
+    def _seek(self, generation: int):
+        # Replay starts from the nearest keyframe, records between it and `generation` are only applied
+        self._records = self.reader.records(self.reader.keyframe_chunk(generation))
+        self._next_record = next(self._records, None)
+        self._advance()
+        while self._next_record is not None and self._next_record.generation <= generation:
+            self._advance()
+
+    def _advance(self) -> bool:
+        record = self._next_record
+        if record is None:
+            return False
+        if record.ages is not None:
+            # Keyframe has all alive cells with their exact ages
+            self._alive = record.cells
+            self._birth_generations = {index: record.generation - record.ages[index]
+                                       for index in bit_indices(record.cells)}
+        else:
+            for index in bit_indices(record.cells & self._alive):
+                del self._birth_generations[index]
+            for index in bit_indices(record.cells & ~self._alive):
+                self._birth_generations[index] = record.generation
+            self._alive ^= record.cells
+        self.generation = record.generation
+        self._next_record = next(self._records, None)
+        return True
+
+    def publish_snapshot(self):
+        self._snapshot_wanted = False
+        dying = set()
+        if self._next_record is not None:
+            if self._next_record.ages is None:
+                dying = set(bit_indices(self._next_record.cells & self._alive))
+            else:
+                dying = set(bit_indices(self._alive & ~self._next_record.cells))
+        states = {}
+        for index, birth_generation in self._birth_generations.items():
+            iv, ih = divmod(index, self.reader.width)
+            cell = ReplayCell(None, iv, ih)
+            cell.age = self.generation - birth_generation
+            cell.dying = index in dying
+            states[(iv, ih)] = (TypicalCell, cell.state)
+        self._snapshot = GenerationSnapshot(self.generation, states)
+
+    def step(self):
+        while self._requests:
+            self._requests.popleft()()
+        self._advance()
+        # At the end of recording the last generation stays on screen and isn't rebuilt
+        if self._snapshot_wanted and self._snapshot.generation != self.generation:
+            self.publish_snapshot()
@@ -0,0 +1,106 @@
+import time
+import threading
+import contextlib
+import functools
+from collections import deque
+from typing import (
+    Dict,
+    NamedTuple,
+    Tuple,
+)
+
+from .logic import (
+    LifeGrid,
+    CellState,
+)
+from .util import Logger
+from . import checkpoint
+
+
+class GenerationSnapshot(NamedTuple):
+    generation: int
+    # Class and state of every alive cell by its (vertical, horizontal) coordinates, must not be modified
+    cells: Dict[Tuple[int, int], Tuple[type, CellState]]
+
+
+def make_snapshot(life_grid: LifeGrid) -> GenerationSnapshot:
+    # States are read from the grid's state array of the generation, cells are neither created nor counted again
+    return GenerationSnapshot(life_grid.generations_count,
+                              {(iv, ih): (cell_class, state) for iv, ih, cell_class, state in life_grid.alive_states()})
+
+
+class Simulation(threading.Thread):
+    # Steps the grid on its own thread, so slow generations don't block GUI. After start only this
+    # thread touches the grid, other threads queue requests and read published snapshots
+
+    def __init__(self,
+                 life_grid: LifeGrid,
+                 period_milliseconds: int,
+                 logger: Logger,
+                 checkpoint_path: str = None,
+                 checkpoint_every: int = 0):
+        super().__init__(name='simulation', daemon=True)
+        self.life_grid = life_grid
+        self.period = period_milliseconds / 1000
+        self.logger = logger
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        # Set to `Profiler` to profile this thread
+        self.profiler = None
+        self._requests = deque()
+        self._stop_event = threading.Event()
+        self.publish_snapshot()
+
+    def request_birth(self, x: int, y: int):
+        self._requests.append(functools.partial(self.life_grid.make_random_birth, x, y))
+
+    def request_jump(self, n_generations: int):
+        self._requests.append(functools.partial(self.life_grid.advance, n_generations))
+
+    def take_snapshot(self) -> GenerationSnapshot:
+        # Snapshot is built only after previous one was taken, so stepping doesn't pay for frames nobody shows
+        self._snapshot_wanted = True
+        return self._snapshot
+
+    def stop(self):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join()
+
+    def publish_snapshot(self):
+        self._snapshot_wanted = False
+        self._snapshot = make_snapshot(self.life_grid)
+
+    def step(self):
+        while self._requests:
+            self._requests.popleft()()
+        self.life_grid.next_generation()
+        if self.checkpoint_every > 0 and (self.life_grid.generations_count - 1) % self.checkpoint_every == 0:
+            checkpoint.save(self.life_grid, self.checkpoint_path)
+        if self._snapshot_wanted:
+            self.publish_snapshot()
+
+    def save_checkpoint(self):
+        checkpoint.save(self.life_grid, self.checkpoint_path)
+        self.logger.info(f'Checkpoint written to "{self.checkpoint_path}"')
+
+    def run(self):
+        with self.profiler.profile_thread() if self.profiler is not None else contextlib.nullcontext():
+            self._run()
+
+    def _run(self):
+        next_step_time = time.monotonic()
+        try:
+            while not self._stop_event.is_set():
+                self.step()
+                next_step_time += self.period
+                delay = next_step_time - time.monotonic()
+                if delay > 0:
+                    self._stop_event.wait(delay)
+                else:
+                    next_step_time = time.monotonic()
+            # Final state is saved by this thread, so it is consistent with the last step
+            if self.checkpoint_path:
+                self.save_checkpoint()
+        except Exception:
+            self.logger.exception('Simulation stopped because of error')
@@ -0,0 +1,359 @@
+from typing import (
+    Dict,
+    List,
+    Tuple,
+)
+
+from .logic import (
+    LifeGrid,
+    ClassicEvolutionStrategy,
+    TypicalCell,
+    CELL_STATES,
+    MAX_CELL_AGE,
+    flag_indices,
+    zobrist_key,
+    statistics_total_ages,
+)
+from .bit_grid import (
+    bit_indices,
+    from_bit_indices,
+    count_slices,
+    shifted_neighbours,
+    rule_board,
+    older_slices,
+    sliced_ages_sum,
+    state_boards,
+)
+
+
+class Chunk:
+    # Square of alive cells bit-packed as in `BitLifeGrid`, padded by dead ring of cells, so board of chunk
+    # together with edges of its neighbours is stepped as one integer. Ages are bit-sliced the same way
+
+    __slots__ = ('board', 'age_slices')
+
+    def __init__(self,
+                 board: int,
+                 age_slices: List[int]):
+        self.board = board
+        self.age_slices = age_slices
+
+
+class SparseLifeGrid(LifeGrid):
+    # Unbounded plane, alive cells are kept in chunks which are allocated on demand and freed when empty,
+    # so memory and stepping time follow population. Width and height define only the area filled at
+    # start and shown at first, cells freely leave it and clicks may give birth anywhere
+
+    CHUNK_SIZE = 64
+
+    def __init__(self,
+                 evolution_strategy_class,
+                 *args,
+                 chunk_size: int = CHUNK_SIZE,
+                 **kwargs):
+        if not issubclass(evolution_strategy_class, ClassicEvolutionStrategy):
+            raise NotImplementedError('Sparse engine supports only "classic" evolution strategy for now')
+        # Empty chunks are not stored, so empty space must stay empty
+        if evolution_strategy_class.rule.will_born(0):
+            raise NotImplementedError('Sparse engine doesn\'t support rules with births on 0 neighbours')
+        if kwargs.get('toroidal'):
+            raise NotImplementedError('Sparse engine has no edges to wrap around')
+        self.chunk_size = chunk_size
+        self.stride = chunk_size + 2
+        self.bits_count = self.stride * self.stride
+        last_row_shift = chunk_size * self.stride
+        self.inner_mask = 0
+        self.first_column_mask = 0
+        self.last_column_mask = 0
+        for r in range(1, chunk_size + 1):
+            self.inner_mask |= ((1 << chunk_size) - 1) << (r * self.stride + 1)
+            self.first_column_mask |= 1 << (r * self.stride + 1)
+            self.last_column_mask |= 1 << (r * self.stride + chunk_size)
+        self.first_row_mask = ((1 << chunk_size) - 1) << (self.stride + 1)
+        self.last_row_mask = self.first_row_mask << (last_row_shift - self.stride)
+        super().__init__(evolution_strategy_class, *args, **kwargs)
+        self._survive_counts = [n for n in range(9) if self.evolution_strategy.rule.will_survive(n)]
+        self._birth_counts = [n for n in range(9) if self.evolution_strategy.rule.will_born(n)]
+
+    def _allocate_cells(self):
+        self.chunks: Dict[Tuple[int, int], Chunk] = {}
+        # Neighbours counts slices of chunks asked for since the last change
+        self._count_cache: Dict[Tuple[int, int], List[int]] = {}
+        # Boards of cells of every state by chunk, built on demand once per change, see `alive_states`
+        self._state_boards: Dict[Tuple[int, int], List[int]] = None
+        self._state_hash = None
+
+    def _touch(self):
+        self._count_cache.clear()
+        self._state_boards = None
+
+    def _locate(self, coord_vertical: int, coord_horizontal: int) -> Tuple[Tuple[int, int], int]:
+        # Chunk key and bit index of cell in its chunk
+        chunk_vertical, r = divmod(coord_vertical, self.chunk_size)
+        chunk_horizontal, c = divmod(coord_horizontal, self.chunk_size)
+        return (chunk_vertical, chunk_horizontal), (r + 1) * self.stride + c + 1
+
+    def _coordinates(self, key: Tuple[int, int], bit: int) -> Tuple[int, int]:
+        r, c = divmod(bit, self.stride)
+        return key[0] * self.chunk_size + r - 1, key[1] * self.chunk_size + c - 1
+
+    def _cell_key(self, coord_vertical: int, coord_horizontal: int) -> int:
+        # Cells inside of the grid have the same keys as in other engines. Cells outside of it are numbered
+        # after them, by Cantor pairing of their coordinates folded to non-negative numbers
+        if 0 <= coord_vertical < self.height and 0 <= coord_horizontal < self.width:
+            return zobrist_key(coord_vertical * self.width + coord_horizontal)
+        a = coord_vertical * 2 if coord_vertical >= 0 else -coord_vertical * 2 - 1
+        b = coord_horizontal * 2 if coord_horizontal >= 0 else -coord_horizontal * 2 - 1
+        return zobrist_key(self.width * self.height + (a + b) * (a + b + 1) // 2 + b)
+
+    @property
+    def state_hash(self) -> int:
+        if self._state_hash is None:
+            self._state_hash = 0
+            for iv, ih in self.alive_coordinates():
+                self._state_hash ^= self._cell_key(iv, ih)
+        return self._state_hash
+
+    def _halo(self, key: Tuple[int, int]) -> int:
+        # Edge cells of 8 neighbour chunks placed into padding ring of chunk
+        chunk_vertical, chunk_horizontal = key
+        chunks = self.chunks
+        size = self.chunk_size
+        stride = self.stride
+        halo = 0
+        north = chunks.get((chunk_vertical - 1, chunk_horizontal))
+        if north is not None:
+            halo |= (north.board & self.last_row_mask) >> (size * stride)
+        south = chunks.get((chunk_vertical + 1, chunk_horizontal))
+        if south is not None:
+            halo |= (south.board & self.first_row_mask) << (size * stride)
+        west = chunks.get((chunk_vertical, chunk_horizontal - 1))
+        if west is not None:
+            halo |= (west.board & self.last_column_mask) >> size
+        east = chunks.get((chunk_vertical, chunk_horizontal + 1))
+        if east is not None:
+            halo |= (east.board & self.first_column_mask) << size
+        north_west = chunks.get((chunk_vertical - 1, chunk_horizontal - 1))
+        if north_west is not None:
+            halo |= north_west.board >> (size * stride + size) & 1
+        north_east = chunks.get((chunk_vertical - 1, chunk_horizontal + 1))
+        if north_east is not None:
+            halo |= (north_east.board >> (size * stride + 1) & 1) << (size + 1)
+        south_west = chunks.get((chunk_vertical + 1, chunk_horizontal - 1))
+        if south_west is not None:
+            halo |= (south_west.board >> (stride + size) & 1) << ((size + 1) * stride)
+        south_east = chunks.get((chunk_vertical + 1, chunk_horizontal + 1))
+        if south_east is not None:
+            halo |= (south_east.board >> (stride + 1) & 1) << ((size + 1) * stride + size + 1)
+        return halo
+
+    def _chunk_count_slices(self, key: Tuple[int, int]) -> List[int]:
+        slices = self._count_cache.get(key)
+        if slices is None:
+            chunk = self.chunks.get(key)
+            padded = self._halo(key) | (chunk.board if chunk is not None else 0)
+            slices = count_slices(shifted_neighbours(padded, self.stride))
+            self._count_cache[key] = slices
+        return slices
+
+    def _is_alive(self, coord_vertical: int, coord_horizontal: int) -> bool:
+        key, bit = self._locate(coord_vertical, coord_horizontal)
+        chunk = self.chunks.get(key)
+        return chunk is not None and chunk.board >> bit & 1 == 1
+
+    def _cell(self, coord_vertical: int, coord_horizontal: int):
+        key, bit = self._locate(coord_vertical, coord_horizontal)
+        chunk = self.chunks.get(key)
+        if chunk is None or chunk.board >> bit & 1 == 0:
+            return None
+        cell = self.evolution_strategy.born_new_cell(coord_vertical, coord_horizontal)
+        cell.age = sum(1 << k for k, s in enumerate(chunk.age_slices) if s >> bit & 1)
+        return cell
+
+    def _set_cell(self, coord_vertical: int, coord_horizontal: int, cell):
+        key, bit_index = self._locate(coord_vertical, coord_horizontal)
+        bit = 1 << bit_index
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            if cell is None:
+                return
+            chunk = self.chunks[key] = Chunk(0, [])
+        was_alive = chunk.board & bit != 0
+        chunk.board &= ~bit
+        chunk.age_slices = [s & ~bit for s in chunk.age_slices]
+        if cell is not None:
+            chunk.board |= bit
+            while len(chunk.age_slices) < cell.age.bit_length():
+                chunk.age_slices.append(0)
+            for k in range(cell.age.bit_length()):
+                if cell.age >> k & 1:
+                    chunk.age_slices[k] |= bit
+        elif chunk.board == 0:
+            del self.chunks[key]
+        if self._state_hash is not None and was_alive != (cell is not None):
+            self._state_hash ^= self._cell_key(coord_vertical, coord_horizontal)
+        self._touch()
+
+    def _give_birth(self, coordinates):
+        # `coordinates` may contain alive cells, they are reborn with zero age as in `LifeGrid.fill_random`
+        bits_by_chunk: Dict[Tuple[int, int], List[int]] = {}
+        for iv, ih in coordinates:
+            key, bit = self._locate(iv, ih)
+            bits_by_chunk.setdefault(key, []).append(bit)
+        for key, bits in bits_by_chunk.items():
+            born = from_bit_indices(bits, self.bits_count)
+            chunk = self.chunks.get(key)
+            if chunk is None:
+                chunk = self.chunks[key] = Chunk(0, [])
+            if self._state_hash is not None:
+                for bit in bit_indices(born & ~chunk.board):
+                    self._state_hash ^= self._cell_key(*self._coordinates(key, bit))
+            chunk.board |= born
+            chunk.age_slices = [s & ~born for s in chunk.age_slices]
+        self._touch()
+
+    def alive_coordinates(self):
+        for key, chunk in self.chunks.items():
+            for bit in bit_indices(chunk.board):
+                yield self._coordinates(key, bit)
+
+    def _replace_cells(self, coordinates):
+        self._allocate_cells()
+        self._give_birth(coordinates)
+
+    def _export_cell_types(self):
+        raise NotImplementedError('Sparse engine has no fixed size grid to export')
+
+    def _export_cells(self):
+        raise NotImplementedError('Sparse engine has no fixed size grid to export')
+
+    def _import_cells(self, cell_types, ages):
+        raise NotImplementedError('Sparse engine has no fixed size grid to import')
+
+    def alive_neighbours(self, coord_vertical, coord_horizontal):
+        key, bit = self._locate(coord_vertical, coord_horizontal)
+        return sum(1 << k for k, s in enumerate(self._chunk_count_slices(key)) if s >> bit & 1)
+
+    def alive_states(self):
+        # States are bit boards of chunks, so cells outside of the grid have them too
+        if self._state_boards is None:
+            self._state_boards = {}
+            for key, chunk in self.chunks.items():
+                survived = rule_board(chunk.board, self._chunk_count_slices(key), self._survive_counts)
+                self._state_boards[key] = state_boards(chunk.board, chunk.age_slices, survived)
+        for key, boards in self._state_boards.items():
+            for code, board in enumerate(boards, 1):
+                for bit in bit_indices(board):
+                    iv, ih = self._coordinates(key, bit)
+                    yield iv, ih, TypicalCell, CELL_STATES[code]
+
+    def _compute_cell_states(self):
+        # Only cells inside of the grid have place in state array
+        states = bytearray(self.width * self.height)
+        for iv, ih, _, state in self.alive_states():
+            if 0 <= iv < self.height and 0 <= ih < self.width:
+                states[iv * self.width + ih] = CELL_STATES.index(state)
+        return bytes(states)
+
+    def _click_region(self, x: int, y: int):
+        # Unlike bounded engines, births are not clipped by grid edges
+        return (int(y - self.click_birth_radius),
+                int(y + self.click_birth_radius),
+                int(x - self.click_birth_radius),
+                int(x + self.click_birth_radius))
+
+    def _region_occupancy(self, region):
+        # Every row is gathered from bits of chunks it crosses
+        iv_from, iv_to, ih_from, ih_to = region
+        rows = []
+        for iv in range(iv_from, iv_to + 1):
+            row = 0
+            ih = ih_from
+            while ih <= ih_to:
+                key, bit = self._locate(iv, ih)
+                length = min(self.chunk_size - (ih - key[1] * self.chunk_size), ih_to - ih + 1)
+                chunk = self.chunks.get(key)
+                if chunk is not None:
+                    row |= (chunk.board >> bit & ((1 << length) - 1)) << (ih - ih_from)
+                ih += length
+            rows.append(bin(row)[:1:-1].ljust(ih_to - ih_from + 1, '0'))
+        return ''.join(rows).encode().translate(bytes.maketrans(b'01', b'\x00\x01'))
+
+    def _birth_region(self, region, flags):
+        iv_from, iv_to, ih_from, ih_to = region
+        region_width = ih_to - ih_from + 1
+        coordinates = [(iv_from + r, ih_from + c) for r, c in (divmod(index, region_width) for index in flag_indices(flags))]
+        self._give_birth(coordinates)
+        return len(coordinates)
+
+    def next_generation(self):
+        # Only allocated chunks and their neighbours may have alive cells in the next generation,
+        # the latter only if some cells on their edges are born
+        active_keys = set()
+        for chunk_vertical, chunk_horizontal in self.chunks:
+            for dv in (-1, 0, 1):
+                for dh in (-1, 0, 1):
+                    active_keys.add((chunk_vertical + dv, chunk_horizontal + dh))
+        born_count = 0
+        survived_count = 0
+        died_count = 0
+        total_ages = 0
+        track_hash = self._state_hash is not None
+        future_chunks = {}
+        for key in active_keys:
+            chunk = self.chunks.get(key)
+            board = chunk.board if chunk is not None else 0
+            halo = self._halo(key)
+            if board == 0 and halo == 0:
+                continue
+            slices = count_slices(shifted_neighbours(board | halo, self.stride))
+            future_board = rule_board(board, slices, self._survive_counts, self._birth_counts) & self.inner_mask
+            survived = future_board & board
+            chunk_born_count = (future_board & ~board).bit_count()
+            chunk_survived_count = survived.bit_count()
+            born_count += chunk_born_count
+            survived_count += chunk_survived_count
+            died_count += board.bit_count() - chunk_survived_count
+            if track_hash:
+                for bit in bit_indices(board ^ future_board):
+                    self._state_hash ^= self._cell_key(*self._coordinates(key, bit))
+            if future_board == 0:
+                continue
+            age_slices = older_slices(chunk.age_slices if chunk is not None else [], survived)
+            total_ages += statistics_total_ages(sliced_ages_sum(age_slices), chunk_born_count)
+            future_chunks[key] = Chunk(future_board, age_slices)
+        self.chunks = future_chunks
+        self._touch()
+        self._record_generation(born_count, survived_count, died_count, survived_count + born_count, total_ages)
+        self.generations_count += 1
+
+    def advance(self, n_generations: int):
+        if n_generations <= 0:
+            return
+        # Whole population is evolved and imported back, there are no edges to clip it by
+        coordinates = list(self.alive_coordinates())
+        top = min((iv for iv, _ in coordinates), default=0)
+        left = min((ih for _, ih in coordinates), default=0)
+        height = max((iv for iv, _ in coordinates), default=0) - top + 1
+        width = max((ih for _, ih in coordinates), default=0) - left + 1
+        hashlife = self._hashlife()
+        node = hashlife.from_coordinates(((iv - top, ih - left) for iv, ih in coordinates), height, width)
+        node, top, left = hashlife.advance(node, top, left, n_generations)
+        size = 2 ** node.level
+        self._replace_cells([(iv + top, ih + left) for iv, ih in hashlife.coordinates(node, 0, 0, size, size)])
+        self._record_jump(n_generations, set(coordinates))
+        self.logger.info(f'Jumped {n_generations} generation(s) ahead to generation #{self.generations_count - 1}: {node.population} alive in {len(self.chunks)} chunk(s)')
+
+    def _skip_ages(self, period: int, skipped_count: int):
+        # Chunks have no fixed size grid to export, their ages are gathered bit by bit
+        for chunk in self.chunks.values():
+            ages = dict.fromkeys(bit_indices(chunk.board), 0)
+            for k, s in enumerate(chunk.age_slices):
+                for bit in bit_indices(s):
+                    ages[bit] += 1 << k
+            for bit, age in ages.items():
+                if age >= period:
+                    ages[bit] = min(age + skipped_count, MAX_CELL_AGE)
+            chunk.age_slices = [from_bit_indices((bit for bit, age in ages.items() if age >> k & 1), self.bits_count)
+                                for k in range(max(ages.values()).bit_length())]
+        self._touch()
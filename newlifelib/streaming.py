@@ -0,0 +1,289 @@
+import zlib
+import socket
+import struct
+import asyncio
+import contextlib
+from typing import (
+    Dict,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from .logic import (
+    LifeGrid,
+    CELL_CLASSES,
+    CELL_STATES,
+    OCCUPANCY_TABLE,
+    flag_indices,
+)
+from .checkpoint import (
+    STRATEGY_CODES,
+    evolution_strategy_of,
+)
+from .simulation import (
+    Simulation,
+    GenerationSnapshot,
+)
+from .metrics import MetricsCollector
+from .util import Logger
+from . import checkpoint
+
+
+MAGIC = b'NLST'
+FORMAT_VERSION = 1
+# Magic, format version, evolution strategy code, width and height, sent by server once on connection
+HEADER = struct.Struct('<4sHBxII')
+# Sent by viewer for every frame it is ready to receive, server answers with the latest generation
+FRAME_REQUEST = b'F'
+# Generation and size of compressed delta, followed by the delta. Delta is XOR of cells of the generation
+# with cells of the previous frame sent to the same viewer, the first frame is XOR with empty grid
+FRAME_HEADER = struct.Struct('<QI')
+COMPRESSION_LEVEL = 1
+
+DEFAULT_HOST = '127.0.0.1'
+
+
+class Frame(NamedTuple):
+    generation: int
+    # Row-major cell codes of all cells followed by codes of their `CELL_STATES`
+    cells: bytes
+
+
+def make_frame(life_grid: LifeGrid) -> Frame:
+    return Frame(life_grid.generations_count, bytes(life_grid._export_cell_types()) + life_grid.cell_states())
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    host, _, port = address.rpartition(':')
+    try:
+        return host or DEFAULT_HOST, int(port)
+    except ValueError:
+        raise ValueError(f'"{address}" is not [host:]port address')
+
+
+class StreamingSimulation(Simulation):
+    # Also publishes frames for stream server, like snapshots they are made only after server asked for them,
+    # so generations nobody waits for cost nothing however many viewers there are
+
+    def __init__(self,
+                 *args,
+                 **kwargs):
+        # Called on stepping thread with every made frame
+        self.frame_listener = None
+        self._frame_wanted = False
+        super().__init__(*args, **kwargs)
+
+    def request_frame(self):
+        self._frame_wanted = True
+
+    def step(self):
+        super().step()
+        if self._frame_wanted and self.frame_listener is not None:
+            self._frame_wanted = False
+            self.frame_listener(make_frame(self.life_grid))
+
+
+class StreamServer:
+    # Streams generations of simulation to any number of viewers. Frame is encoded once for all viewers
+    # which received the same previous frame. Viewer is sent a frame only when it requested one, so viewer
+    # which can't keep up gets the latest generation as one delta from the last one it received, generations
+    # in between are coalesced and neither buffers nor stepping ever wait for viewers
+
+    def __init__(self,
+                 simulation: StreamingSimulation,
+                 logger: Logger):
+        self.simulation = simulation
+        self.logger = logger
+        self.simulation.frame_listener = self._on_frame
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._condition: Optional[asyncio.Condition] = None
+        # Latest frame and its number, 0 means there is no frame yet
+        self._frame = Frame(None, b'')
+        self._sequence = 0
+        # Compressed deltas to the latest frame by number of frame they are from
+        self._deltas: Dict[int, bytes] = {}
+
+    async def serve(self, host: str, port: int):
+        self._loop = asyncio.get_running_loop()
+        self._condition = asyncio.Condition()
+        server = await asyncio.start_server(self._serve_viewer, host, port)
+        addresses = ', '.join(f'{name[0]}:{name[1]}' for name in (s.getsockname() for s in server.sockets))
+        self.logger.info(f'Streaming generations of {self.simulation.life_grid.width}x{self.simulation.life_grid.height} grid at {addresses}')
+        async with server:
+            await server.serve_forever()
+
+    def _on_frame(self, frame: Frame):
+        asyncio.run_coroutine_threadsafe(self._publish(frame), self._loop)
+
+    async def _publish(self, frame: Frame):
+        async with self._condition:
+            self._frame = frame
+            self._sequence += 1
+            self._deltas = {}
+            self._condition.notify_all()
+
+    def _delta(self, sequence: int, cells: bytes) -> bytes:
+        delta = self._deltas.get(sequence)
+        if delta is None:
+            changed = int.from_bytes(self._frame.cells, 'little') ^ int.from_bytes(cells, 'little')
+            delta = zlib.compress(changed.to_bytes(len(self._frame.cells), 'little'), COMPRESSION_LEVEL)
+            self._deltas[sequence] = delta
+        return delta
+
+    async def _serve_viewer(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        address = writer.get_extra_info('peername')
+        self.logger.info(f'Viewer {address} connected')
+        life_grid = self.simulation.life_grid
+        sequence = 0
+        cells = b''
+        try:
+            writer.write(HEADER.pack(MAGIC,
+                                     FORMAT_VERSION,
+                                     STRATEGY_CODES[evolution_strategy_of(life_grid)],
+                                     life_grid.width,
+                                     life_grid.height))
+            while await reader.read(len(FRAME_REQUEST)) == FRAME_REQUEST:
+                async with self._condition:
+                    while self._sequence == sequence:
+                        self.simulation.request_frame()
+                        await self._condition.wait()
+                    frame_sequence, frame = self._sequence, self._frame
+                    delta = self._delta(sequence, cells)
+                writer.write(FRAME_HEADER.pack(frame.generation, len(delta)) + delta)
+                await writer.drain()
+                sequence, cells = frame_sequence, frame.cells
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            self.logger.info(f'Viewer {address} disconnected')
+
+
+def run(args, logger: Logger) -> int:
+    life_grid: LifeGrid = args.engine(args.evolution_strategy,
+                                      args.width,
+                                      args.height,
+                                      args.birth_probability,
+                                      args.click_birth_probability,
+                                      args.click_birth_radius,
+                                      logger,
+                                      toroidal=args.toroidal,
+                                      rng=args.rng)
+    life_grid.hashlife_memory_mb = args.hashlife_memory_mb
+    if args.load:
+        checkpoint.load(life_grid, args.load)
+    else:
+        life_grid.fill_random()
+        life_grid.advance(args.jump_generations)
+    metrics_collector = MetricsCollector(logger, args.dump_statistics, args.statistics_format, args.metrics_every)
+    metrics_collector.attach(life_grid)
+    simulation = StreamingSimulation(life_grid,
+                                     args.period_milliseconds,
+                                     logger,
+                                     checkpoint_path=args.save,
+                                     checkpoint_every=args.checkpoint_every)
+    server = StreamServer(simulation, logger)
+    simulation.start()
+    try:
+        asyncio.run(server.serve(*args.serve))
+    except KeyboardInterrupt:
+        logger.info(f'Streaming stopped at generation #{life_grid.generations_count - 1}')
+    finally:
+        simulation.stop()
+        metrics_collector.close()
+    return 0
+
+
+class StreamReader:
+    # Connects to server synchronously, so size and strategy of grid are known before window is made
+
+    def __init__(self,
+                 address: Tuple[str, int]):
+        self.address = address
+        self._socket = socket.create_connection(address)
+        self._file = self._socket.makefile('rb')
+        header = self._file.read(HEADER.size)
+        if len(header) < HEADER.size:
+            self.close()
+            raise ValueError(f'{address[0]}:{address[1]} closed connection')
+        magic, format_version, strategy_code, self.width, self.height = HEADER.unpack(header)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f'{address[0]}:{address[1]} is not stream server')
+        if format_version != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f'Stream of {address[0]}:{address[1]} has unsupported format version {format_version}')
+        self.evolution_strategy = next(evolution_strategy for evolution_strategy, code in STRATEGY_CODES.items()
+                                       if code == strategy_code)
+
+    def shutdown(self):
+        # Wakes up thread blocked in `frames`, they end
+        with contextlib.suppress(OSError):
+            self._socket.shutdown(socket.SHUT_RDWR)
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
+
+    def frames(self) -> Iterator[Frame]:
+        cells_size = 2 * self.width * self.height
+        cells = 0
+        while True:
+            self._socket.sendall(FRAME_REQUEST)
+            frame_header = self._file.read(FRAME_HEADER.size)
+            if len(frame_header) < FRAME_HEADER.size:
+                return
+            generation, size = FRAME_HEADER.unpack(frame_header)
+            delta = self._file.read(size)
+            if len(delta) < size:
+                return
+            cells ^= int.from_bytes(zlib.decompress(delta), 'little')
+            yield Frame(generation, cells.to_bytes(cells_size, 'little'))
+
+
+class StreamViewer(Simulation):
+    # Shows generations streamed by server instead of stepping grid, same interface as `Simulation` for `LifeWindow`
+
+    def __init__(self,
+                 reader: StreamReader,
+                 logger: Logger):
+        self.reader = reader
+        self._frame = Frame(None, b'')
+        super().__init__(None, 0, logger)
+
+    def request_birth(self, x: int, y: int):
+        pass
+
+    def request_jump(self, n_generations: int):
+        pass
+
+    def stop(self):
+        self._stop_event.set()
+        self.reader.shutdown()
+        if self.is_alive():
+            self.join()
+        self.reader.close()
+
+    def publish_snapshot(self):
+        self._snapshot_wanted = False
+        cells_count = self.reader.width * self.reader.height
+        cell_types = self._frame.cells[:cells_count]
+        states = self._frame.cells[cells_count:]
+        cells = {}
+        for index in flag_indices(cell_types.translate(OCCUPANCY_TABLE)):
+            cells[divmod(index, self.reader.width)] = (CELL_CLASSES[cell_types[index]], CELL_STATES[states[index]])
+        self._snapshot = GenerationSnapshot(self._frame.generation, cells)
+
+    def _run(self):
+        try:
+            for frame in self.reader.frames():
+                self._frame = frame
+                if self._snapshot_wanted:
+                    self.publish_snapshot()
+            if not self._stop_event.is_set():
+                self.logger.info(f'Stream ended at generation #{self._frame.generation}')
+        except Exception:
+            if not self._stop_event.is_set():
+                self.logger.exception('Viewer stopped because of error')
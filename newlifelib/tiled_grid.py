@@ -0,0 +1,292 @@
+import sys
+import math
+from array import array
+from typing import (
+    List,
+    Set,
+    Tuple,
+)
+
+from .logic import (
+    LifeGrid,
+    BasicCell,
+    ClassicEvolutionStrategy,
+    CELL_CLASSES,
+    OCCUPANCY_TABLE,
+    cell_state_codes,
+    count_neighbours,
+    flag_indices,
+    zobrist_key,
+)
+
+
+class Tile:
+
+    def __init__(self,
+                 cells: List[List[BasicCell]],
+                 stamp: int):
+        self.cells = cells
+        # Ages of cells are exact as of `stamp` step, tile which is not re-evaluated
+        # is aged lazily, see `TiledLifeGrid._catch_up`
+        self.stamp = stamp
+        self.alive_count = 0
+        self.ages_sum = 0
+        for row in cells:
+            for cell in row:
+                if cell is not None:
+                    self.alive_count += 1
+                    self.ages_sum += cell.age
+
+
+class TiledLifeGrid(LifeGrid):
+
+    TILE_SIZE = 16
+
+    def __init__(self,
+                 evolution_strategy_class,
+                 *args,
+                 tile_size: int = TILE_SIZE,
+                 **kwargs):
+        if not issubclass(evolution_strategy_class, ClassicEvolutionStrategy):
+            raise NotImplementedError('Tiled engine supports only "classic" evolution strategy for now')
+        # Quiet tiles are skipped, so empty space must stay empty
+        if evolution_strategy_class.rule.will_born(0):
+            raise NotImplementedError('Tiled engine doesn\'t support rules with births on 0 neighbours')
+        if kwargs.get('toroidal'):
+            raise NotImplementedError('Tiled engine doesn\'t support toroidal grid for now')
+        self.tile_size = tile_size
+        super().__init__(evolution_strategy_class, *args, **kwargs)
+        self._survive_table = [self.evolution_strategy.rule.will_survive(n) for n in range(9)]
+        self._birth_table = [self.evolution_strategy.rule.will_born(n) for n in range(9)]
+
+    def _allocate_cells(self):
+        self.tiles_vertical = math.ceil(self.height / self.tile_size)
+        self.tiles_horizontal = math.ceil(self.width / self.tile_size)
+        self.tiles: List[List[Tile]] = []
+        for tv in range(self.tiles_vertical):
+            tiles_row = []
+            for th in range(self.tiles_horizontal):
+                rows_count, columns_count = self._tile_shape(tv, th)
+                tiles_row.append(Tile([[None] * columns_count for _ in range(rows_count)], 0))
+            self.tiles.append(tiles_row)
+        # Tiles changed during last generation or by user, only they and their neighbours may change next time
+        self.dirty_tiles: Set[Tuple[int, int]] = set()
+        self._steps = 0
+        self._version = 0
+        self._cached_cells = None
+        self._cached_cells_version = None
+        self._state_hash = None
+
+    def _tile_shape(self, tile_vertical: int, tile_horizontal: int):
+        return (min(self.tile_size, self.height - tile_vertical * self.tile_size),
+                min(self.tile_size, self.width - tile_horizontal * self.tile_size))
+
+    def _catch_up(self, tile: Tile):
+        delta = self._steps - tile.stamp
+        if delta == 0:
+            return
+        for row in tile.cells:
+            for cell in row:
+                if cell is not None:
+                    cell.age += delta
+        tile.ages_sum += delta * tile.alive_count
+        tile.stamp = self._steps
+
+    def _cell(self, coord_vertical: int, coord_horizontal: int):
+        tile = self.tiles[coord_vertical // self.tile_size][coord_horizontal // self.tile_size]
+        return tile.cells[coord_vertical % self.tile_size][coord_horizontal % self.tile_size]
+
+    def _is_alive(self, coord_vertical: int, coord_horizontal: int) -> bool:
+        return self._cell(coord_vertical, coord_horizontal) is not None
+
+    def _set_cell(self, coord_vertical: int, coord_horizontal: int, cell):
+        tile_vertical = coord_vertical // self.tile_size
+        tile_horizontal = coord_horizontal // self.tile_size
+        tile = self.tiles[tile_vertical][tile_horizontal]
+        self._catch_up(tile)
+        row = tile.cells[coord_vertical % self.tile_size]
+        previous_cell = row[coord_horizontal % self.tile_size]
+        if previous_cell is not None:
+            tile.alive_count -= 1
+            tile.ages_sum -= previous_cell.age
+        if cell is not None:
+            tile.alive_count += 1
+            tile.ages_sum += cell.age
+        row[coord_horizontal % self.tile_size] = cell
+        if self._state_hash is not None and (previous_cell is None) != (cell is None):
+            self._state_hash ^= zobrist_key(coord_vertical * self.width + coord_horizontal)
+        self.dirty_tiles.add((tile_vertical, tile_horizontal))
+        self._version += 1
+
+    @property
+    def cells(self):
+        if self._cached_cells_version != self._version:
+            cells = []
+            for tiles_row in self.tiles:
+                for tile in tiles_row:
+                    self._catch_up(tile)
+                for r in range(len(tiles_row[0].cells)):
+                    row = []
+                    for tile in tiles_row:
+                        row.extend(tile.cells[r])
+                    cells.append(row)
+            self._cached_cells = cells
+            self._cached_cells_version = self._version
+        return self._cached_cells
+
+    def _export_cell_types(self):
+        cell_types = bytearray(self.width * self.height)
+        for iv, row in enumerate(self.cells):
+            for ih, cell in enumerate(row):
+                if cell is not None:
+                    cell_types[iv * self.width + ih] = cell.code
+        return cell_types
+
+    def _export_cells(self):
+        ages = array('I', bytes(self.width * self.height * array('I').itemsize))
+        for iv, row in enumerate(self.cells):
+            for ih, cell in enumerate(row):
+                if cell is not None:
+                    ages[iv * self.width + ih] = cell.age
+        if sys.byteorder != 'little':
+            ages.byteswap()
+        return self._export_cell_types(), ages
+
+    def _import_cells(self, cell_types, ages):
+        # Cells are objects here, so unlike flat engines every alive cell has to be created one by one
+        self._allocate_cells()
+        cells_ages = array('I')
+        cells_ages.frombytes(ages)
+        if sys.byteorder != 'little':
+            cells_ages.byteswap()
+        for index, code in enumerate(cell_types):
+            if code != 0:
+                iv, ih = divmod(index, self.width)
+                cell = CELL_CLASSES[code](self, iv, ih)
+                cell.age = cells_ages[index]
+                self._set_cell(iv, ih, cell)
+
+    def _compute_cell_states(self):
+        # Tiles keep no neighbours counts, they are counted for the whole grid at once
+        cell_types, ages = self._export_cells()
+        counts = count_neighbours(cell_types.translate(OCCUPANCY_TABLE), self.width, self.height)
+        return cell_state_codes(cell_types, counts.translate(bytes(self._survive_table).ljust(256, b'\0')), ages)
+
+    def alive_neighbours(self, coord_vertical, coord_horizontal):
+        occupancy_rows = [self._occupancy_row(iv, coord_horizontal - 1, coord_horizontal + 1)
+                          for iv in range(coord_vertical - 1, coord_vertical + 2)]
+        return sum(sum(row) for row in occupancy_rows) - occupancy_rows[1][1]
+
+    def _occupancy_row(self, coord_vertical: int, ih_from: int, ih_to: int) -> List[int]:
+        # Occupancy of grid row in [ih_from, ih_to] range as 0/1 list, cells outside of the grid are dead
+        if coord_vertical < 0 or coord_vertical >= self.height:
+            return [0] * (ih_to - ih_from + 1)
+        occupancy = [0] * (-ih_from if ih_from < 0 else 0)
+        tiles_row = self.tiles[coord_vertical // self.tile_size]
+        r = coord_vertical % self.tile_size
+        ih = max(ih_from, 0)
+        ih_last = min(ih_to, self.width - 1)
+        while ih <= ih_last:
+            th = ih // self.tile_size
+            tile_ih_from = th * self.tile_size
+            tile_ih_to = min(tile_ih_from + self.tile_size - 1, ih_last)
+            occupancy.extend(0 if cell is None else 1
+                             for cell in tiles_row[th].cells[r][ih - tile_ih_from:tile_ih_to - tile_ih_from + 1])
+            ih = tile_ih_to + 1
+        occupancy.extend([0] * (ih_to - ih_last if ih_to > ih_last else 0))
+        return occupancy
+
+    def _region_occupancy(self, region):
+        iv_from, iv_to, ih_from, ih_to = region
+        return bytes(occupancy for iv in range(iv_from, iv_to + 1) for occupancy in self._occupancy_row(iv, ih_from, ih_to))
+
+    def _birth_region(self, region, flags):
+        # Cells are objects here, so every new cell is created and set one by one
+        iv_from, iv_to, ih_from, ih_to = region
+        region_width = ih_to - ih_from + 1
+        coordinates = [(iv_from + r, ih_from + c) for r, c in (divmod(index, region_width) for index in flag_indices(flags))]
+        self._born_cells(coordinates)
+        return len(coordinates)
+
+    def _step_tile(self, tile_vertical: int, tile_horizontal: int, tile: Tile):
+        rows_count, columns_count = self._tile_shape(tile_vertical, tile_horizontal)
+        iv_from = tile_vertical * self.tile_size
+        ih_from = tile_horizontal * self.tile_size
+        occupancy = [self._occupancy_row(iv, ih_from - 1, ih_from + columns_count)
+                     for iv in range(iv_from - 1, iv_from + rows_count + 1)]
+        horizontal_sums = [[row[c] + row[c + 1] + row[c + 2] for c in range(columns_count)]
+                           for row in occupancy]
+        born_count = 0
+        survived_count = 0
+        died_count = 0
+        total_ages = 0
+        future_cells = []
+        track_hash = self._state_hash is not None
+        for r in range(rows_count):
+            above = horizontal_sums[r]
+            middle = horizontal_sums[r + 1]
+            below = horizontal_sums[r + 2]
+            occupancy_row = occupancy[r + 1]
+            cells_row = tile.cells[r]
+            future_cells_row = [None] * columns_count
+            for c in range(columns_count):
+                alive_neighbours = above[c] + middle[c] + below[c] - occupancy_row[c + 1]
+                current_cell = cells_row[c]
+                if current_cell is not None:
+                    if self._survive_table[alive_neighbours]:
+                        current_cell.age += 1
+                        future_cells_row[c] = current_cell
+                        survived_count += 1
+                        total_ages += current_cell.age
+                    else:
+                        died_count += 1
+                        if track_hash:
+                            self._state_hash ^= zobrist_key((iv_from + r) * self.width + ih_from + c)
+                elif self._birth_table[alive_neighbours]:
+                    future_cells_row[c] = self.evolution_strategy.born_new_cell(iv_from + r, ih_from + c)
+                    born_count += 1
+                    total_ages += 1
+                    if track_hash:
+                        self._state_hash ^= zobrist_key((iv_from + r) * self.width + ih_from + c)
+            future_cells.append(future_cells_row)
+        return Tile(future_cells, self._steps + 1), born_count, survived_count, died_count, total_ages
+
+    def next_generation(self):
+        active_tiles = set()
+        for tile_vertical, tile_horizontal in self.dirty_tiles:
+            for tv in range(max(tile_vertical - 1, 0), min(tile_vertical + 2, self.tiles_vertical)):
+                for th in range(max(tile_horizontal - 1, 0), min(tile_horizontal + 2, self.tiles_horizontal)):
+                    active_tiles.add((tv, th))
+        survived_count = 0
+        died_count = 0
+        born_count = 0
+        total_ages = 0
+        future_tiles = {}
+        dirty_tiles = set()
+        for tv, th in active_tiles:
+            tile = self.tiles[tv][th]
+            self._catch_up(tile)
+            future_tile, tile_born, tile_survived, tile_died, tile_ages = self._step_tile(tv, th, tile)
+            future_tiles[(tv, th)] = future_tile
+            if tile_born or tile_died:
+                dirty_tiles.add((tv, th))
+            born_count += tile_born
+            survived_count += tile_survived
+            died_count += tile_died
+            total_ages += tile_ages
+        # Tiles with no activity around them can't change, they are reused as they are
+        for tv in range(self.tiles_vertical):
+            for th in range(self.tiles_horizontal):
+                if (tv, th) in future_tiles:
+                    continue
+                tile = self.tiles[tv][th]
+                survived_count += tile.alive_count
+                total_ages += tile.ages_sum + tile.alive_count * (self._steps + 1 - tile.stamp)
+        for (tv, th), future_tile in future_tiles.items():
+            self.tiles[tv][th] = future_tile
+        self.dirty_tiles = dirty_tiles
+        self._steps += 1
+        self._version += 1
+        total_alive_count = born_count + survived_count
+        self._record_generation(born_count, survived_count, died_count, total_alive_count, total_ages)
+        self.generations_count += 1
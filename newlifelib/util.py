@@ -1,19 +1,21 @@
 import logging
-from colorama import Fore, Style
 import sys
 
 
 class Formatter(logging.Formatter):
 
     def __init__(self, fmt=None):
+        # Colors are added to every record by `format`, so colorama is imported only when something is written
         if fmt is None:
-            fmt = self._colorized_fmt()
+            fmt = '[%(asctime)s] %(levelname)s: %(message)s'
         logging.Formatter.__init__(self, fmt)
 
-    def _colorized_fmt(self, color=Fore.RESET):
+    def _colorized_fmt(self, color):
+        from colorama import Style
         return f'{color}[%(asctime)s] %(levelname)s: %(message)s{Style.RESET_ALL}'
 
     def format(self, record):
+        from colorama import Fore
         # Save the original format configured by the user
         # when the logger formatter was instantiated
         format_orig = self._style._fmt
@@ -44,14 +46,37 @@ class Formatter(logging.Formatter):
 
 class Logger(logging.Logger):
 
-    def __init__(self, debug=False):
+    def __init__(self, debug=False, background=False):
         super().__init__('fntools')
         h = logging.StreamHandler(sys.stderr)
         f = Formatter()
         h.setFormatter(f)
         h.flush = sys.stderr.flush
-        self.addHandler(h)
+        self._listener = None
+        if background:
+            # Records are only queued by logging threads, they are colorized and written by listener thread
+            import queue
+            from logging import handlers
+            records = queue.SimpleQueue()
+            self._listener = handlers.QueueListener(records, h)
+            self._listener.start()
+            self.addHandler(handlers.QueueHandler(records))
+        else:
+            self.addHandler(h)
         if debug:
             self.setLevel(logging.DEBUG)
         else:
             self.setLevel(logging.INFO)
+
+    def close(self):
+        # Waits until queued records are written
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+
+def quiet_logger() -> Logger:
+    # Grids made in bulk by benchmarks, ensembles and checks log only warnings, not their fills and generations
+    logger = Logger()
+    logger.setLevel(logging.WARNING)
+    return logger